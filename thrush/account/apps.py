@@ -1,5 +1,6 @@
 """Account apps config."""
 from django.apps import AppConfig
+from django.core import checks
 
 
 class AuthConfig(AppConfig):
@@ -9,7 +10,11 @@ class AuthConfig(AppConfig):
     name = "account"
 
     def ready(self):
-        """Add 'external' content type."""
+        """Register the system checks."""
+        from .verification import check_provider
+
+        checks.register(check_provider)
+
         # from django.contrib.contenttypes.models import ContentType
 
         # ContentType.objects.get_or_create(app_label="external", model="")
@@ -0,0 +1,123 @@
+"""Account authentication.
+
+Every API call authenticates its token and checks the permissions of its user,
+so both are cached: the user ID of a token and a snapshot of the user here, and
+their permissions as bitmaps in `account.permission_bits`. Steady-state calls
+don't query the database to authenticate. The snapshots are forgotten once a
+token is deleted or a user is saved (see the receivers in `account.models`),
+and expire after `AUTH_CACHE_TIMEOUT` seconds.
+
+They are cached under versioned keys, see `base.cache`: a snapshot read from
+the old rows while they were changed is cached under the forgotten version, so
+it is never used.
+
+A snapshot only holds the fields checked by authentication and permissions,
+the other fields of the user are deferred, and loaded on first access.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from base.cache import forget_versions, get_versioned_keys
+
+TOKEN_KEY = "account:token:{}"
+USER_KEY = "account:user:{}"
+SNAPSHOT_FIELDS = ("id", "is_active", "is_superuser")
+
+
+def get_versioned_key(key: str) -> str:
+    """Get the versioned cache key of a token or user, see `base.cache`.
+
+    Args:
+        key (str): cache key.
+
+    Returns:
+        str: versioned cache key.
+    """
+    return get_versioned_keys([key], settings.AUTH_CACHE_TIMEOUT)[key]
+
+
+def get_cached_user(user_id: int):
+    """Get a user from their cached snapshot.
+
+    On cache misses the user is read from the database, and a snapshot of them
+    is cached.
+
+    Args:
+        user_id (int): user ID.
+
+    Returns:
+        User: user with deferred fields, or None.
+    """
+    key = get_versioned_key(USER_KEY.format(user_id))
+    model = get_user_model()
+    snapshot = cache.get(key)
+    if snapshot is None:
+        user = model._default_manager.filter(pk=user_id).first()
+        if user is not None:
+            snapshot = {field: getattr(user, field) for field in SNAPSHOT_FIELDS}
+            cache.set(key, snapshot, settings.AUTH_CACHE_TIMEOUT)
+        return user
+    field_names = [
+        field.attname
+        for field in model._meta.concrete_fields
+        if field.attname in SNAPSHOT_FIELDS
+    ]
+    user = model.from_db(
+        router.db_for_read(model),
+        field_names,
+        [snapshot[field_name] for field_name in field_names],
+    )
+    return user
+
+
+def forget_tokens(keys):
+    """Forget the cached users of tokens, once the transaction is committed.
+
+    Args:
+        keys (Iterable[str]): token keys.
+    """
+    forget_versions(TOKEN_KEY.format(key) for key in keys)
+
+
+def forget_users(user_ids):
+    """Forget the cached snapshots of users, once the transaction is committed.
+
+    Their versions are forgotten, so a snapshot cached from the old rows
+    meanwhile isn't used either.
+
+    Args:
+        user_ids (Iterable[int]): user IDs.
+    """
+    forget_versions(USER_KEY.format(user_id) for user_id in user_ids)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication caching the users of tokens."""
+
+    def authenticate_credentials(self, key):
+        """DRF built-in method.
+
+        Get the user from the cache, or from the database on cache misses.
+        """
+        token_key = get_versioned_key(TOKEN_KEY.format(key))
+        user_id = cache.get(token_key)
+        if user_id is None:
+            user_id = (
+                self.get_model()
+                .objects.filter(key=key)
+                .values_list("user_id", flat=True)
+                .first()
+            )
+            if user_id is not None:
+                cache.set(token_key, user_id, settings.AUTH_CACHE_TIMEOUT)
+        if user_id is not None:
+            user = get_cached_user(user_id)
+            if user is not None and user.is_active:
+                return user, Token(key=key, user=user)
+
+        # Unknown tokens and inactive users fail as usual.
+        return super().authenticate_credentials(key)
@@ -1,21 +1,96 @@
 """Account backends."""
-from django.contrib.auth.backends import BaseBackend
-from django.db.models import Q
+import re
 
+from django.contrib.auth.backends import BaseBackend, ModelBackend
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+
+from . import hashers
 from .models import User
 
+MOBILE_REGEX = re.compile(r"^\+?\d+$")
+
+
+def identifier_lookup(identifier: str) -> dict:
+    """Get the lookup of the single indexed field matching a login identifier.
+
+    Args:
+        identifier (str): mobile, email or username of a user.
+
+    Returns:
+        dict: filter keyword arguments.
+    """
+    if MOBILE_REGEX.match(identifier):
+        return {"mobile": identifier}
+    if "@" in identifier:
+        try:
+            validate_email(identifier)
+            # It uses the case-insensitive index of emails.
+            return {"email__iexact": identifier}
+        except ValidationError:
+            pass
+    return {"username": identifier}
+
 
 class AccountBackend(BaseBackend):
-    """Account authenticate backend."""
+    """Account authenticate backend.
+
+    A login identifier is looked up by the indexed field it looks like, then by
+    username if it's also a valid username, e.g. "123" or "user@host".
+    """
+
+    username_validator = UnicodeUsernameValidator()
+
+    def get_login_user(self, identifier: str):
+        """Get the user of a login identifier.
+
+        Args:
+            identifier (str): mobile, email or username of a user.
+
+        Returns:
+            User: found user, or None.
+        """
+        lookup = identifier_lookup(identifier)
+        user = User.objects.filter(**lookup).first()
+        if not user and "username" not in lookup:
+            try:
+                self.username_validator(identifier)
+                user = User.objects.filter(username=identifier).first()
+            except ValidationError:
+                pass
+        return user
+
+    @staticmethod
+    def upgrade_password(user, password: str):
+        """Hash a user's password again if its hasher or iterations changed."""
+        if hashers.must_update(user.password):
+            user.password = hashers.make_password(password)
+            user.save(update_fields=["password"])
 
     def authenticate(self, request, **kwargs):
-        """Authenticate users."""
-        user = User.objects.filter(
-            Q(mobile=kwargs["username"])
-            | Q(username=kwargs["username"])
-            | Q(email=kwargs["username"])
-        ).first()
-        if not user or not user.check_password(kwargs["password"]):
+        """Authenticate users.
+
+        The password is checked in the hashing pool, see `account.hashers`.
+        """
+        user = self.get_login_user(kwargs["username"])
+        if not user:
+            # Unknown users take as long as wrong passwords.
+            hashers.check_password(kwargs["password"], hashers.get_dummy_password())
             return None
+        if not hashers.check_password(kwargs["password"], user.password):
+            return None
+        self.upgrade_password(user, kwargs["password"])
         return user
 
+
+class PermissionBackend(ModelBackend):
+    """Model permissions backend.
+
+    Users only authenticate with `AccountBackend`, so a failed login doesn't
+    hash the password twice.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        """Django built-in method."""
+        return None
@@ -0,0 +1,19 @@
+"""Account exceptions."""
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PasswordHashingBusy(APIException):
+    """Too many passwords are being hashed exception."""
+
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+    default_detail = "too many requests, try again later."
+    default_code = "throttled"
+
+
+class TooManyVerificationAttempts(APIException):
+    """Too many verification codes were checked for a user exception."""
+
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+    default_detail = "too many verification attempts, try again later."
+    default_code = "throttled"
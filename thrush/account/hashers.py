@@ -0,0 +1,180 @@
+"""Password hashing off the request thread.
+
+Hashing a password costs tens of milliseconds of CPU, so logins, registrations
+and password changes hash in a pool of `AUTH_HASHING_WORKERS` processes,
+instead of pinning the request workers. The pool and its limit belong to each
+server worker process: a server with N worker processes runs N pools, so
+`AUTH_HASHING_WORKERS` is sized for the cores left per worker process. Each
+pool hashes at most `AUTH_HASHING_CONCURRENCY` passwords at once, further
+requests are refused with a 429 instead of queueing up.
+
+Unknown users are checked against a dummy hash, so they take as long to log in
+as wrong passwords, and don't tell which users exist.
+
+`LoginView` hashes in the pool through `account.backends.AccountBackend`.
+The pool only takes load off servers running several requests per process:
+ASGI servers, whose event loop awaits the pool with the async variants (see
+`account.views.async_login`), or threaded workers (gunicorn `--threads`). A
+gunicorn sync worker waits for its only request's hashing anyway, and never
+exceeds the limit, so run it with `AUTH_HASHING_WORKERS` set to 0.
+"""
+import asyncio
+import functools
+import secrets
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import django
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import hashers
+
+from .exceptions import PasswordHashingBusy
+
+_executor = None
+_slots = None
+_lock = threading.Lock()
+
+
+def _get_pool() -> tuple:
+    """Get the process pool and the semaphore capping its pending tasks."""
+    global _executor, _slots  # pylint: disable=global-statement
+    with _lock:
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(settings.AUTH_HASHING_CONCURRENCY)
+            if settings.AUTH_HASHING_WORKERS:
+                _executor = ProcessPoolExecutor(
+                    max_workers=settings.AUTH_HASHING_WORKERS,
+                    initializer=django.setup,
+                )
+    return _executor, _slots
+
+
+def shutdown():
+    """Stop the process pool, it's started again on the next hashing."""
+    global _executor, _slots  # pylint: disable=global-statement
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown()
+        _executor = _slots = None
+
+
+def _submit(function, *args, wait: bool = False) -> Future:
+    """Run a hashing function in the pool.
+
+    Args:
+        wait (bool): wait for the pool instead of raising when it's saturated.
+
+    Raises:
+        PasswordHashingBusy: if the pool is saturated.
+    """
+    executor, slots = _get_pool()
+    if not slots.acquire(blocking=wait):
+        raise PasswordHashingBusy
+
+    if executor is None:
+        future = Future()
+        try:
+            future.set_result(function(*args))
+        except Exception as e:  # pylint: disable=broad-except
+            future.set_exception(e)
+    else:
+        future = executor.submit(function, *args)
+    future.add_done_callback(lambda _: slots.release())
+    return future
+
+
+async def _asubmit(function, *args):
+    """Run a hashing function in the pool without blocking the event loop.
+
+    Without pool processes, it runs in a thread of its own.
+
+    Raises:
+        PasswordHashingBusy: if the pool is saturated.
+    """
+    executor, slots = _get_pool()
+    if not slots.acquire(blocking=False):
+        raise PasswordHashingBusy
+
+    try:
+        if executor is None:
+            return await sync_to_async(function, thread_sensitive=False)(*args)
+        return await asyncio.wrap_future(executor.submit(function, *args))
+    finally:
+        slots.release()
+
+
+@functools.lru_cache(maxsize=None)
+def get_dummy_password() -> str:
+    """Get the hash of a random password, checked when a user isn't found."""
+    return hashers.make_password(secrets.token_urlsafe())
+
+
+def make_password(password: str) -> str:
+    """Hash a password in the pool.
+
+    Args:
+        password (str): raw password.
+
+    Returns:
+        str: encoded password.
+    """
+    return _submit(hashers.make_password, password).result()
+
+
+def make_passwords(passwords) -> list:
+    """Hash many passwords in the pool, e.g. to import users.
+
+    Every password is submitted before collecting the hashes, so they are
+    hashed in parallel. A saturated pool is waited for.
+
+    Args:
+        passwords (Iterable[str]): raw passwords.
+
+    Returns:
+        list: encoded passwords, in the same order.
+    """
+    futures = [
+        _submit(hashers.make_password, password, wait=True) for password in passwords
+    ]
+    return [future.result() for future in futures]
+
+
+def check_password(password: str, encoded: str) -> bool:
+    """Check a password against its hash in the pool.
+
+    Args:
+        password (str): raw password.
+        encoded (str): encoded password.
+
+    Returns:
+        bool: whether the password matches.
+    """
+    return _submit(hashers.check_password, password, encoded).result()
+
+
+async def amake_password(password: str) -> str:
+    """Async version of `make_password`."""
+    return await _asubmit(hashers.make_password, password)
+
+
+async def acheck_password(password: str, encoded: str) -> bool:
+    """Async version of `check_password`."""
+    return await _asubmit(hashers.check_password, password, encoded)
+
+
+def must_update(encoded: str) -> bool:
+    """Check whether a password's hash should be upgraded to the preferred one.
+
+    Args:
+        encoded (str): encoded password.
+
+    Returns:
+        bool: whether the password should be hashed again.
+    """
+    preferred = hashers.get_hasher("default")
+    try:
+        hasher = hashers.identify_hasher(encoded)
+    except ValueError:
+        return False
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
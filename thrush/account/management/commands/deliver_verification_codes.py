@@ -0,0 +1,35 @@
+"""Deliver the queued verification codes."""
+from django.core.management.base import BaseCommand
+
+from account.verification import deliver_verification_codes
+
+
+class Command(BaseCommand):
+
+    help = "Deliver the verification codes queued by registrations."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep delivering, waiting up to INTERVAL seconds for new codes.",
+        )
+        parser.add_argument(
+            "--consumer",
+            default="default",
+            help="Name of this process, unique among the concurrent ones.",
+        )
+
+    def handle(self, *args, **kwargs):
+        delivered = 0
+        while True:
+            batch = deliver_verification_codes(kwargs["interval"], kwargs["consumer"])
+            delivered += batch
+            if batch:
+                self.stdout.write(
+                    f"Delivering verification codes... {self.style.SUCCESS(batch)} sent."
+                )
+            elif not kwargs["interval"]:
+                break
+        self.stdout.write(f"Finished, {delivered} verification codes sent.")
@@ -0,0 +1,75 @@
+"""Import users from a CSV file."""
+import csv
+import sys
+from itertools import islice
+
+from django.contrib.auth.models import Group, Permission
+from django.core.management.base import BaseCommand, CommandError
+
+from account.bulk import import_users
+
+
+class Command(BaseCommand):
+
+    help = (
+        "Import users from a CSV file whose header names user fields, e.g."
+        " 'username,mobile,email,password'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("file", help="CSV file, '-' reads the standard input.")
+        parser.add_argument(
+            "--group",
+            action="append",
+            default=[],
+            help="Name of a group of every user, besides the default one.",
+        )
+        parser.add_argument(
+            "--permission",
+            action="append",
+            default=[],
+            help="'app_label.codename' permission of every user.",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Users imported at once."
+        )
+
+    def _get_ids(self, kwargs) -> tuple:
+        """Get the IDs of the given groups and permissions."""
+        group_ids = list(
+            Group.objects.filter(name__in=kwargs["group"]).values_list("id", flat=True)
+        )
+        if len(group_ids) != len(set(kwargs["group"])):
+            raise CommandError("Some groups don't exist.")
+
+        permission_ids = []
+        for permission in set(kwargs["permission"]):
+            app_label, _, codename = permission.partition(".")
+            try:
+                permission_ids.append(
+                    Permission.objects.get(
+                        content_type__app_label=app_label, codename=codename
+                    ).id
+                )
+            except Permission.DoesNotExist as e:
+                raise CommandError(f"Permission '{permission}' doesn't exist.") from e
+        return group_ids, permission_ids
+
+    def handle(self, *args, **kwargs):
+        group_ids, permission_ids = self._get_ids(kwargs)
+        if kwargs["file"] == "-":
+            file = sys.stdin
+        else:
+            file = open(kwargs["file"], newline="", encoding="utf-8")
+
+        imported = 0
+        with file:
+            rows = csv.DictReader(file)
+            while batch := list(islice(rows, kwargs["batch_size"])):
+                imported += len(
+                    import_users(batch, group_ids, permission_ids, kwargs["batch_size"])
+                )
+                self.stdout.write(
+                    f"Importing users... {self.style.SUCCESS(imported)} created."
+                )
+        self.stdout.write(f"Finished, {imported} users imported.")
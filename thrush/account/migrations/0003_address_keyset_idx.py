@@ -0,0 +1,21 @@
+# Generated by Django 4.0.1 on 2026-10-18 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0002_user_email_upper_idx'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='address',
+            options={'ordering': ['created_at']},
+        ),
+        migrations.AddIndex(
+            model_name='address',
+            index=models.Index(fields=['created_at', 'id'], name='address_keyset_idx'),
+        ),
+    ]
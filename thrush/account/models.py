@@ -1,16 +1,22 @@
 """Account models."""
-import random
+import time
 
 from base.models import Base
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser, Group, Permission
-from django.core.cache import cache
-from django.db import models
+from django.db import models, transaction
 from django.db.models import signals
+from django.db.models.functions import Upper
 from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
 
+from .authentication import forget_tokens, forget_users
+from .permission_bits import forget_permission_bits, forget_permission_ids
 from .verification import send_verification_code
 
+# ID of the default group, and the monotonic time it expires at, per process.
+_default_group = {}
+
 
 class User(AbstractUser):
     """Customized version of Django's User model."""
@@ -23,38 +29,130 @@ class User(AbstractUser):
 
     REQUIRED_FIELDS = ["mobile", "password"]
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Logging in by email, case-insensitively.
+            models.Index(Upper("email"), name="user_email_upper_idx"),
+        ]
+
     def __str__(self):
         return self.get_full_name()
 
+    def refresh_from_db(self, using=None, fields=None):
+        """Django built-in method.
+
+        Accessing a deferred field loads all of them, e.g. for a user built from
+        a cached snapshot, see `account.authentication`.
+        """
+        if fields is not None:
+            deferred_fields = self.get_deferred_fields()
+            if deferred_fields.intersection(fields):
+                fields = deferred_fields.union(fields)
+        super().refresh_from_db(using, fields)
+
+
+def get_default_group_id() -> int:
+    """Get the ID of the default group of users, cached by the process.
+
+    It's cached once the transaction reading it is committed, so the ID of a
+    rolled back group isn't kept, and it isn't shared with other databases,
+    e.g. of tests. It expires after `AUTH_CACHE_TIMEOUT` seconds, the other
+    processes don't see a renamed group meanwhile.
+
+    Raises:
+        Group.DoesNotExist: if the group isn't created yet, see "init_group".
+    """
+    if _default_group.get("expires_at", 0) > time.monotonic():
+        return _default_group["id"]
+    group_id = Group.objects.get(name=settings.DEFAULT_USER_GROUP).id
+    transaction.on_commit(
+        lambda: _default_group.update(
+            id=group_id, expires_at=time.monotonic() + settings.AUTH_CACHE_TIMEOUT
+        )
+    )
+    return group_id
+
 
 @receiver(signals.post_save, sender=User)
 def user_default_groups(instance, created, **_):
     """Add a new user in default group."""
-    if (
-        created
-        and not instance.groups.filter(name=settings.DEFAULT_USER_GROUP).exists()
-    ):
-        group = Group.objects.get(name=settings.DEFAULT_USER_GROUP)
-        instance.groups.add(group.id)
-        instance.save()
+    # Adding a group is a no-op if the user is already in it.
+    if created:
+        instance.groups.add(get_default_group_id())
 
 
 @receiver(signals.post_save, sender=User)
 def user_verification_code(instance, created, **_):
-    """Add a new user in default group."""
+    """Send a verification code to a new user."""
     if created:
-        verification_code = str(
-            random.randint(*settings.VERIFICATION_CODE_LENGTH_RANGE)
-        )
-        encrypted_verification_code = settings.CRYPTOGRAPHY.encrypt(
-            verification_code.encode()
-        )
-        cache.set(
-            encrypted_verification_code,
-            instance.id,
-            settings.VERIFICATION_CODE_LIFE_TIME,
+        send_verification_code(instance)
+
+
+@receiver(signals.post_save, sender=User)
+@receiver(signals.post_delete, sender=User)
+def user_forget_snapshot(instance, **_):
+    """Forget the cached snapshot of a saved user, e.g. a deactivated one."""
+    forget_users([instance.pk])
+
+
+@receiver(signals.post_delete, sender=Token)
+def token_forget_user(instance, **_):
+    """Forget the cached user of a deleted token, e.g. on logout."""
+    forget_tokens([instance.key])
+
+
+@receiver(signals.m2m_changed, sender=User.groups.through)
+@receiver(signals.m2m_changed, sender=User.user_permissions.through)
+def user_forget_permissions(instance, action, reverse, pk_set, **_):
+    """Forget the cached permissions of users whose groups or permissions change."""
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        forget_permission_bits([instance.pk])
+    elif pk_set is not None:
+        forget_permission_bits(pk_set)
+    else:
+        forget_permission_bits(instance.user_set.values_list("pk", flat=True))
+
+
+@receiver(signals.m2m_changed, sender=Group.permissions.through)
+def group_forget_permissions(instance, action, reverse, pk_set, **_):
+    """Forget the cached permissions of the users of groups whose permissions change."""
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        group_ids = [instance.pk]
+    elif pk_set is not None:
+        group_ids = pk_set
+    else:
+        group_ids = instance.group_set.values_list("pk", flat=True)
+    forget_permission_bits(
+        User.groups.through.objects.filter(group_id__in=group_ids).values_list(
+            "user_id", flat=True
         )
-        send_verification_code(instance, verification_code, encrypted_verification_code)
+    )
+
+
+@receiver(signals.post_save, sender=Group)
+@receiver(signals.post_delete, sender=Group)
+def group_forget_default(**_):
+    """Forget the cached ID of the default group, e.g. when it's renamed."""
+    _default_group.clear()
+    # An ID read meanwhile is forgotten too.
+    transaction.on_commit(_default_group.clear)
+
+
+@receiver(signals.pre_delete, sender=Group)
+def group_forget_users(instance, **_):
+    """Forget the cached permissions of the users of a deleted group."""
+    forget_permission_bits(instance.user_set.values_list("pk", flat=True))
+
+
+@receiver(signals.post_save, sender=Permission)
+@receiver(signals.post_delete, sender=Permission)
+def permission_forget_ids(**_):
+    """Forget the cached IDs of permission names."""
+    forget_permission_ids()
 
 
 class Address(Base):
@@ -75,7 +173,7 @@ class Address(Base):
     unit = models.CharField(max_length=3, null=False)
     is_default = models.BooleanField(default=True)
 
-    class Meta:
+    class Meta(Base.Meta):
         unique_together = [("user", "is_default")]
 
     def __str__(self):
@@ -0,0 +1,139 @@
+"""Permission bitmaps.
+
+The permissions of a user, granted directly or by their groups, are cached as a
+Redis bitmap with one bit per `Permission` row, bit N being the permission with
+ID N. Bit 0 tells the bitmap is built, since IDs start at 1. The IDs of
+permission names are cached in a Redis hash, so checking permissions takes two
+round trips: one for the versions of their keys, and a pipelined one for both.
+
+Bitmaps are the only cache of permissions, the snapshots of
+`account.authentication` don't hold them. They are cached under versioned keys,
+see `base.cache`. When the groups or permissions of users change, the versions
+of their bitmaps are forgotten once the change is committed (see the receivers
+in `account.models`), and each bitmap is rebuilt with one query on the next
+check. A rolled back change isn't cached, and a bitmap built from the old rows
+meanwhile is cached under the forgotten version, so it is never used.
+"""
+import logging
+
+from base.cache import forget_versions, get_redis_client, get_versioned_keys
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from redis.exceptions import RedisError
+
+PERMISSION_IDS_KEY = "account:permission_ids"
+PERMISSION_BITS_KEY = "account:permission_bits:{}"
+BUILT_BIT = 0
+
+
+def _has_bit(bits: bytes, index: int) -> bool:
+    """Check a bit of a Redis bitmap, whose first bit is the highest one."""
+    return index >> 3 < len(bits) and bool(bits[index >> 3] & (0x80 >> (index & 7)))
+
+
+def _build_permission_ids(client, key: str) -> dict:
+    """Cache the IDs of all permissions by their "app_label.codename" name."""
+    ids = {
+        f"{app_label}.{codename}": pk
+        for pk, app_label, codename in Permission.objects.values_list(
+            "pk", "content_type__app_label", "codename"
+        )
+    }
+    pipeline = client.pipeline(transaction=False)
+    # The empty field tells the hash is built.
+    pipeline.hset(key, mapping={"": 0, **ids})
+    pipeline.expire(key, settings.AUTH_CACHE_TIMEOUT)
+    pipeline.execute()
+    return ids
+
+
+def build_permission_bits(user_id: int, key: str, client) -> bytes:
+    """Compute and cache the permission bitmap of a user.
+
+    Args:
+        user_id (int): user ID.
+        key (str): Redis key of the bitmap, got before reading the permissions.
+        client (Redis): Redis client.
+
+    Returns:
+        bytes: permission bitmap.
+    """
+    permission_ids = set(
+        get_user_model()
+        .user_permissions.through.objects.filter(user_id=user_id)
+        .values_list("permission_id", flat=True)
+        .union(
+            Group.permissions.through.objects.filter(group__user=user_id).values_list(
+                "permission_id", flat=True
+            )
+        )
+    )
+    permission_ids.add(BUILT_BIT)
+    bits = bytearray(max(permission_ids) // 8 + 1)
+    for permission_id in permission_ids:
+        bits[permission_id >> 3] |= 0x80 >> (permission_id & 7)
+
+    client.set(key, bytes(bits), ex=settings.AUTH_CACHE_TIMEOUT)
+    return bytes(bits)
+
+
+def has_perms(user, perms) -> bool:
+    """Check whether a user has all the permissions of a list.
+
+    It falls back to `User.has_perms` when Redis isn't available.
+
+    Args:
+        user (User): checked user.
+        perms (Iterable[str]): "app_label.codename" permission names.
+
+    Returns:
+        bool: whether the user has every permission.
+    """
+    if not user.is_active:
+        return False
+    if user.is_superuser:
+        return True
+
+    perms = list(perms)
+    bits_key = PERMISSION_BITS_KEY.format(user.pk)
+    try:
+        versioned_keys = get_versioned_keys(
+            [PERMISSION_IDS_KEY, bits_key], settings.AUTH_CACHE_TIMEOUT
+        )
+        ids_key = cache.make_key(versioned_keys[PERMISSION_IDS_KEY])
+        bits_key = cache.make_key(versioned_keys[bits_key])
+        client = get_redis_client()
+        pipeline = client.pipeline(transaction=False)
+        pipeline.hmget(ids_key, ["", *perms])
+        pipeline.get(bits_key)
+        (built, *permission_ids), bits = pipeline.execute()
+
+        if built is None:
+            ids = _build_permission_ids(client, ids_key)
+            permission_ids = [ids.get(perm) for perm in perms]
+        if bits is None or not _has_bit(bits, BUILT_BIT):
+            bits = build_permission_bits(user.pk, bits_key, client)
+    except RedisError as e:
+        logging.error(str(e))
+        return user.has_perms(perms)
+
+    return all(
+        permission_id is not None and _has_bit(bits, int(permission_id))
+        for permission_id in permission_ids
+    )
+
+
+def forget_permission_bits(user_ids):
+    """Forget the bitmaps of users once committed, rebuilt on their next check.
+
+    Args:
+        user_ids (Iterable[int]): user IDs.
+    """
+    forget_versions(PERMISSION_BITS_KEY.format(user_id) for user_id in user_ids)
+
+
+def forget_permission_ids():
+    """Forget the IDs of permission names once committed, e.g. for a new one."""
+    forget_versions([PERMISSION_IDS_KEY])
@@ -1,10 +1,11 @@
 """Account serializers."""
-from django.contrib.auth.hashers import make_password
+from base.serializers import DynamicFieldsMixin
 from django.contrib.auth.models import Group, Permission
 from django.contrib.contenttypes.models import ContentType
-from django.db.models import Q
+from django.db.models import Prefetch, Q
 from rest_framework import exceptions, serializers, status
 
+from .hashers import make_password
 from .models import Address, User
 
 
@@ -63,6 +64,18 @@ class GroupSerializer(serializers.ModelSerializer):
         )
 
 
+class GroupBriefInfoSerializer(serializers.ModelSerializer):
+    """Group's brief info serializer, e.g. to expand the groups of users."""
+
+    class Meta:
+        model = Group
+        fields = (
+            "id",
+            "name",
+            "permissions",
+        )
+
+
 class AddressSerializer(serializers.ModelSerializer):
     """Address serializer."""
 
@@ -88,8 +101,12 @@ class AddressSerializer(serializers.ModelSerializer):
         )
 
 
-class UserSerializer(serializers.ModelSerializer):
-    """User's profile serializer."""
+class UserSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """User's profile serializer.
+
+    It renders the fields of `?fields=` only, and the groups and permissions
+    of `?expand=` nested. Addresses are always nested.
+    """
 
     groups = serializers.PrimaryKeyRelatedField(queryset=Group.objects.all(), many=True)
     addresses = AddressSerializer(many=True, read_only=True, source="address_user")
@@ -97,6 +114,19 @@ class UserSerializer(serializers.ModelSerializer):
         queryset=Permission.objects.all(), many=True, source="user_permissions"
     )
 
+    expandable_fields = {
+        "groups": (
+            GroupBriefInfoSerializer,
+            Group.objects.prefetch_related(
+                Prefetch("permissions", queryset=Permission.objects.only("pk"))
+            ),
+        ),
+        "permissions": (
+            PermissionSerializer,
+            Permission.objects.select_related("content_type"),
+        ),
+    }
+
     class Meta:
         model = User
         read_ony_fields = ("last_login", "date_joined")
@@ -121,7 +151,7 @@ class UserSerializer(serializers.ModelSerializer):
         Raises:
             exceptions.ValidationError: if a user with an attribute exists.
         """
-        if User.objects.filter(query, ~Q(user=self.context["request"].user)).exists():
+        if User.objects.filter(query, ~Q(pk=self.context["request"].user.pk)).exists():
             raise exceptions.ValidationError(
                 detail={"message": "A user with this info already exists."},
                 code=status.HTTP_400_BAD_REQUEST,
@@ -148,10 +178,8 @@ class UserSerializer(serializers.ModelSerializer):
         permissions = validated_data.pop("user_permissions")
 
         user = User.objects.create_user(**validated_data)
-        for group in groups:
-            user.groups.add(group)
-        for permission in permissions:
-            user.user_permissions.add(permission)
+        user.groups.add(*groups)
+        user.user_permissions.add(*permissions)
         return user
 
 
@@ -171,6 +199,26 @@ class UserGeneralInfoSerializer(serializers.ModelSerializer):
         )
 
 
+class UserBriefInfoSerializer(serializers.ModelSerializer):
+    """User's brief info serializer.
+
+    It only renders columns of the user row, so it doesn't run any query when
+    the user is fetched with `select_related`.
+    """
+
+    url = serializers.HyperlinkedIdentityField(view_name="account:user-detail")
+
+    class Meta:
+        model = User
+        fields = (
+            "id",
+            "url",
+            "email",
+            "first_name",
+            "last_name",
+        )
+
+
 class LoginSerializer(serializers.Serializer):
     """Login serializer."""
 
@@ -1,12 +1,64 @@
 """Account tests."""
-from unittest.mock import patch
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import StringIO
+from unittest.mock import Mock, patch
 
+from asgiref.sync import async_to_sync
+from base.cache import get_redis_client
 from base.tests import BaseAPITestCase
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from parameterized import parameterized
+from redis import Redis
+from redis.client import Pipeline
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from . import authentication, hashers, permission_bits
+from .authentication import (
+    USER_KEY,
+    CachedTokenAuthentication,
+    forget_users,
+    get_versioned_key,
+)
+from .backends import identifier_lookup
+from .bulk import import_users
+from .exceptions import TooManyVerificationAttempts
+from .models import User, _default_group
+from .permission_bits import forget_permission_bits, has_perms
+from .verification import (
+    ATTEMPTS_KEY,
+    PROCESSING_KEY,
+    QUEUE_KEY,
+    RETRY_KEY,
+    USER_ATTEMPTS_KEY,
+    LocalProvider,
+    _code_key,
+    check_provider,
+    check_verification_code,
+    deliver_verification_codes,
+    send_verification_code,
+)
 
 
 class AccountTest(BaseAPITestCase):
+    def setUp(self):
+        Group.objects.get_or_create(name=settings.DEFAULT_USER_GROUP)
+
     def test_user_registration(self):
         response = self.client.post(
             reverse("account:register"),
@@ -101,7 +153,8 @@ class AccountTest(BaseAPITestCase):
         response = self.client.get(reverse("account:profile"))
         self.assertEqual(response.status_code, 200)
 
-        self.client.get(reverse("account:logout"))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse("account:logout"))
 
         response = self.client.get(reverse("account:profile"))
         self.assertEqual(response.status_code, 401)
@@ -181,27 +234,32 @@ class AccountTest(BaseAPITestCase):
             response.json(),
         )
 
+    @override_settings(VERIFICATION_PROVIDER="account.verification.LocalProvider")
     def test_activate_user(self):
-        with patch("account.models.send_verification_code") as mocked_fn:
+        get_redis_client().delete(cache.make_key(QUEUE_KEY))
+        LocalProvider.outbox = []
+        with self.captureOnCommitCallbacks(execute=True):
             self.fake_user(activate_user=False)
 
-            # Test the user (should get invalid auth due to not being activated).
-            response = self.client.post(
-                reverse("account:login"),
-                {"username": "user1", "password": "user-password1"},
-            )
-            self.assertEqual(response.status_code, 401)
-            self.assertTrue(response.json(), {"message": "user is not activated yet"})
+        # Test the user (should get invalid auth due to not being activated).
+        response = self.client.post(
+            reverse("account:login"),
+            {"username": "user1", "password": "user-password1"},
+        )
+        self.assertEqual(response.status_code, 401)
+        self.assertTrue(response.json(), {"message": "user is not activated yet"})
 
-            # Activate the user.
-            verification_code = mocked_fn.call_args.args[2]
-            response = self.client.get(
-                reverse("account:verification") + f"?code={verification_code}"
-            )
-            self.assertEqual(response.status_code, 200)
-            self.assertDictEqual(
-                response.json(), {"message": "user has been successfully activated"}
-            )
+        # Activate the user.
+        deliver_verification_codes()
+        verification_code = LocalProvider.outbox[-1]["code"]
+        response = self.client.get(
+            reverse("account:verification")
+            + f"?username=user1&code={verification_code}"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertDictEqual(
+            response.json(), {"message": "user has been successfully activated"}
+        )
 
         # Test the user (should be able to login).
         response = self.client.post(
@@ -228,7 +286,8 @@ class AccountTest(BaseAPITestCase):
         self.assertDictEqual(response.json(), {"message": "verification code is empty"})
 
         response = self.client.get(
-            reverse("account:verification") + "?code=invalid-verification-key"
+            reverse("account:verification")
+            + "?username=user1&code=invalid-verification-key"
         )
         self.assertEqual(response.status_code, 400)
         self.assertDictEqual(response.json(), {"message": "invalid verification code"})
@@ -240,3 +299,860 @@ class AccountTest(BaseAPITestCase):
         )
         self.assertEqual(response.status_code, 401)
         self.assertTrue(response.json(), {"message": "user is not activated yet"})
+
+
+class CachedTokenAuthenticationTest(BaseAPITestCase):
+    """Test caching the users of tokens."""
+
+    def setUp(self):
+        self.group, _ = Group.objects.get_or_create(name=settings.DEFAULT_USER_GROUP)
+        self.user = User.objects.create_user(
+            username="user1", mobile="123", password="user-password1", is_active=True
+        )
+        # User IDs are reused between tests.
+        with self.captureOnCommitCallbacks(execute=True):
+            forget_users([self.user.pk])
+        self.token = Token.objects.create(user=self.user)
+        self.authentication = CachedTokenAuthentication()
+
+    def _authenticate(self):
+        user, _ = self.authentication.authenticate_credentials(self.token.key)
+        return user
+
+    def test_cached_user(self):
+        self._authenticate()
+        with self.assertNumQueries(0):
+            user = self._authenticate()
+            self.assertEqual(user, self.user)
+        # Only the checked fields are cached, the others are loaded at once.
+        self.assertNotIn(
+            "password", cache.get(get_versioned_key(USER_KEY.format(self.user.pk)))
+        )
+        with self.assertNumQueries(1):
+            self.assertEqual((user.username, user.mobile), ("user1", "123"))
+
+    def test_forgotten_on_commit(self):
+        self._authenticate()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.save()
+        # The snapshot is kept until the change is committed.
+        self.assertIsNotNone(
+            cache.get(get_versioned_key(USER_KEY.format(self.user.pk)))
+        )
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(cache.get(get_versioned_key(USER_KEY.format(self.user.pk))))
+
+    def test_user_read_before_commit_isnt_cached(self):
+        self._authenticate()
+        with self.captureOnCommitCallbacks(execute=True):
+            forget_users([self.user.pk])
+
+        def deactivate_user(key, snapshot, timeout):
+            # The user is deactivated after a call read them, before they're cached.
+            self.user.is_active = False
+            with self.captureOnCommitCallbacks(execute=True):
+                self.user.save()
+            cache.set(key, snapshot, timeout)
+
+        with patch.object(authentication, "cache", Mock(wraps=cache)) as mocked_cache:
+            mocked_cache.set.side_effect = deactivate_user
+            self._authenticate()
+        with self.assertRaises(AuthenticationFailed):
+            self._authenticate()
+
+    def test_deactivated_user(self):
+        self._authenticate()
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self._authenticate()
+
+    def test_logout(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.assertEqual(self.client.get(reverse("account:profile")).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse("account:logout"))
+        self.assertEqual(self.client.get(reverse("account:profile")).status_code, 401)
+
+
+class PermissionBitsTest(BaseAPITestCase):
+    """Test checking permissions with permission bitmaps."""
+
+    def setUp(self):
+        self.group, _ = Group.objects.get_or_create(name=settings.DEFAULT_USER_GROUP)
+        self.user = User.objects.create_user(
+            username="user1", mobile="123", password="user-password1", is_active=True
+        )
+        # User IDs are reused between tests.
+        with self.captureOnCommitCallbacks(execute=True):
+            forget_permission_bits([self.user.pk])
+        self.view_group = Permission.objects.get(codename="view_group")
+        self.view_permission = Permission.objects.get(codename="view_permission")
+
+    def test_has_perms(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.permissions.add(self.view_group)
+        self.assertTrue(has_perms(self.user, ["auth.view_group"]))
+        with self.assertNumQueries(0):
+            self.assertTrue(has_perms(self.user, ["auth.view_group"]))
+            self.assertFalse(
+                has_perms(self.user, ["auth.view_group", "auth.view_permission"])
+            )
+            self.assertFalse(has_perms(self.user, ["auth.unknown"]))
+
+        # The bitmap is rebuilt with one query once a permission is granted.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.user_permissions.add(self.view_permission)
+        with self.assertNumQueries(1):
+            self.assertTrue(
+                has_perms(self.user, ["auth.view_group", "auth.view_permission"])
+            )
+
+        # Removed ones are only removed if no other grant is left.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.user_permissions.add(self.view_group)
+            self.group.permissions.remove(self.view_group)
+        self.assertTrue(has_perms(self.user, ["auth.view_group"]))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.user_permissions.clear()
+        self.assertFalse(has_perms(self.user, ["auth.view_group"]))
+        self.assertFalse(has_perms(self.user, ["auth.view_permission"]))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.permissions.add(self.view_permission)
+            self.user.groups.remove(self.group)
+        self.assertFalse(has_perms(self.user, ["auth.view_permission"]))
+
+        self.user.is_superuser = True
+        self.assertTrue(has_perms(self.user, ["auth.view_permission"]))
+        self.user.is_active = False
+        self.assertFalse(has_perms(self.user, ["auth.view_permission"]))
+
+    def test_uncommitted_grant(self):
+        self.assertFalse(has_perms(self.user, ["auth.view_group"]))
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.group.permissions.add(self.view_group)
+        # The bitmap is kept until the grant is committed.
+        with self.assertNumQueries(0):
+            self.assertFalse(has_perms(self.user, ["auth.view_group"]))
+
+        for callback in callbacks:
+            callback()
+        self.assertTrue(has_perms(self.user, ["auth.view_group"]))
+
+    def test_bits_read_before_commit_arent_cached(self):
+        client = get_redis_client()
+
+        def grant_permission(key, bits, ex):
+            # The permission is granted after a check read the rows, before
+            # their bitmap is cached.
+            with self.captureOnCommitCallbacks(execute=True):
+                self.group.permissions.add(self.view_group)
+            client.set(key, bits, ex=ex)
+
+        with patch.object(
+            permission_bits, "get_redis_client", return_value=Mock(wraps=client)
+        ) as get_client:
+            get_client.return_value.set.side_effect = grant_permission
+            self.assertFalse(has_perms(self.user, ["auth.view_group"]))
+        self.assertTrue(has_perms(self.user, ["auth.view_group"]))
+
+    def test_model_permissions(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse("account:permission-list"))
+        self.assertEqual(response.status_code, 403)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.permissions.add(self.view_permission)
+        response = self.client.get(reverse("account:permission-list"))
+        self.assertEqual(response.status_code, 200)
+
+
+class PermissionBitsBenchmarkTest(BaseAPITestCase):
+    """Benchmark checking the permissions of users in many groups."""
+
+    groups = 50
+    checks = 100
+
+    def setUp(self):
+        Group.objects.get_or_create(name=settings.DEFAULT_USER_GROUP)
+        self.user = User.objects.create_user(
+            username="user1", mobile="123", password="user-password1", is_active=True
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            forget_permission_bits([self.user.pk])
+        permissions = list(Permission.objects.all())
+        for index in range(self.groups):
+            group = Group.objects.create(name=f"group{index}")
+            group.permissions.add(*permissions[index :: self.groups])
+            self.user.groups.add(group)
+        self.perms = [
+            f"{permission.content_type.app_label}.{permission.codename}"
+            for permission in permissions[-3:]
+        ]
+
+    def test_permission_check_round_trips(self):
+        # The model backend queries the permissions of every fresh user.
+        users = [User.objects.get(pk=self.user.pk) for _ in range(self.checks)]
+        with CaptureQueriesContext(connection) as context:
+            for user in users:
+                self.assertTrue(user.has_perms(self.perms))
+        self.assertGreaterEqual(len(context.captured_queries), self.checks)
+
+        # The bitmap is built once, then every check takes two round trips: the
+        # versions of the keys, then the pipelined bitmap and permission IDs.
+        self.assertTrue(has_perms(self.user, self.perms))
+        with self.assertNumQueries(0), patch.object(
+            Pipeline, "execute", autospec=True, side_effect=Pipeline.execute
+        ) as execute, patch.object(
+            Redis, "execute_command", autospec=True, side_effect=Redis.execute_command
+        ) as execute_command:
+            for _ in range(self.checks):
+                self.assertTrue(has_perms(self.user, self.perms))
+        self.assertEqual(execute.call_count, self.checks)
+        self.assertEqual(execute_command.call_count, self.checks)
+
+
+class AccountBackendTest(BaseAPITestCase):
+    """Test authenticating by mobile, email or username."""
+
+    def setUp(self):
+        Group.objects.get_or_create(name=settings.DEFAULT_USER_GROUP)
+        self.user = User.objects.create_user(
+            username="user1",
+            mobile="+98123",
+            email="User1@Dev.Local",
+            password="user-password1",
+        )
+        self.numeric_user = User.objects.create_user(
+            username="456", mobile="789", password="user-password1"
+        )
+
+    def test_identifier_lookup(self):
+        self.assertEqual(identifier_lookup("+98123"), {"mobile": "+98123"})
+        self.assertEqual(
+            identifier_lookup("user1@dev.local"), {"email__iexact": "user1@dev.local"}
+        )
+        self.assertEqual(identifier_lookup("user@"), {"username": "user@"})
+        self.assertEqual(identifier_lookup("user1"), {"username": "user1"})
+
+    def test_authenticate(self):
+        for identifier in ("+98123", "user1@dev.local", "user1"):
+            with self.assertNumQueries(1):
+                self.assertEqual(
+                    authenticate(username=identifier, password="user-password1"),
+                    self.user,
+                )
+        self.assertIsNone(authenticate(username="user1", password="user-password2"))
+
+        # Usernames looking like mobiles are looked up by username too.
+        self.assertEqual(
+            authenticate(username="456", password="user-password1"),
+            self.numeric_user,
+        )
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "needs query plans")
+class LoginBenchmarkTest(BaseAPITestCase):
+    """Benchmark logging in among many users."""
+
+    users = 1000000
+    logins = 100
+
+    @classmethod
+    def setUpTestData(cls):
+        Group.objects.get_or_create(name=settings.DEFAULT_USER_GROUP)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {User._meta.db_table} (
+                    password, is_superuser, username, first_name, last_name,
+                    email, is_staff, is_active, date_joined, mobile,
+                    mobile_verified, email_verified, image
+                )
+                SELECT
+                    %s, false, 'user' || n, '', '', 'User' || n || '@Dev.Local',
+                    false, true, now(), '+98' || n, false, false, ''
+                FROM generate_series(1, %s) AS n
+                """,
+                [make_password("user-password1"), cls.users],
+            )
+            cursor.execute(f"ANALYZE {User._meta.db_table}")
+
+    def test_login_uses_indexes(self):
+        for identifier in ("+98777", "user777@dev.local", "user777"):
+            plan = (
+                User.objects.filter(**identifier_lookup(identifier))
+                .order_by("pk")[:1]
+                .explain()
+            )
+            self.assertIn("Index", plan)
+            self.assertNotIn("Seq Scan", plan)
+            if "email__iexact" in identifier_lookup(identifier):
+                self.assertIn("user_email_upper_idx", plan)
+
+        started_at = time.perf_counter()
+        for index in range(self.logins):
+            self.assertIsNotNone(
+                authenticate(
+                    username=f"user{(index + 1) * 997}@dev.local",
+                    password="user-password1",
+                )
+            )
+        elapsed = (time.perf_counter() - started_at) / self.logins
+        # Generous bound, the lookup takes well under a millisecond, the rest is
+        # hashing the password.
+        self.assertLess(elapsed, 1)
+
+
+class PasswordHashingTest(BaseAPITestCase):
+    """Test hashing passwords in the process pool."""
+
+    def setUp(self):
+        hashers.shutdown()
+        Group.objects.get_or_create(name=settings.DEFAULT_USER_GROUP)
+        self.user = User.objects.create_user(
+            username="user1", mobile="123", password="user-password1", is_active=True
+        )
+
+    def tearDown(self):
+        hashers.shutdown()
+
+    @override_settings(AUTH_HASHING_WORKERS=2)
+    def test_hashing_pool(self):
+        encoded = hashers.make_password("user-password1")
+        self.assertTrue(hashers.check_password("user-password1", encoded))
+        self.assertFalse(hashers.check_password("user-password2", encoded))
+        self.assertFalse(hashers.must_update(encoded))
+
+        response = self.client.post(
+            reverse("account:login"),
+            {"username": "user1", "password": "user-password1"},
+        )
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(AUTH_HASHING_WORKERS=2, AUTH_HASHING_CONCURRENCY=2)
+    def test_hash_many_passwords(self):
+        passwords = [f"user-password{index}" for index in range(5)]
+        # Every password is submitted before the first hash is collected.
+        with patch.object(hashers, "_submit", wraps=hashers._submit) as submit:
+            with patch.object(Future, "result", autospec=True) as result:
+                result.side_effect = lambda future: submit.call_count
+                self.assertEqual(hashers.make_passwords(passwords), [5] * 5)
+        for password, encoded in zip(passwords, hashers.make_passwords(passwords)):
+            self.assertTrue(hashers.check_password(password, encoded))
+
+    @override_settings(AUTH_HASHING_WORKERS=1, AUTH_HASHING_CONCURRENCY=1)
+    def test_back_pressure(self):
+        # The only slot is taken.
+        future = hashers._submit(time.sleep, 1)
+        for url in (reverse("account:login"), reverse("account:async-login")):
+            response = self.client.post(
+                url, {"username": "user1", "password": "user-password1"}
+            )
+            self.assertEqual(response.status_code, 429)
+        future.result()
+
+        response = self.client.post(
+            reverse("account:login"),
+            {"username": "user1", "password": "user-password1"},
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_async_login(self):
+        url = reverse("account:async-login")
+        response = self.client.post(
+            url, {"username": "user1", "password": "user-password1"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["token"], Token.objects.get(user=self.user).key
+        )
+
+        response = self.client.post(
+            url,
+            {"username": "user1", "password": "user-password2"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 401)
+        response = self.client.post(url, {"username": "user1"})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.generic(
+            "POST", url, "{", content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(AUTH_HASHING_WORKERS=0)
+    def test_async_hashing_without_workers(self):
+        encoded = hashers.make_password("user-password1")
+        check_password = hashers.hashers.check_password
+        threads = []
+
+        async def acheck_password():
+            threads.append(threading.get_ident())
+            return await hashers.acheck_password("user-password1", encoded)
+
+        def check_password_thread(*args):
+            threads.append(threading.get_ident())
+            return check_password(*args)
+
+        with patch.object(
+            hashers.hashers, "check_password", side_effect=check_password_thread
+        ):
+            self.assertTrue(async_to_sync(acheck_password)())
+        # The event loop isn't blocked by hashing.
+        self.assertNotEqual(threads[0], threads[1])
+
+    def test_unknown_user_hashes(self):
+        for url, name in (
+            (reverse("account:login"), "_submit"),
+            (reverse("account:async-login"), "_asubmit"),
+        ):
+            with patch.object(hashers, name, wraps=getattr(hashers, name)) as submit:
+                response = self.client.post(
+                    url, {"username": "unknown", "password": "user-password1"}
+                )
+            self.assertEqual(response.status_code, 401)
+            submit.assert_called_once()
+
+    def test_change_password_tells_validators(self):
+        self.client.force_authenticate(self.user)
+        with patch(
+            "django.contrib.auth.base_user.password_validation.password_changed"
+        ) as password_changed:
+            response = self.client.patch(
+                reverse("account:password"),
+                {"old_password": "user-password1", "new_password": "user-password2"},
+            )
+        self.assertEqual(response.status_code, 200)
+        password_changed.assert_called_once_with("user-password2", self.user)
+
+
+@unittest.skipUnless((os.cpu_count() or 1) > 1, "needs many cores")
+class PasswordHashingBenchmarkTest(BaseAPITestCase):
+    """Benchmark the hashing throughput of logins."""
+
+    logins = 32
+
+    def tearDown(self):
+        hashers.shutdown()
+
+    def _throughput(self, workers):
+        hashers.shutdown()
+        encoded = hashers.make_password("user-password1")
+        with override_settings(
+            AUTH_HASHING_WORKERS=workers, AUTH_HASHING_CONCURRENCY=self.logins
+        ):
+            hashers.shutdown()
+            # Start the workers.
+            hashers.check_password("user-password1", encoded)
+            started_at = time.perf_counter()
+            with ThreadPoolExecutor(self.logins) as executor:
+                results = list(
+                    executor.map(
+                        lambda _: hashers.check_password("user-password1", encoded),
+                        range(self.logins),
+                    )
+                )
+            elapsed = time.perf_counter() - started_at
+        self.assertTrue(all(results))
+        return self.logins / elapsed
+
+    def test_throughput_scales_with_cores(self):
+        one_core = self._throughput(1)
+        all_cores = self._throughput(os.cpu_count())
+        self.assertGreater(all_cores, one_core * 1.5)
+
+
+@override_settings(VERIFICATION_PROVIDER="account.verification.LocalProvider")
+class VerificationQueueTest(BaseAPITestCase):
+    """Test delivering verification codes in the background."""
+
+    def setUp(self):
+        Group.objects.get_or_create(name=settings.DEFAULT_USER_GROUP)
+        self.client_redis = get_redis_client()
+        self.client_redis.delete(
+            cache.make_key(QUEUE_KEY),
+            cache.make_key(RETRY_KEY),
+            cache.make_key(PROCESSING_KEY.format("default")),
+        )
+        LocalProvider.outbox.clear()
+        LocalProvider.batches = 0
+
+    def _register(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(count):
+                response = self.client.post(
+                    reverse("account:register"),
+                    {
+                        "mobile": str(index),
+                        "username": f"user{index}",
+                        "password": "user-password1",
+                    },
+                )
+                self.assertEqual(response.status_code, 201)
+
+    def test_registration_queues_code(self):
+        self._register(1)
+        self.assertFalse(LocalProvider.outbox)
+        # Only the user is queued, the code is generated when it's sent.
+        (queued,) = self.client_redis.lrange(cache.make_key(QUEUE_KEY), 0, -1)
+        self.assertEqual(
+            json.loads(queued), {"user_id": User.objects.get().id, "attempts": 0}
+        )
+
+        self.assertEqual(deliver_verification_codes(), 1)
+        (message,) = LocalProvider.outbox
+        self.assertEqual(message["user_id"], User.objects.get().id)
+        self.assertEqual(len(message["code"]), settings.VERIFICATION_CODE_LENGTH)
+        self.assertEqual(deliver_verification_codes(), 0)
+
+    @override_settings(VERIFICATION_BATCH_SIZE=2)
+    def test_batches(self):
+        self._register(3)
+        out = StringIO()
+        call_command("deliver_verification_codes", stdout=out)
+        self.assertIn("3 verification codes sent", out.getvalue())
+        self.assertEqual(LocalProvider.batches, 2)
+
+    @override_settings(VERIFICATION_RETRY_DELAY=0, VERIFICATION_MAX_ATTEMPTS=2)
+    def test_retries(self):
+        self._register(2)
+        with patch.object(
+            LocalProvider, "send", side_effect=lambda messages: messages[:1]
+        ):
+            self.assertEqual(deliver_verification_codes(), 1)
+        (retry,) = self.client_redis.zrange(cache.make_key(RETRY_KEY), 0, -1)
+        self.assertNotIn("code", json.loads(retry))
+
+        # The due retry is delivered with the next batch.
+        self.assertEqual(deliver_verification_codes(), 1)
+        self.assertEqual(self.client_redis.zcard(cache.make_key(RETRY_KEY)), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user(username="user9", mobile="9")
+        with patch.object(LocalProvider, "send", side_effect=RuntimeError):
+            self.assertEqual(deliver_verification_codes(), 0)
+            # It's dropped after the last attempt.
+            self.assertEqual(deliver_verification_codes(), 0)
+        self.assertEqual(self.client_redis.zcard(cache.make_key(RETRY_KEY)), 0)
+        self.assertEqual(self.client_redis.llen(cache.make_key(QUEUE_KEY)), 0)
+
+    def test_crash_keeps_codes(self):
+        self._register(2)
+        # The process dies while sending.
+        with patch.object(LocalProvider, "send", side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                deliver_verification_codes()
+        processing_key = cache.make_key(PROCESSING_KEY.format("default"))
+        self.assertEqual(self.client_redis.llen(processing_key), 2)
+        self.assertEqual(self.client_redis.llen(cache.make_key(QUEUE_KEY)), 0)
+
+        # Another consumer doesn't take them.
+        self.assertEqual(deliver_verification_codes(consumer="other"), 0)
+        self.assertEqual(deliver_verification_codes(), 2)
+        self.assertEqual(len(LocalProvider.outbox), 2)
+        self.assertEqual(self.client_redis.llen(processing_key), 0)
+
+    def test_provider_check(self):
+        self.assertEqual(check_provider(None), [])
+        with override_settings(VERIFICATION_PROVIDER=""):
+            self.assertEqual(
+                [error.id for error in check_provider(None)], ["account.W001"]
+            )
+            # The codes are kept until a provider is set.
+            self._register(1)
+            self.assertEqual(deliver_verification_codes(), 0)
+        self.assertEqual(deliver_verification_codes(), 1)
+        with override_settings(VERIFICATION_PROVIDER="account.verification.Missing"):
+            self.assertEqual(
+                [error.id for error in check_provider(None)], ["account.E002"]
+            )
+
+
+@override_settings(VERIFICATION_PROVIDER="account.verification.LocalProvider")
+class VerificationCodeTest(BaseAPITestCase):
+    """Test storing and checking verification codes."""
+
+    def setUp(self):
+        Group.objects.get_or_create(name=settings.DEFAULT_USER_GROUP)
+        self.user = User.objects.create_user(
+            username="user1", mobile="123", is_active=False
+        )
+        self.attempts_key = cache.make_key(
+            ATTEMPTS_KEY.format(self.user.id, "127.0.0.1")
+        )
+        get_redis_client().delete(
+            self.attempts_key,
+            cache.make_key(USER_ATTEMPTS_KEY.format(self.user.id)),
+            cache.make_key(QUEUE_KEY),
+            cache.make_key(PROCESSING_KEY.format("default")),
+        )
+        LocalProvider.outbox.clear()
+
+    def _send_code(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            send_verification_code(self.user)
+        self.assertEqual(deliver_verification_codes(), 1)
+        return LocalProvider.outbox[-1]["code"]
+
+    def _verify(self, code, address="127.0.0.1"):
+        return self.client.get(
+            reverse("account:verification") + f"?username=123&code={code}",
+            REMOTE_ADDR=address,
+        )
+
+    def test_code_key(self):
+        code = self._send_code()
+        self.assertEqual(len(code), settings.VERIFICATION_CODE_LENGTH)
+
+        # The key tells neither the user nor the code.
+        key = _code_key(self.user.id, code)
+        self.assertEqual(len(key.rsplit(":", 1)[1]), 24)
+        self.assertNotIn(code, key)
+        self.assertEqual(cache.get(key), 1)
+        self.assertNotEqual(key, _code_key(self.user.id + 1, code))
+
+    def test_single_use(self):
+        code = self._send_code()
+        self.assertFalse(check_verification_code(self.user.id + 1, code, "127.0.0.1"))
+        self.assertEqual(self._verify(code).status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_active)
+        self.assertEqual(self._verify(code).status_code, 400)
+
+    @override_settings(VERIFICATION_CHECK_LIMIT=2)
+    def test_attempt_limit(self):
+        code = self._send_code()
+        self.assertEqual(self._verify("0").status_code, 400)
+        self.assertEqual(self._verify("1").status_code, 400)
+
+        # Even the right code is refused after too many attempts.
+        response = self._verify(code)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(
+            response.json()["detail"], TooManyVerificationAttempts.default_detail
+        )
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+
+        # Another client isn't locked out.
+        self.assertEqual(self._verify(code, "10.0.0.1").status_code, 200)
+
+    @override_settings(VERIFICATION_USER_CHECK_LIMIT=2)
+    def test_user_attempt_limit(self):
+        code = self._send_code()
+        self.assertEqual(self._verify("0", "10.0.0.1").status_code, 400)
+        self.assertEqual(self._verify("1", "10.0.0.2").status_code, 400)
+
+        # Too many attempts from all clients drop the code.
+        self.assertEqual(self._verify(code, "10.0.0.3").status_code, 429)
+        get_redis_client().delete(
+            cache.make_key(USER_ATTEMPTS_KEY.format(self.user.id))
+        )
+        self.assertEqual(self._verify(code).status_code, 400)
+        self.assertEqual(self._verify(self._send_code()).status_code, 200)
+
+    def test_username_required(self):
+        response = self.client.get(reverse("account:verification") + "?code=0")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"message": "username is empty"})
+
+    def test_attempts_dont_extend_the_window(self):
+        self.assertEqual(self._verify("0").status_code, 400)
+        get_redis_client().expire(self.attempts_key, 5)
+        self.assertEqual(self._verify("1").status_code, 400)
+        self.assertLessEqual(get_redis_client().ttl(self.attempts_key), 5)
+
+
+class UserImportTest(BaseAPITestCase):
+    """Test importing users in bulk."""
+
+    def setUp(self):
+        self.group, _ = Group.objects.get_or_create(name=settings.DEFAULT_USER_GROUP)
+        self.permission = Permission.objects.get(codename="view_address")
+
+    def test_import_users(self):
+        encoded = make_password("user-password1")
+        rows = [
+            {"username": "user1", "mobile": "1", "password": encoded},
+            {"username": "user2", "mobile": "2", "password": "user-password2"},
+            {"username": "user3", "mobile": "3", "is_active": False},
+        ]
+        with CaptureQueriesContext(connection) as context:
+            user_ids = import_users(rows, permission_ids=[self.permission.id])
+        # The default group, then users, groups and permissions in a transaction.
+        self.assertEqual(len(context.captured_queries), 6)
+
+        user1, user2, user3 = User.objects.filter(id__in=user_ids).order_by("id")
+        self.assertEqual(user1.password, encoded)
+        self.assertTrue(user2.check_password("user-password2"))
+        self.assertFalse(user3.has_usable_password())
+        self.assertEqual([user1.is_active, user3.is_active], [True, False])
+        for user in (user1, user2, user3):
+            self.assertEqual(list(user.groups.all()), [self.group])
+            self.assertEqual(list(user.user_permissions.all()), [self.permission])
+
+    def test_default_group_id_is_cached(self):
+        # The ID read in a transaction which isn't committed isn't cached.
+        with self.captureOnCommitCallbacks():
+            User.objects.create_user(username="user0", mobile="0")
+        self.assertFalse(_default_group)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user(username="user1", mobile="1")
+        self.assertEqual(_default_group["id"], self.group.id)
+        with CaptureQueriesContext(connection) as context:
+            User.objects.create_user(username="user2", mobile="2")
+        self.assertFalse(
+            [
+                query
+                for query in context.captured_queries
+                if f'FROM "{Group._meta.db_table}" WHERE' in query["sql"]
+            ]
+        )
+
+        # Renaming the group forgets it.
+        self.group.name = "renamed"
+        self.group.save()
+        self.assertFalse(_default_group)
+
+    def test_import_command(self):
+        Group.objects.create(name="importers")
+        out = StringIO()
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as file:
+            file.write("username,mobile,email\n")
+            for index in range(5):
+                file.write(f"user{index},{index},user{index}@dev.local\n")
+            file.flush()
+            call_command(
+                "import_users",
+                file.name,
+                "--group=importers",
+                "--permission=account.view_address",
+                "--batch-size=2",
+                stdout=out,
+            )
+        self.assertIn("5 users imported", out.getvalue())
+        self.assertEqual(
+            User.objects.filter(groups__name="importers").count(),
+            User.objects.filter(user_permissions=self.permission).count(),
+        )
+        self.assertEqual(User.objects.filter(groups=self.group).count(), 5)
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "needs a large database")
+class UserImportBenchmarkTest(BaseAPITestCase):
+    """Benchmark importing many users."""
+
+    users = 100000
+    batch_size = 1000
+
+    def setUp(self):
+        Group.objects.get_or_create(name=settings.DEFAULT_USER_GROUP)
+
+    def test_import_queries(self):
+        encoded = make_password("user-password1")
+        rows = (
+            {"username": f"user{index}", "mobile": f"+98{index}", "password": encoded}
+            for index in range(self.users)
+        )
+        with CaptureQueriesContext(connection) as context:
+            import_users(rows, batch_size=self.batch_size)
+
+        self.assertEqual(
+            User.objects.filter(username__startswith="user").count(), self.users
+        )
+        self.assertLessEqual(
+            len(context.captured_queries), 2 * self.users // self.batch_size + 3
+        )
+
+
+class UserListingTest(BaseAPITestCase):
+    """Test listing users with some of their fields."""
+
+    def setUp(self):
+        self.group, _ = Group.objects.get_or_create(name=settings.DEFAULT_USER_GROUP)
+        self.admin = User.objects.create_superuser(
+            username="admin1", mobile="321", password="admin-password1", is_active=True
+        )
+        for index in range(3):
+            User.objects.create_user(username=f"user{index}", mobile=str(index))
+        self.client.force_authenticate(self.admin)
+
+    def _list(self, query=""):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse("account:user-list") + query)
+        self.assertEqual(response.status_code, 200)
+        return response.json()["results"], context.captured_queries
+
+    def test_all_fields(self):
+        results, queries = self._list()
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[1]["groups"], [self.group.id])
+        self.assertEqual(results[1]["addresses"], [])
+        # The page, then its groups, addresses and permissions.
+        self.assertEqual(len(queries), 4)
+
+    def test_requested_fields(self):
+        results, queries = self._list("?fields=id,first_name,mobile,unknown")
+        self.assertEqual(
+            results[1], {"id": results[1]["id"], "first_name": "", "mobile": "0"}
+        )
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("password", queries[0]["sql"])
+
+        results, queries = self._list("?fields=username,groups&username=user1")
+        self.assertEqual(results, [{"username": "user1", "groups": [self.group.id]}])
+        self.assertEqual(len(queries), 2)
+
+    def test_expanded_fields(self):
+        permission = Permission.objects.get(codename="view_address")
+        self.group.permissions.add(permission)
+        User.objects.get(username="user1").user_permissions.add(permission)
+        results, queries = self._list("?expand=groups,permissions,unknown")
+        # The expanded groups prefetch their permissions too.
+        self.assertEqual(len(queries), 5)
+        user = results[2]
+        (group,) = user["groups"]
+        self.assertEqual(
+            [group["name"], group["permissions"]], [self.group.name, [permission.id]]
+        )
+        (user_permission,) = user["permissions"]
+        self.assertEqual(user_permission["codename"], "view_address")
+        self.assertEqual(user_permission["content_type"]["app_label"], "account")
+
+        # Trimmed fields aren't expanded.
+        results, queries = self._list("?fields=id&expand=groups")
+        self.assertEqual(results[1], {"id": results[1]["id"]})
+        self.assertEqual(len(queries), 1)
+
+    def test_no_write_actions(self):
+        user = User.objects.get(username="user2")
+        url = reverse("account:user-detail", args=[user.id])
+        response = self.client.post(
+            reverse("account:user-list"), {"username": "user9", "mobile": "9"}
+        )
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(self.client.patch(url, {"first_name": "first"}).status_code, 405)
+        self.assertEqual(self.client.delete(url).status_code, 405)
+        self.assertTrue(User.objects.filter(pk=user.pk).exists())
+
+    def test_retrieve(self):
+        user = User.objects.get(username="user2")
+        response = self.client.get(
+            reverse("account:user-detail", args=[user.id]) + "?fields=username"
+        )
+        self.assertEqual(response.json(), {"username": "user2"})
+
+    def test_writes_are_not_trimmed(self):
+        response = self.client.patch(
+            reverse("account:profile") + "?fields=username",
+            {"first_name": "admin"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["first_name"], "admin")
+        self.admin.refresh_from_db()
+        self.assertEqual(self.admin.first_name, "admin")
@@ -4,6 +4,7 @@ from rest_framework import routers
 
 from .views import (
     AddressViewSet,
+    async_login,
     ChangePasswordView,
     ContentTypeViewSet,
     GroupViewSet,
@@ -27,6 +28,7 @@ urlpatterns = [
     path("", include(router.urls)),
     path("me/", MyProfileView.as_view(), name="profile"),
     path("login/", LoginView.as_view(), name="login"),
+    path("login/async/", async_login, name="async-login"),
     path("logout/", LogoutView.as_view(), name="logout"),
     path("register/", RegisterView.as_view(), name="register"),
     path("password/", ChangePasswordView.as_view(), name="password"),
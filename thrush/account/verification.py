@@ -1,15 +1,308 @@
-"""Account verification module."""
+"""Account verification module.
 
+A verification code is stored under a short HMAC of its user and itself, so
+only the user it was sent to can use it, and the keys don't tell the codes.
+Checking codes counts the attempts on a user in the same Redis round trip, per
+code lifetime from the first attempt: at most `VERIFICATION_CHECK_LIMIT` from
+each requester, and `VERIFICATION_USER_CHECK_LIMIT` from all of them. Past the
+latter the codes of the user are dropped, so guessing from many addresses
+doesn't pay, and a new code has to be sent.
 
-def send_verification_code(user, code: str, encrypted_code: str):
-    """Send verification code to the user.
+Verification codes aren't sent within the registration request: their users
+are queued in a Redis list of the default cache once committed, and delivered
+in batches to the `VERIFICATION_PROVIDER` by the "deliver_verification_codes"
+command. The codes are only generated when they are sent, so neither the queue
+nor the Redis sorted set of failed deliveries, retried with an exponential
+backoff by their due time, hold any code.
+
+Without a provider, e.g. in a deployment not configured yet, the codes stay
+queued until one is set.
+
+A batch is moved with LMOVE (Redis 6.2+) into the processing list of its
+consumer, and only removed from it once it's sent or scheduled for a retry. The
+messages left by a crashed consumer are queued again by its next delivery, so
+a code is sent at least once. Concurrent consumers need different names.
+"""
+import abc
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import time
+from collections import deque
+
+from base.cache import get_redis_client
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import checks
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .exceptions import TooManyVerificationAttempts
+
+CODE_KEY = "account:verification:{}"
+CODES_KEY = "account:verification:codes:{}"
+ATTEMPTS_KEY = "account:verification:attempts:{}:{}"
+USER_ATTEMPTS_KEY = "account:verification:attempts:{}"
+QUEUE_KEY = "account:verification:queue"
+RETRY_KEY = "account:verification:retry"
+PROCESSING_KEY = "account:verification:processing:{}"
+
+
+class BaseProvider(abc.ABC):
+    """Verification code delivery provider.
+
+    Subclasses deliver the codes over a channel of the company, e.g. SMS, email
+    or a messenger, and are set as `VERIFICATION_PROVIDER`.
+    """
+
+    @abc.abstractmethod
+    def send(self, messages: list) -> list:
+        """Send a batch of verification codes.
+
+        Args:
+            messages (list): messages, dicts with "user_id", "mobile", "email",
+                "code" and "attempts" keys.
+
+        Returns:
+            list: messages which couldn't be sent, they are retried later.
+        """
+
+
+class LocalProvider(BaseProvider):
+    """Provider keeping the sent messages in memory, for development and tests.
+
+    Only the last `OUTBOX_SIZE` messages are kept.
+    """
+
+    OUTBOX_SIZE = 1000
+
+    outbox = deque(maxlen=OUTBOX_SIZE)
+    batches = 0
+
+    def send(self, messages: list) -> list:
+        """Keep the messages in the outbox."""
+        LocalProvider.outbox.extend(messages)
+        LocalProvider.batches += 1
+        return []
+
+
+def get_provider() -> BaseProvider:
+    """Get the configured verification code provider."""
+    return import_string(settings.VERIFICATION_PROVIDER)()
+
+
+def check_provider(app_configs, **kwargs) -> list:
+    """Check that a verification code provider is configured, see `checks`."""
+    if not settings.VERIFICATION_PROVIDER:
+        return [
+            checks.Warning(
+                "VERIFICATION_PROVIDER isn't set, so verification codes stay "
+                "queued.",
+                hint='Set "THRUSH_VERIFICATION_PROVIDER" to a provider class.',
+                id="account.W001",
+            )
+        ]
+    try:
+        import_string(settings.VERIFICATION_PROVIDER)
+    except ImportError as e:
+        return [
+            checks.Error(
+                f"VERIFICATION_PROVIDER can't be imported: {e}",
+                id="account.E002",
+            )
+        ]
+    return []
+
+
+def _code_key(user_id: int, code: str) -> str:
+    """Get the cache key of a user's verification code."""
+    digest = hmac.new(
+        settings.SECRET_KEY.encode(), f"{user_id}:{code}".encode(), hashlib.sha256
+    ).hexdigest()
+    return CODE_KEY.format(digest[:24])
+
+
+def _generate_code() -> str:
+    """Generate a random verification code."""
+    low, high = map(int, settings.VERIFICATION_CODE_LENGTH_RANGE)
+    return str(low + secrets.randbelow(high - low + 1))
+
+
+def check_verification_code(user_id: int, code: str, requester: str) -> bool:
+    """Check and use up a verification code of a user.
 
     Args:
-        user (User): user instance.
+        user_id (int): user ID.
         code (str): verification code.
-        encrypted_code (str): encrypted verification code.
+        requester (str): identifier of the client, e.g. its IP address.
 
-    Todo:
-        The logic should be implemented based on the company's requirements.
-        For example: send email, send SMS, send message in a messenger, and so on.
+    Returns:
+        bool: whether the code is valid.
+
+    Raises:
+        TooManyVerificationAttempts: if the requester, or all of them, made too
+            many attempts.
     """
+    client = get_redis_client()
+    code_key = cache.make_key(_code_key(user_id, code))
+    attempts_key = cache.make_key(ATTEMPTS_KEY.format(user_id, requester))
+    user_attempts_key = cache.make_key(USER_ATTEMPTS_KEY.format(user_id))
+    pipeline = client.pipeline()
+    # The windows start with the first attempt, later ones don't extend them.
+    for key in (attempts_key, user_attempts_key):
+        pipeline.set(key, 0, ex=settings.VERIFICATION_CODE_LIFE_TIME, nx=True)
+        pipeline.incr(key)
+    pipeline.exists(code_key)
+    _, attempts, _, user_attempts, valid = pipeline.execute()
+
+    if user_attempts > settings.VERIFICATION_USER_CHECK_LIMIT:
+        codes_key = cache.make_key(CODES_KEY.format(user_id))
+        client.delete(codes_key, *client.smembers(codes_key))
+        raise TooManyVerificationAttempts
+    if attempts > settings.VERIFICATION_CHECK_LIMIT:
+        raise TooManyVerificationAttempts
+    if valid:
+        client.delete(code_key, attempts_key, user_attempts_key)
+    return bool(valid)
+
+
+def send_verification_code(user):
+    """Queue a verification code for delivery once the user is committed.
+
+    Only the user is queued, the code is generated when it's sent.
+
+    Args:
+        user (User): user instance.
+    """
+    message = json.dumps({"user_id": user.id, "attempts": 0})
+    transaction.on_commit(
+        lambda: get_redis_client().rpush(cache.make_key(QUEUE_KEY), message)
+    )
+
+
+def _retry(pipeline, messages: list):
+    """Schedule failed messages again, or drop them after too many attempts."""
+    now = time.time()
+    retries = {}
+    for message in messages:
+        message["attempts"] += 1
+        if message["attempts"] >= settings.VERIFICATION_MAX_ATTEMPTS:
+            logging.error(
+                "Verification code of user %s couldn't be sent.", message["user_id"]
+            )
+            continue
+        delay = settings.VERIFICATION_RETRY_DELAY * 2 ** (message["attempts"] - 1)
+        # The code isn't kept, a new one is sent on the next attempt.
+        retry = {"user_id": message["user_id"], "attempts": message["attempts"]}
+        retries[json.dumps(retry)] = now + delay
+    if retries:
+        pipeline.zadd(cache.make_key(RETRY_KEY), retries)
+
+
+def _requeue_due(client):
+    """Move the messages whose retry is due back to the queue."""
+    retry_key = cache.make_key(RETRY_KEY)
+    for message in client.zrangebyscore(retry_key, "-inf", time.time()):
+        # Only the process removing a message queues it.
+        if client.zrem(retry_key, message):
+            client.rpush(cache.make_key(QUEUE_KEY), message)
+
+
+def _make_messages(queued: list) -> list:
+    """Generate and store the codes of queued users, and make their messages."""
+    users = (
+        get_user_model()
+        .objects.only("id", "mobile", "email")
+        .in_bulk([message["user_id"] for message in queued])
+    )
+    messages, codes = [], {}
+    pipeline = get_redis_client().pipeline(transaction=False)
+    for message in queued:
+        # Users deleted meanwhile are skipped.
+        user = users.get(message["user_id"])
+        if user is not None:
+            code = _generate_code()
+            codes[_code_key(user.id, code)] = 1
+            # The codes of each user are listed, to drop them on too many attempts.
+            codes_key = cache.make_key(CODES_KEY.format(user.id))
+            pipeline.sadd(codes_key, cache.make_key(_code_key(user.id, code)))
+            pipeline.expire(codes_key, settings.VERIFICATION_CODE_LIFE_TIME)
+            messages.append(
+                {
+                    "user_id": user.id,
+                    "mobile": user.mobile,
+                    "email": user.email,
+                    "code": code,
+                    "attempts": message["attempts"],
+                }
+            )
+    cache.set_many(codes, settings.VERIFICATION_CODE_LIFE_TIME)
+    pipeline.execute()
+    return messages
+
+
+def _recover(client, processing_key: str):
+    """Queue again the messages a consumer left unacknowledged, e.g. on a crash."""
+    queue_key = cache.make_key(QUEUE_KEY)
+    while client.lmove(processing_key, queue_key, "RIGHT", "LEFT"):
+        pass
+
+
+def _move_batch(client, processing_key: str, size: int) -> list:
+    """Move up to size messages from the queue to a processing list."""
+    pipeline = client.pipeline(transaction=False)
+    for _ in range(size):
+        pipeline.lmove(cache.make_key(QUEUE_KEY), processing_key, "LEFT", "RIGHT")
+    return [raw_message for raw_message in pipeline.execute() if raw_message]
+
+
+def deliver_verification_codes(timeout: int = 0, consumer: str = "default") -> int:
+    """Deliver a batch of queued verification codes.
+
+    Args:
+        timeout (int): seconds to wait for a code if the queue is empty, 0 doesn't
+            wait.
+        consumer (str): name of the delivering process, unique among the
+            concurrent ones.
+
+    Returns:
+        int: number of delivered codes.
+    """
+    if not settings.VERIFICATION_PROVIDER:
+        logging.warning("VERIFICATION_PROVIDER isn't set, no code is sent.")
+        return 0
+
+    client = get_redis_client()
+    processing_key = cache.make_key(PROCESSING_KEY.format(consumer))
+    _recover(client, processing_key)
+    _requeue_due(client)
+
+    batch_size = settings.VERIFICATION_BATCH_SIZE
+    raw_messages = _move_batch(client, processing_key, batch_size)
+    if not raw_messages and timeout:
+        moved = client.blmove(
+            cache.make_key(QUEUE_KEY), processing_key, timeout, "LEFT", "RIGHT"
+        )
+        if moved:
+            raw_messages = [moved]
+            raw_messages += _move_batch(client, processing_key, batch_size - 1)
+    if not raw_messages:
+        return 0
+
+    messages = _make_messages([json.loads(raw_message) for raw_message in raw_messages])
+    try:
+        failed = get_provider().send(messages)
+    except Exception as e:  # pylint: disable=broad-except
+        logging.error(str(e))
+        failed = messages
+
+    # The batch is acknowledged with its retries.
+    pipeline = client.pipeline()
+    _retry(pipeline, failed)
+    for raw_message in raw_messages:
+        pipeline.lrem(processing_key, 1, raw_message)
+    pipeline.execute()
+    return len(messages) - len(failed)
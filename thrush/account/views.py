@@ -1,17 +1,27 @@
 """Account views."""
+import json
+
+from asgiref.sync import sync_to_async
 from base.permissions import ThrushDjangoModelPermissions
 from base.views import BaseViewSet
 from django.contrib.auth import authenticate, logout
 from django.contrib.auth.models import Group, Permission
 from django.contrib.contenttypes.models import ContentType
-from django.core.cache import cache
+from django.http import HttpResponseNotAllowed, JsonResponse
 from django_filters import rest_framework as filters
+from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
-from rest_framework import generics, permissions, status, views, viewsets
+from rest_framework import generics, mixins, permissions, status, views, viewsets
 from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
+from rest_framework.throttling import BaseThrottle
 
+from . import hashers
+from .backends import AccountBackend
+from .exceptions import PasswordHashingBusy
 from .models import Address, User
+from .permission_bits import has_perms
 from .serializers import (
     AddressSerializer,
     ChangePasswordSerializer,
@@ -22,6 +32,7 @@ from .serializers import (
     RegisterSerializer,
     UserSerializer,
 )
+from .verification import check_verification_code
 
 
 class ContentTypeFilter(filters.FilterSet):
@@ -43,10 +54,13 @@ class ContentTypeViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_class = ContentTypeFilter
 
 
-class UserViewSet(BaseViewSet):
-    """User view set."""
+class UserViewSet(
+    mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet
+):
+    """User view set, see `UserSerializer` to list only some fields."""
 
     permission_classes = [permissions.IsAuthenticated, ThrushDjangoModelPermissions]
+    queryset = User.objects.order_by("id")
     serializer_class = UserSerializer
     filterset_fields = (
         "username",
@@ -59,6 +73,13 @@ class UserViewSet(BaseViewSet):
         "date_joined",
     )
 
+    def get_queryset(self):
+        """DRF built-in method.
+
+        Only load the requested fields.
+        """
+        return UserSerializer.setup_queryset(super().get_queryset(), self.request)
+
 
 class GroupViewSet(BaseViewSet):
     """Group view set."""
@@ -102,7 +123,11 @@ class PermissionViewSet(viewsets.ReadOnlyModelViewSet):
 
 
 class LoginView(views.APIView):
-    """Login view."""
+    """Login view.
+
+    The password is checked in the hashing pool by `AccountBackend`, a saturated
+    pool is answered with a 429, see `account.hashers`.
+    """
 
     permission_classes = [permissions.AllowAny]
 
@@ -133,6 +158,62 @@ class LoginView(views.APIView):
         return Response(data={"token": token[0].key})
 
 
+async def async_login(request):
+    """Login view for ASGI servers.
+
+    The password is checked in the hashing pool without blocking the event loop.
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return JsonResponse(
+                {"detail": ParseError.default_detail},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+    else:
+        data = request.POST
+    serializer = LoginSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    backend = AccountBackend()
+    username = serializer.data["username"]
+    password = serializer.data["password"]
+    user = await sync_to_async(backend.get_login_user)(username)
+    try:
+        # Unknown users take as long as wrong passwords.
+        valid = await hashers.acheck_password(
+            password, user.password if user else hashers.get_dummy_password()
+        )
+        valid = valid and user is not None
+    except PasswordHashingBusy as e:
+        return JsonResponse({"detail": e.detail}, status=e.status_code)
+    if not valid:
+        return JsonResponse(
+            {"message": "invalid username or password"},
+            status=status.HTTP_401_UNAUTHORIZED,
+        )
+
+    if not user.is_active:
+        return JsonResponse(
+            {"message": "user is not activated yet"},
+            status=status.HTTP_401_UNAUTHORIZED,
+        )
+
+    await sync_to_async(backend.upgrade_password)(user, password)
+    token, _ = await sync_to_async(Token.objects.get_or_create)(user=user)
+    return JsonResponse({"token": token.key})
+
+
+# Like DRF views, authenticating with tokens doesn't need CSRF protection. The
+# `csrf_exempt` decorator doesn't keep views async yet.
+async_login.csrf_exempt = True
+
+
 class LogoutView(views.APIView):
     """Logout view."""
 
@@ -160,13 +241,13 @@ class ChangePasswordView(views.APIView):
         if (
             serializer.data.get("username")
             and request.user.username != serializer.data["username"]
-            and not request.user.has_perm("auth.change_user")
+            and not has_perms(request.user, ["auth.change_user"])
         ):
             return Response(
                 {"message": "permission denied"}, status=status.HTTP_403_FORBIDDEN
             )
 
-        if not request.user.has_perm("auth.change_user"):
+        if not has_perms(request.user, ["auth.change_user"]):
             user = authenticate(
                 username=serializer.data.get("username", request.user.username),
                 password=serializer.data["old_password"],
@@ -181,7 +262,9 @@ class ChangePasswordView(views.APIView):
                 user = User.objects.get(username=serializer.data["username"])
             else:
                 user = request.user
-        user.set_password(serializer.data["new_password"])
+        # Like `User.set_password`, the password validators are told on save.
+        user.password = hashers.make_password(serializer.data["new_password"])
+        user._password = serializer.data["new_password"]
         user.save()
         return Response({"message": "password has been updated"})
 
@@ -208,10 +291,32 @@ class RegisterView(generics.CreateAPIView):
 
 
 class VerifyView(views.APIView):
-    """Verify account view."""
+    """Verify account view.
+
+    A code is only valid for its user, so the user is given with the code, by
+    mobile, email or username as on login.
+    """
 
     permission_classes = [permissions.AllowAny]
 
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                "code",
+                openapi.IN_QUERY,
+                description="Verification code.",
+                type=openapi.TYPE_STRING,
+                required=True,
+            ),
+            openapi.Parameter(
+                "username",
+                openapi.IN_QUERY,
+                description="Mobile, email or username of the user.",
+                type=openapi.TYPE_STRING,
+                required=True,
+            ),
+        ]
+    )
     def get(self, request):
         """Verify user email or phone number."""
         # Get the verification code.
@@ -221,24 +326,26 @@ class VerifyView(views.APIView):
                 {"message": "verification code is empty"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        username = request.query_params.get("username")
+        if not username:
+            return Response(
+                {"message": "username is empty"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        # Find in cache.
-        user_id = cache.get(verification_code)
-        if not user_id:
+        # Check the code of the user.
+        user = AccountBackend().get_login_user(username)
+        if not user or not check_verification_code(
+            user.id, verification_code, BaseThrottle().get_ident(request)
+        ):
             return Response(
                 {"message": "invalid verification code"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
         # Activate the user.
-        try:
-            user = User.objects.get(id=int(user_id))
-            user.is_active = True
-            user.save()
-        except User.DoesNotExist:
-            return Response(
-                {"message": "user not found"}, status=status.HTTP_404_NOT_FOUND
-            )
+        user.is_active = True
+        user.save()
 
         return Response(
             {"message": "user has been successfully activated"},
@@ -0,0 +1,253 @@
+"""Bookmarks count maintenance.
+
+Bookmarked models (see `base.models.BaseBookmarked`) keep the number of their
+bookmarks in their own row. It's updated from the `m2m_changed` signal of their
+"bookmarks" field, from both sides of the relation.
+
+The bookmark API writes the through table directly instead, with one INSERT or
+DELETE per bookmark, and updates the count itself.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+
+def _concrete_model(model):
+    """Get the model whose table holds the count of a bookmarked model."""
+    return model._meta.get_field("bookmarks_count").model
+
+
+def _through(model) -> tuple:
+    """Get the through model of bookmarks, its bookmarked and its user fields."""
+    field = model._meta.get_field("bookmarks")
+    return (
+        field.remote_field.through,
+        field.m2m_field_name(),
+        field.m2m_reverse_field_name(),
+    )
+
+
+def _alive(model):
+    """Get the objects of a bookmarked model which weren't soft deleted.
+
+    The base manager is used, as the polymorphic default one would fetch the
+    child rows.
+    """
+    return model._base_manager.filter(is_deleted=False)
+
+
+def _bookmarked_ids(model, pks):
+    """Restrict IDs to the alive objects of a bookmarked model, as a subquery."""
+    return _alive(model).filter(pk__in=pks).values("pk")
+
+
+def update_bookmarks_count(model, pks, delta: int) -> int:
+    """Apply a bookmarks change to bookmarked objects.
+
+    Args:
+        model (Type[BaseBookmarked]): bookmarked model.
+        pks (Iterable[int]): bookmarked object IDs.
+        delta (int): change of the number of bookmarks of each object.
+
+    Returns:
+        int: number of updated objects.
+    """
+    return (
+        _concrete_model(model)
+        ._base_manager.filter(pk__in=_bookmarked_ids(model, pks))
+        .update(bookmarks_count=Greatest(F("bookmarks_count") + delta, 0))
+    )
+
+
+def bookmarks_changed(model, instance, action: str, reverse: bool, pk_set):
+    """Update the bookmarks count from a `m2m_changed` signal.
+
+    Only the rows really added are sent with "post_add", but removed and cleared
+    rows are counted before they are deleted, because "post_remove" is sent
+    with the requested IDs whether they were bookmarked or not.
+
+    Args:
+        model (Type[BaseBookmarked]): bookmarked model.
+        instance (Model): bookmarked object, or the user if `reverse`.
+        action (str): signal action.
+        reverse (bool): whether the relation is changed from the user's side.
+        pk_set (set): changed IDs on the other side, None when clearing.
+    """
+    through, bookmarked_field, user_field = _through(model)
+    stash = f"_removed_{through._meta.db_table}"
+
+    if action in ("pre_remove", "pre_clear"):
+        rows = through.objects.filter(
+            **{user_field if reverse else bookmarked_field: instance.pk}
+        )
+        if pk_set is not None:
+            rows = rows.filter(
+                **{f"{bookmarked_field if reverse else user_field}__in": pk_set}
+            )
+        if reverse:
+            setattr(
+                instance, stash, list(rows.values_list(bookmarked_field, flat=True))
+            )
+        else:
+            setattr(instance, stash, rows.count())
+    elif action in ("post_remove", "post_clear"):
+        removed = getattr(instance, stash, None)
+        if reverse and removed:
+            update_bookmarks_count(model, removed, -1)
+        elif removed:
+            update_bookmarks_count(model, [instance.pk], -removed)
+    elif action == "post_add" and pk_set:
+        if reverse:
+            update_bookmarks_count(model, pk_set, 1)
+        else:
+            update_bookmarks_count(model, [instance.pk], len(pk_set))
+
+
+def recount_bookmarks(model, pks=None) -> int:
+    """Recompute the bookmarks count of objects of a bookmarked model.
+
+    Args:
+        model (Type[BaseBookmarked]): bookmarked model.
+        pks (Iterable[int], optional): recounted object IDs, defaults to all.
+
+    Returns:
+        int: number of recounted objects.
+    """
+    through, bookmarked_field, _ = _through(model)
+    counts = (
+        through.objects.filter(**{bookmarked_field: OuterRef("pk")})
+        .order_by()
+        .values(bookmarked_field)
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    objects = _concrete_model(model)._base_manager.all()
+    if pks is not None:
+        objects = objects.filter(pk__in=_bookmarked_ids(model, pks))
+    return objects.update(bookmarks_count=Coalesce(Subquery(counts), 0))
+
+
+def user_bookmarks(model, user):
+    """Get the bookmarks of a user from the through table.
+
+    Args:
+        model (Type[BaseBookmarked]): bookmarked model.
+        user (User): bookmarking user.
+
+    Returns:
+        QuerySet: through table rows of the user.
+    """
+    through, bookmarked_field, user_field = _through(model)
+    return through.objects.filter(
+        **{
+            user_field: user.pk,
+            f"{bookmarked_field}__in": _alive(model).values("pk"),
+        }
+    )
+
+
+def add_bookmark(model, pk: int, user):
+    """Bookmark an object with a single INSERT into the through table.
+
+    A duplicate bookmark is caught by the through table's unique constraint, and
+    the count's UPDATE tells whether the object exists.
+
+    Args:
+        model (Type[BaseBookmarked]): bookmarked model.
+        pk (int): bookmarked object ID.
+        user (User): bookmarking user.
+
+    Returns:
+        bool: whether the bookmark was added, None if the object doesn't exist.
+    """
+    through, bookmarked_field, user_field = _through(model)
+    try:
+        with transaction.atomic():
+            through.objects.create(
+                **{f"{bookmarked_field}_id": pk, f"{user_field}_id": user.pk}
+            )
+            if not update_bookmarks_count(model, [pk], 1):
+                raise model.DoesNotExist
+    except IntegrityError:
+        return False
+    except model.DoesNotExist:
+        return None
+    return True
+
+
+def remove_bookmark(model, pk: int, user) -> bool:
+    """Remove a bookmark with a single DELETE from the through table.
+
+    Args:
+        model (Type[BaseBookmarked]): bookmarked model.
+        pk (int): bookmarked object ID.
+        user (User): bookmarking user.
+
+    Returns:
+        bool: whether the object was bookmarked.
+    """
+    through, bookmarked_field, user_field = _through(model)
+    with transaction.atomic():
+        removed, _ = through.objects.filter(
+            **{
+                f"{bookmarked_field}__in": _bookmarked_ids(model, [pk]),
+                user_field: user.pk,
+            }
+        ).delete()
+        if removed:
+            update_bookmarks_count(model, [pk], -removed)
+    return bool(removed)
+
+
+def toggle_bookmarks(model, user, add, remove) -> tuple:
+    """Add and remove many bookmarks of a user with a fixed number of queries.
+
+    Bookmarks are added, ignoring existing ones, then removed, and the counts of
+    all the touched objects are recomputed. Soft deleted objects are not found.
+
+    Args:
+        model (Type[BaseBookmarked]): bookmarked model.
+        user (User): bookmarking user.
+        add (Iterable[int]): IDs of the objects to bookmark.
+        remove (Iterable[int]): IDs of the objects not to bookmark anymore.
+
+    Returns:
+        tuple: IDs of the existing objects to bookmark, and of the ones which
+            weren't bookmarked yet.
+    """
+    through, bookmarked_field, user_field = _through(model)
+    remove = set(remove)
+    with transaction.atomic():
+        existing = (
+            set(_alive(model).filter(pk__in=add).values_list("pk", flat=True))
+            if add
+            else set()
+        )
+        added = existing - set(
+            through.objects.filter(
+                **{f"{bookmarked_field}__in": existing, user_field: user.pk}
+            ).values_list(bookmarked_field, flat=True)
+            if existing
+            else ()
+        )
+        if added:
+            through.objects.bulk_create(
+                [
+                    through(
+                        **{f"{bookmarked_field}_id": pk, f"{user_field}_id": user.pk}
+                    )
+                    for pk in added
+                ],
+                # Concurrent requests may have inserted the same bookmarks.
+                ignore_conflicts=True,
+            )
+        if remove:
+            through.objects.filter(
+                **{
+                    f"{bookmarked_field}__in": _bookmarked_ids(model, remove),
+                    user_field: user.pk,
+                }
+            ).delete()
+        if existing or remove:
+            recount_bookmarks(model, existing | remove)
+    return existing, added
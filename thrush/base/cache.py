@@ -0,0 +1,67 @@
+"""Redis access of the default cache.
+
+Counters, queues and bitmaps use Redis commands the cache API doesn't have, so
+they run on its client with keys made by `cache.make_key`.
+
+Values computed from the database are cached under versioned keys, see
+`get_versioned_keys`: forgetting them drops their version instead of their
+value, so a value computed from the old rows while they were changed can't be
+cached again once the change is committed.
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = "{}:version"
+
+
+def get_redis_client():
+    """Return the Redis client of the default cache."""
+    return cache._cache.get_client(write=True)  # pylint: disable=protected-access
+
+
+def get_versioned_keys(keys, timeout: int = None) -> dict:
+    """Get the keys of the current versions of cached values.
+
+    A value has to be read or cached under the versioned key got before reading
+    its rows. A missing version gets a new random one, so a dropped or expired
+    version is never used again.
+
+    Args:
+        keys (Iterable[str]): cache keys of the values.
+        timeout (int, optional): seconds new versions are kept, e.g. the timeout
+            of their values.
+
+    Returns:
+        dict: versioned cache key by cache key.
+    """
+    version_keys = {key: cache.make_key(VERSION_KEY.format(key)) for key in keys}
+    if not version_keys:
+        return {}
+    client = get_redis_client()
+    versions = dict(zip(version_keys.values(), client.mget(version_keys.values())))
+
+    missing = [key for key, version in versions.items() if version is None]
+    if missing:
+        pipeline = client.pipeline(transaction=False)
+        for key in missing:
+            pipeline.set(key, uuid.uuid4().hex, ex=timeout, nx=True)
+        pipeline.mget(missing)
+        versions.update(zip(missing, pipeline.execute()[-1]))
+
+    return {
+        key: f"{key}:{versions[version_key].decode()}"
+        for key, version_key in version_keys.items()
+    }
+
+
+def forget_versions(keys):
+    """Forget the cached values of keys once the transaction is committed.
+
+    Args:
+        keys (Iterable[str]): cache keys of the values.
+    """
+    version_keys = [cache.make_key(VERSION_KEY.format(key)) for key in keys]
+    if version_keys:
+        transaction.on_commit(lambda: get_redis_client().delete(*version_keys))
@@ -0,0 +1,27 @@
+"""Recompute denormalized bookmarks counts."""
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from base.bookmarks import recount_bookmarks
+from base.models import BaseBookmarked
+
+
+class Command(BaseCommand):
+
+    help = "Backfill or repair the bookmarks counts of all bookmarked models."
+
+    def handle(self, *args, **kwargs):
+        for model in apps.get_models():
+            # Multi-table inherited models share the count of their parent.
+            if (
+                not issubclass(model, BaseBookmarked)
+                or model._meta.get_field("bookmarks_count").model is not model
+            ):
+                continue
+
+            count = recount_bookmarks(model)
+            self.stdout.write(
+                f"Recounting '{model.__name__}.bookmarks'... "
+                f"{self.style.SUCCESS('OK')} ({count} bookmarked objects)"
+            )
+        self.stdout.write("Finished")
@@ -0,0 +1,25 @@
+"""Recompute denormalized star aggregates."""
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from base.models import BaseStar, BaseStarred
+from base.stars import recount_star_aggregates
+
+
+class Command(BaseCommand):
+
+    help = "Backfill or repair the star aggregates of all starred models."
+
+    def handle(self, *args, **kwargs):
+        for star_model in apps.get_models():
+            if not issubclass(star_model, BaseStar):
+                continue
+
+            for field in star_model._meta.get_fields():
+                if field.many_to_one and issubclass(field.related_model, BaseStarred):
+                    count = recount_star_aggregates(star_model, field.name)
+                    self.stdout.write(
+                        f"Recounting '{star_model.__name__}.{field.name}'... "
+                        f"{self.style.SUCCESS('OK')} ({count} starred objects)"
+                    )
+        self.stdout.write("Finished")
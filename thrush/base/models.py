@@ -24,6 +24,10 @@ class AbstractBase(models.Model):
     class Meta:
         abstract = True
         ordering = ["created_at"]
+        indexes = [
+            # Keyset pagination, see `base.pagination.KeysetPagination`.
+            models.Index(fields=["created_at", "id"], name="%(class)s_keyset_idx"),
+        ]
 
     def __repr__(self):
         return f"<{self.__class__.__name__} {self.id} {self.created_at}>"
@@ -36,9 +40,8 @@ class Base(AbstractBase):
 
     objects = BaseManager()
 
-    class Meta:
+    class Meta(AbstractBase.Meta):
         abstract = True
-        ordering = ["created_at"]
 
     def delete(self, *args, **kwargs):
         """Django built-in method."""
@@ -74,7 +77,7 @@ class Category(Base):
         on_delete=models.DO_NOTHING,
     )
 
-    class Meta:
+    class Meta(Base.Meta):
         unique_together = ("name", "parent")
 
     def __str__(self):
@@ -95,9 +98,8 @@ class BaseComment(Base):
     )
     is_approved = models.BooleanField(default=False)
 
-    class Meta:
+    class Meta(Base.Meta):
         abstract = True
-        ordering = ["created_at"]
 
     def __str__(self):
         if self.is_deleted:
@@ -105,7 +107,7 @@ class BaseComment(Base):
         return self.message
 
 
-class BaseStar(models.Model):
+class BaseStar(AbstractBase):
     """Star (posts) model implementation."""
 
     star = models.PositiveSmallIntegerField(
@@ -115,10 +117,36 @@ class BaseStar(models.Model):
         ]
     )
 
-    class Meta:
+    class Meta(AbstractBase.Meta):
         abstract = True
-        ordering = ["created_at"]
 
     def __str__(self):
         return f"{self.star}"
 
+
+class BaseStarred(models.Model):
+    """Denormalized star aggregates of a starred model.
+
+    They are maintained by `base.stars`, so sorting and filtering by rating
+    uses the "stars_average" index instead of aggregating stars per row.
+    """
+
+    stars_count = models.PositiveIntegerField(default=0)
+    stars_sum = models.PositiveIntegerField(default=0)
+    stars_average = models.FloatField(default=0, db_index=True)
+
+    class Meta:
+        abstract = True
+
+
+class BaseBookmarked(models.Model):
+    """Denormalized bookmarks count of a bookmarked model.
+
+    It's maintained by `base.bookmarks` from the model's "bookmarks" field, so
+    listings don't count the bookmarks of each row.
+    """
+
+    bookmarks_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
@@ -0,0 +1,172 @@
+"""Base paginations.
+
+List endpoints are paged by keyset: a cursor holds the ordering values of the
+last row of a page, and the next page is the rows after it in the ordering. A
+deep page costs the same index range scan as the first one, while page numbers
+count every row and skip the previous pages with an OFFSET.
+"""
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from operator import attrgetter
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def approximate_count(queryset) -> int:
+    """Count the rows of a queryset, estimated by the planner on PostgreSQL.
+
+    The estimate comes from the table statistics, so it doesn't scan the rows.
+    Other databases count them.
+
+    Args:
+        queryset (QuerySet): counted queryset.
+
+    Returns:
+        int: number of rows.
+    """
+    if connections[queryset.db].vendor != "postgresql":
+        return queryset.count()
+    plan = json.loads(queryset.order_by().explain(format="json"))
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class KeysetPagination(pagination.BasePagination):
+    """Keyset pagination in the ordering of the queryset.
+
+    The ordering is the one of the queryset, e.g. by `OrderingFilter`, or the
+    model's, e.g. "created_at" for `AbstractBase` models, with the primary key
+    as the last key so rows are never skipped nor repeated. Its fields should be
+    indexed together, see `AbstractBase.Meta.indexes`, and not be null.
+
+    The "count" of the rows is only rendered with "?count=true", and is an
+    estimate on PostgreSQL, see `approximate_count`.
+    """
+
+    page_size = settings.REST_FRAMEWORK["PAGE_SIZE"]
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    invalid_cursor_message = "Invalid cursor"
+
+    def _get_keys(self, queryset) -> list:
+        """Get the (field, descending) keys of the ordering of a queryset."""
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        keys = []
+        for field in ordering:
+            if not isinstance(field, str) or field == "?":
+                raise ImproperlyConfigured(f"Keyset pagination can't order by {field}.")
+            keys.append((field.lstrip("-"), field.startswith("-")))
+        pk_name = queryset.model._meta.pk.attname
+        if not {field for field, _ in keys} & {"pk", "id", pk_name}:
+            keys.append((pk_name, keys[-1][1] if keys else False))
+        return keys
+
+    def _decode_cursor(self, request):
+        """Decode the cursor of a request, or None on the first page.
+
+        Raises:
+            NotFound: if the cursor is invalid.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(b64decode(encoded.encode()))
+            values, reverse = cursor["v"], bool(cursor["r"])
+        except (TypeError, ValueError, KeyError) as e:
+            raise NotFound(self.invalid_cursor_message) from e
+        if not isinstance(values, list) or len(values) != len(self.keys):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def _encode_cursor(self, row, reverse: bool) -> str:
+        """Encode the cursor of the rows after or before a row."""
+        values = [attrgetter(field.replace("__", "."))(row) for field, _ in self.keys]
+        cursor = json.dumps({"v": values, "r": reverse}, default=str)
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, b64encode(cursor.encode()).decode()
+        )
+
+    def _seek(self, queryset, values: list, reverse: bool):
+        """Filter the rows after the cursor values, or before them in reverse."""
+        first_field, first_descending = self.keys[0]
+        after = Q()
+        equal = {}
+        for (field, descending), value in zip(self.keys, values):
+            lookup = "lt" if descending != reverse else "gt"
+            after |= Q(**equal, **{f"{field}__{lookup}": value})
+            equal[field] = value
+        # The bound on the first key lets the database scan an index range.
+        lookup = "lte" if first_descending != reverse else "gte"
+        return queryset.filter(**{f"{first_field}__{lookup}": values[0]}).filter(after)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """DRF built-in method."""
+        self.base_url = request.build_absolute_uri()
+        self.keys = self._get_keys(queryset)
+        cursor = self._decode_cursor(request)
+        values, reverse = cursor if cursor else (None, False)
+
+        self.count = None
+        if request.query_params.get(self.count_query_param) in ("1", "true"):
+            self.count = approximate_count(queryset)
+
+        ordering = [
+            f"{'-' if descending != reverse else ''}{field}"
+            for field, descending in self.keys
+        ]
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            try:
+                queryset = self._seek(queryset, values, reverse)
+            except (TypeError, ValueError, ValidationError) as e:
+                raise NotFound(self.invalid_cursor_message) from e
+
+        rows = list(queryset[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        page = rows[: self.page_size]
+        if reverse:
+            page.reverse()
+
+        # A reversed page comes from the next one, a forward one from the previous.
+        self.next = self.previous = None
+        if page and (has_more or reverse):
+            self.next = self._encode_cursor(page[-1], False)
+        if page and (has_more if reverse else values is not None):
+            self.previous = self._encode_cursor(page[0], True)
+        return page
+
+    def get_paginated_response(self, data):
+        """DRF built-in method."""
+        response = OrderedDict()
+        if self.count is not None:
+            response["count"] = self.count
+        response.update(
+            [("next", self.next), ("previous", self.previous), ("results", data)]
+        )
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        """DRF built-in method."""
+        return {
+            "type": "object",
+            "properties": {
+                "count": {"type": "integer", "example": 123},
+                "next": {"type": "string", "nullable": True},
+                "previous": {"type": "string", "nullable": True},
+                "results": schema,
+            },
+        }
+
+
+class BookmarkPagination(pagination.CursorPagination):
+    """Page bookmarks by their through table ID, latest first."""
+
+    ordering = "-id"
@@ -1,6 +1,8 @@
 """Base permissions."""
 from rest_framework import permissions
 
+from account.permission_bits import has_perms
+
 
 class ThrushDjangoModelPermissions(permissions.DjangoModelPermissions):
     """Admin Access Point custom model permissions."""
@@ -15,3 +17,20 @@ class ThrushDjangoModelPermissions(permissions.DjangoModelPermissions):
         "PATCH": ["%(app_label)s.change_%(model_name)s"],
         "DELETE": ["%(app_label)s.delete_%(model_name)s"],
     }
+
+    def has_permission(self, request, view):
+        """DRF built-in method.
+
+        Check the permissions with the cached permission bitmap of the user.
+        """
+        if getattr(view, "_ignore_model_permissions", False):
+            return True
+
+        if not request.user or (
+            not request.user.is_authenticated and self.authenticated_users_only
+        ):
+            return False
+
+        queryset = self._queryset(view)
+        perms = self.get_required_permissions(request.method, queryset.model)
+        return has_perms(request.user, perms)
@@ -1,10 +1,107 @@
 """Base serializers."""
 from django.conf import settings
-from rest_framework import serializers
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import permissions, serializers
 
 from .models import Category, Tag
 
 
+class DynamicFieldsMixin:
+    """Model serializer mixin rendering only the fields of a `?fields=` list.
+
+    For example "?fields=id,username" renders two fields, and
+    `setup_queryset` only loads their columns, without prefetching the
+    relations which aren't rendered. Relations of `expandable_fields` are
+    rendered by their primary keys, or nested with "?expand=", e.g.
+    "?expand=groups". Unknown names are ignored. Only reads are trimmed and
+    expanded, writes validate and save all the fields.
+    """
+
+    # Serializer class and queryset of the related objects of the relations
+    # nested with "?expand=", by field name.
+    expandable_fields = {}
+
+    @staticmethod
+    def _query_names(request, param: str) -> set:
+        """Get the names of a comma separated query parameter of a read."""
+        if not request or request.method not in permissions.SAFE_METHODS:
+            return None
+        names = request.query_params.get(param)
+        return set(names.split(",")) if names else None
+
+    @classmethod
+    def requested_fields(cls, request) -> set:
+        """Get the field names requested by the query, or None for all fields."""
+        return cls._query_names(request, "fields")
+
+    @classmethod
+    def expanded_fields(cls, request) -> set:
+        """Get the names of the relations expanded by the query."""
+        return set(cls.expandable_fields) & (
+            cls._query_names(request, "expand") or set()
+        )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        requested = self.requested_fields(request)
+        if requested is not None:
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+        for name in self.expanded_fields(request) & set(self.fields):
+            field = self.fields[name]
+            serializer_class, _ = self.expandable_fields[name]
+            self.fields[name] = serializer_class(
+                many=isinstance(field, serializers.ManyRelatedField),
+                read_only=True,
+                **({} if field.source == name else {"source": field.source}),
+            )
+
+    @classmethod
+    def setup_queryset(cls, queryset, request):
+        """Load only the columns and relations of the requested fields.
+
+        Args:
+            queryset (QuerySet): queryset of the serialized model.
+            request (Request): request.
+
+        Returns:
+            QuerySet: queryset with its deferred fields and prefetches.
+        """
+        model = queryset.model
+        columns, prefetches = [model._meta.pk.name], []
+        deferrable = True
+        expanded = cls.expanded_fields(request)
+        for name, field in cls(context={"request": request}).fields.items():
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                # Computed fields may use any column.
+                deferrable = False
+                continue
+            if not (model_field.many_to_many or model_field.one_to_many):
+                columns.append(model_field.name)
+            elif name in expanded:
+                _, related_queryset = cls.expandable_fields[name]
+                prefetches.append(Prefetch(field.source, queryset=related_queryset))
+            elif isinstance(field, serializers.ManyRelatedField) and isinstance(
+                field.child_relation, serializers.PrimaryKeyRelatedField
+            ):
+                # Only the primary keys of the related objects are rendered.
+                prefetches.append(
+                    Prefetch(
+                        field.source,
+                        queryset=model_field.related_model.objects.only("pk"),
+                    )
+                )
+            else:
+                prefetches.append(field.source)
+        if deferrable:
+            queryset = queryset.only(*columns)
+        return queryset.prefetch_related(*prefetches)
+
+
 class ContentTypeLinkModelSerializer(serializers.ModelSerializer):
     """ContentTypeLink model serializer implementation."""
 
@@ -48,3 +145,14 @@ class TagSerializer(serializers.ModelSerializer):
             "name",
         )
         ref_name = "tag"
+
+
+class BookmarkBatchSerializer(serializers.Serializer):
+    """Bookmark batch serializer."""
+
+    add = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), default=list, max_length=100
+    )
+    remove = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), default=list, max_length=100
+    )
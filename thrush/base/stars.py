@@ -0,0 +1,76 @@
+"""Star aggregates maintenance.
+
+Starred models (see `base.models.BaseStarred`) keep the count and the sum of
+their stars, and the resulting average, in their own row.
+"""
+from django.db.models import Count, F, FloatField, Sum
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+# Number of rows written per query while recounting.
+RECOUNT_BATCH_SIZE = 1000
+
+
+def update_star_aggregates(model, pk, count_delta: int, sum_delta: int):
+    """Apply a star change to the aggregates of a starred object.
+
+    The new values are computed by the database from the current ones, so
+    concurrent changes of the same object don't overwrite each other.
+
+    Args:
+        model (Type[BaseStarred]): starred model.
+        pk (int): starred object ID.
+        count_delta (int): change of the number of stars, e.g. 1 for a new star.
+        sum_delta (int): change of the sum of stars.
+    """
+    stars_count = F("stars_count") + count_delta
+    stars_sum = F("stars_sum") + sum_delta
+    model.objects.filter(pk=pk).update(
+        stars_count=stars_count,
+        stars_sum=stars_sum,
+        stars_average=Coalesce(
+            Cast(stars_sum, FloatField()) / NullIf(stars_count, 0),
+            0,
+            output_field=FloatField(),
+        ),
+    )
+
+
+def recount_star_aggregates(star_model, field_name: str) -> int:
+    """Recompute the star aggregates of all objects starred through a star model.
+
+    Args:
+        star_model (Type[BaseStar]): star model.
+        field_name (str): name of the star's foreign key to the starred model.
+
+    Returns:
+        int: number of starred objects which have at least one star.
+    """
+    field = star_model._meta.get_field(field_name)
+    starred_model = field.related_model
+    # The aggregates of multi-table inherited models live in the parent table.
+    model = starred_model._meta.get_field("stars_count").model
+
+    model._base_manager.filter(pk__in=starred_model._base_manager.values("pk")).exclude(
+        pk__in=star_model.objects.values(field.attname)
+    ).update(stars_count=0, stars_sum=0, stars_average=0)
+
+    aggregates = (
+        star_model.objects.order_by()
+        .values(field.attname)
+        .annotate(count=Count("pk"), total=Sum("star"))
+    )
+    objects = [
+        model(
+            pk=aggregate[field.attname],
+            stars_count=aggregate["count"],
+            stars_sum=aggregate["total"],
+            stars_average=aggregate["total"] / aggregate["count"],
+        )
+        for aggregate in aggregates
+    ]
+    model._base_manager.bulk_update(
+        objects,
+        ("stars_count", "stars_sum", "stars_average"),
+        batch_size=RECOUNT_BATCH_SIZE,
+    )
+    return len(objects)
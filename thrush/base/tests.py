@@ -41,5 +41,7 @@ class BaseAPITestCase(APITestCase):
         return self._register_and_login("admin1", "321", "admin-password1", activate_user)
 
     def logout(self):
-        self.client.get(reverse("account:logout"))
+        # The cached user of the token is forgotten on commit.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse("account:logout"))
         self.client.credentials()
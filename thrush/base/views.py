@@ -1,9 +1,20 @@
 """Base views."""
 from django.shortcuts import get_object_or_404
-from rest_framework import generics, permissions, viewsets
+from django_filters import rest_framework as filters
+from rest_framework import generics, mixins, permissions, status, viewsets
+from rest_framework.response import Response
 
+from .bookmarks import add_bookmark, remove_bookmark, toggle_bookmarks, user_bookmarks
 from .models import Category, Tag
-from .serializers import CategorySerializer, TagSerializer
+from .pagination import BookmarkPagination
+from .serializers import BookmarkBatchSerializer, CategorySerializer, TagSerializer
+
+
+class StarredFilterSet(filters.FilterSet):
+    """Filter set of starred models, filtering by their indexed average rating."""
+
+    min_stars = filters.NumberFilter(field_name="stars_average", lookup_expr="gte")
+    max_stars = filters.NumberFilter(field_name="stars_average", lookup_expr="lte")
 
 
 class BaseViewSet(viewsets.GenericViewSet):
@@ -48,6 +59,82 @@ class BaseViewSet(viewsets.GenericViewSet):
         return self.queryset.filter(user=user)
 
 
+class BaseBookmarkViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """Bookmark view set of a bookmarked model.
+
+    Bookmarks are listed, added and removed in the "bookmarks" through table
+    only. Adding and removing are idempotent.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = BookmarkPagination
+    # It should be override in the derived classes.
+    bookmarked_model = None
+    bookmarked_field = None
+
+    def get_queryset(self):
+        """List the bookmarks of the user."""
+        return user_bookmarks(self.bookmarked_model, self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        """Bookmark an object, it's fine if it's already bookmarked."""
+        try:
+            pk = int(request.data[self.bookmarked_field])
+        except (KeyError, TypeError, ValueError):
+            return Response(
+                data={
+                    "status_code": status.HTTP_400_BAD_REQUEST,
+                    "code": status.HTTP_400_BAD_REQUEST,
+                    "detail": f"A valid {self.bookmarked_field} ID is required.",
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        added = add_bookmark(self.bookmarked_model, pk, request.user)
+        if added is None:
+            return Response(
+                data={
+                    "status_code": status.HTTP_404_NOT_FOUND,
+                    "code": status.HTTP_404_NOT_FOUND,
+                    "detail": f"{self.bookmarked_model.__name__} not found.",
+                },
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        code = status.HTTP_201_CREATED if added else status.HTTP_200_OK
+        return Response(
+            data={
+                "status_code": code,
+                "code": code,
+                "detail": "Bookmark created." if added else "Already bookmarked.",
+            },
+            status=code,
+        )
+
+    def destroy(self, request, *args, **kwargs):
+        """Remove a bookmark, it's fine if there's none."""
+        if kwargs["pk"].isdigit():
+            remove_bookmark(self.bookmarked_model, int(kwargs["pk"]), request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def batch(self, request, *args, **kwargs):
+        """Add and remove many bookmarks at once."""
+        serializer = BookmarkBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        add = set(serializer.validated_data["add"])
+        remove = set(serializer.validated_data["remove"])
+
+        existing, added = toggle_bookmarks(
+            self.bookmarked_model, request.user, add, remove
+        )
+        return Response(
+            data={
+                "added": sorted(added - remove),
+                "removed": sorted(remove),
+                "not_found": sorted(add - existing),
+            }
+        )
+
+
 class TagViewSet(
     BaseViewSet,
     generics.ListCreateAPIView,
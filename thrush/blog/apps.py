@@ -2,7 +2,7 @@
 from django.apps import AppConfig
 from django.conf import settings
 
-from aap.apps import all_serializers
+from thrush.apps import all_serializers
 
 
 class BlogConfig(AppConfig):
@@ -13,3 +13,8 @@ class BlogConfig(AppConfig):
 
     def ready(self):
         settings.SERIALIZERS = all_serializers()
+
+        if settings.BLOG_VISIT_FLUSH_INTERVAL:
+            from .visits import start_flush_timer
+
+            start_flush_timer(settings.BLOG_VISIT_FLUSH_INTERVAL)
@@ -0,0 +1,31 @@
+"""Flush counted post visits into the database."""
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.visits import flush_visits
+
+
+class Command(BaseCommand):
+
+    help = "Add the visits counted in the cache to the posts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep flushing every INTERVAL seconds instead of flushing once.",
+        )
+
+    def _flush(self):
+        self.stdout.write(
+            f"Flushing post visits... {self.style.SUCCESS(flush_visits())} posts updated."
+        )
+
+    def handle(self, *args, **kwargs):
+        self._flush()
+        while kwargs["interval"]:
+            time.sleep(kwargs["interval"])
+            self._flush()
+        self.stdout.write("Finished")
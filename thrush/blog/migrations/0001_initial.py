@@ -0,0 +1,78 @@
+# Generated by Django 4.0.1 on 2026-10-18 21:14
+
+import blog.models
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('base', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Post',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('title', models.CharField(max_length=1024, unique=True)),
+                ('brief', models.TextField()),
+                ('content', models.TextField()),
+                ('slug', models.CharField(max_length=1024, unique=True)),
+                ('image', models.URLField()),
+                ('is_draft', models.BooleanField(default=False)),
+                ('visited', models.PositiveIntegerField(default=0)),
+                ('is_approved', models.BooleanField(default=False)),
+                ('bookmarks', models.ManyToManyField(related_name='post_bookmarks', to=settings.AUTH_USER_MODEL)),
+                ('category', models.ForeignKey(on_delete=models.SET(blog.models.get_deleted_post_category), to='base.category')),
+                ('previous', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='blog.post')),
+                ('tags', models.ManyToManyField(blank=True, related_name='tags', to='base.Tag')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PostComment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('message', models.CharField(max_length=500)),
+                ('is_approved', models.BooleanField(default=False)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_comments', to='blog.post')),
+                ('reply_to', models.ForeignKey(default='', null=True, on_delete=django.db.models.deletion.CASCADE, to='blog.postcomment')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_comment_user', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='PostStar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('star', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(10)])),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_stars', to='blog.post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_star_user', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'unique_together': {('user', 'post')},
+            },
+        ),
+    ]
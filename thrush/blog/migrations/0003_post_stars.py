@@ -0,0 +1,28 @@
+# Generated by Django 4.0.1 on 2026-10-18 21:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_postvisitflush'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='stars_average',
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='stars_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='stars_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
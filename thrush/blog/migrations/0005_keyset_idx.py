@@ -0,0 +1,25 @@
+# Generated by Django 4.0.1 on 2026-10-18 21:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_post_bookmarks_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['created_at', 'id'], name='post_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postcomment',
+            index=models.Index(fields=['created_at', 'id'], name='postcomment_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='poststar',
+            index=models.Index(fields=['created_at', 'id'], name='poststar_keyset_idx'),
+        ),
+    ]
@@ -2,9 +2,20 @@
 from django.conf import settings
 # from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
+from django.db.models import signals
+from django.dispatch import receiver
 
 from account.models import User
-from base.models import Base, BaseComment, BaseStar, Category, Tag
+from base.bookmarks import bookmarks_changed
+from base.models import (
+    Base,
+    BaseBookmarked,
+    BaseComment,
+    BaseStar,
+    BaseStarred,
+    Category,
+    Tag,
+)
 
 
 # class Tag(Base):
@@ -41,7 +52,7 @@ def get_deleted_post_category():
     return Category.objects.get_or_create(name=settings.DELETED_POST_CATEGORY_NAME)
 
 
-class Post(Base):
+class Post(Base, BaseStarred, BaseBookmarked):
     """Post model implementation."""
 
     title = models.CharField(max_length=1024, null=False, unique=True)
@@ -63,8 +74,8 @@ class Post(Base):
     visited = models.PositiveIntegerField(default=0)
     is_approved = models.BooleanField(default=False)
 
-    class Meta:
-        ordering = ["created_at"]
+    class Meta(Base.Meta):
+        pass
 
     def __str__(self):
         if self.is_deleted:
@@ -76,6 +87,12 @@ class Post(Base):
         return self.title
 
 
+@receiver(signals.m2m_changed, sender=Post.bookmarks.through)
+def post_bookmarks_count(instance, action, reverse, pk_set, **_):
+    """Maintain the bookmarks count of posts."""
+    bookmarks_changed(Post, instance, action, reverse, pk_set)
+
+
 # class Comment(Base):
 class PostComment(BaseComment):
     """Comment model implementation."""
@@ -112,9 +129,18 @@ class PostStar(BaseStar):
     user = models.ForeignKey(User, related_name="post_star_user", on_delete=models.CASCADE)
     post = models.ForeignKey(Post, related_name="post_stars", on_delete=models.CASCADE)
 
-    class Meta:
-        ordering = ["created_at"]
+    class Meta(BaseStar.Meta):
         unique_together = [("user", "post")]
 
     def __str__(self):
         return f"{self.post.title}[{self.star}]"
+
+
+class PostVisitFlush(models.Model):
+    """Token of a batch of visits applied to `Post.visited`, see `blog.visits`."""
+
+    token = models.CharField(max_length=32, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.token
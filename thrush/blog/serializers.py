@@ -1,15 +1,18 @@
 """Blog serializers."""
-from django.db.models import Avg
 from rest_framework import serializers
 
-from account.serializers import UserSerializer, UserGeneralInfoSerializer
+from account.serializers import UserBriefInfoSerializer, UserGeneralInfoSerializer
 # from .models import Post, Tag, PostStar, Category, PostComment
 from .models import Post, PostStar, PostComment
 from base.serializers import TagSerializer
 
 
 class CommentSerializer(serializers.ModelSerializer):
-    """Comment serializer."""
+    """Comment serializer.
+
+    Fetch comments with `select_related("user")` to render their authors without
+    extra queries.
+    """
 
     class Meta:
         model = PostComment
@@ -22,22 +25,37 @@ class CommentSerializer(serializers.ModelSerializer):
             "post",
             "is_approved",
         )
-        user_fields = ("id", "url", "email", "first_name", "last_name")
 
     def to_representation(self, instance):
         """DRF built-in method."""
         serialized_data = super().to_representation(instance)
-        serialized_data["user"] = UserSerializer(
-            instance=instance.user,
-            many=False,
-            context={"request": self.context["request"]},
+        serialized_data["user"] = UserBriefInfoSerializer(
+            instance=instance.user, context=self.context
         ).data
-        for user_field in serialized_data["user"].copy():
-            if user_field not in self.Meta.user_fields:
-                del serialized_data["user"][user_field]
         return serialized_data
 
 
+def build_comment_tree(comments):
+    """Nest serialized comments under the comments they reply to.
+
+    Args:
+        comments (List[dict]): serialized comments, ordered by creation time.
+
+    Returns:
+        List[dict]: root comments, each one with a "replies" list. Replies to
+            comments which aren't in the list are treated as roots.
+    """
+    nodes = {comment["id"]: {**comment, "replies": []} for comment in comments}
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node["reply_to"])
+        if parent is None:
+            roots.append(node)
+        else:
+            parent["replies"].append(node)
+    return roots
+
+
 class StarSerializer(serializers.ModelSerializer):
     """Star serializer."""
 
@@ -49,10 +67,10 @@ class StarSerializer(serializers.ModelSerializer):
 class BookmarkSerializer(serializers.ModelSerializer):
     """Bookmark serializer."""
 
-    post = serializers.PrimaryKeyRelatedField(source="id", read_only=True)
+    post = serializers.IntegerField(source="post_id", read_only=True)
 
     class Meta:
-        model = Post
+        model = Post.bookmarks.through
         fields = ("post",)
         ref_name = "blog"
 
@@ -74,13 +92,16 @@ class BookmarkSerializer(serializers.ModelSerializer):
 
 
 class PostSerializer(serializers.ModelSerializer):
-    """Post serializer."""
+    """Post serializer.
+
+    Reads the aggregates and prefetched relations prepared by
+    `PostViewSet.get_queryset`, and falls back to querying them for instances
+    coming from elsewhere (e.g. a freshly created post).
+    """
 
     url = serializers.HyperlinkedIdentityField(view_name="blog:post-detail")
-    comments = CommentSerializer(many=True, read_only=True)
+    comments = serializers.SerializerMethodField()
     comments_count = serializers.SerializerMethodField()
-    stars_average = serializers.SerializerMethodField()
-    bookmarks_count = serializers.SerializerMethodField()
     user = UserGeneralInfoSerializer(many=False, read_only=True)
 
     class Meta:
@@ -97,6 +118,7 @@ class PostSerializer(serializers.ModelSerializer):
             "tags",
             "comments_count",
             "comments",
+            "stars_count",
             "stars_average",
             "bookmarks_count",
             "content",
@@ -106,25 +128,33 @@ class PostSerializer(serializers.ModelSerializer):
             "user",
             "visited",
         )
+        read_only_fields = (
+            "stars_count",
+            "stars_average",
+            "bookmarks_count",
+            "visited",
+        )
 
-    def get_comments_count(self, obj):
-        """Get post's comment count."""
-        return obj.comments.count()
-
-    def get_stars_average(self, obj):
-        """Get post's star average."""
-        if obj.stars.all().aggregate(Avg("star"))["star__avg"]:
-            return obj.stars.all().aggregate(Avg("star"))["star__avg"]
-        else:
-            return 0
+    def get_comments(self, obj):
+        """Get post's approved comments."""
+        comments = getattr(obj, "approved_comments", None)
+        if comments is None:
+            comments = obj.post_comments.filter(is_approved=True).select_related("user")
+        return CommentSerializer(
+            instance=comments, many=True, context=self.context
+        ).data
 
-    def get_bookmarks_count(self, obj):
-        """Get post's bookmarks count."""
-        return obj.bookmarks.count()
+    def get_comments_count(self, obj):
+        """Get post's approved comment count."""
+        if hasattr(obj, "comments_count"):
+            return obj.comments_count
+        return obj.post_comments.filter(is_approved=True).count()
 
     def to_representation(self, instance):
         """Override tag IDs with tag details."""
         serialized_data = super().to_representation(instance)
         serialized_data["publisher"] = serialized_data.pop("user")
-        serialized_data["tags"] = TagSerializer(instance=instance.tags, many=True).data
+        serialized_data["tags"] = TagSerializer(
+            instance=instance.tags.all(), many=True
+        ).data
         return serialized_data
@@ -37,6 +37,11 @@ post_router = nested_routers.NestedDefaultRouter(
 post_router.register("comments", CommentViewSet, basename="comment")
 
 urlpatterns = [
+    path(
+        "bookmarks/batch/",
+        BookmarkViewSet.as_view({"post": "batch"}),
+        name="bookmark-batch",
+    ),
     path("", include(router.urls)),
     path("", include(category_router.urls)),
     path("", include(post_router.urls)),
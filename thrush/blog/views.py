@@ -1,15 +1,55 @@
 """Blog views."""
-from base.views import BaseViewSet
-from rest_framework import generics, permissions, status
+from base.stars import update_star_aggregates
+from base.views import BaseBookmarkViewSet, BaseViewSet, StarredFilterSet
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
+from django_filters import rest_framework as filters
+from rest_framework import generics, pagination, permissions
+from rest_framework.filters import OrderingFilter
 from rest_framework.response import Response
 
 from .models import Category, PostComment, Post, PostStar, Tag
 from .serializers import (
     BookmarkSerializer,
+    build_comment_tree,
     CommentSerializer,
     PostSerializer,
     StarSerializer,
 )
+from .visits import record_visit
+
+
+def _aggregate_subquery(queryset, field, aggregate, output_field):
+    """Build a correlated subquery aggregating `queryset` rows related to the outer post.
+
+    Args:
+        queryset (QuerySet): rows to aggregate.
+        field (str): name of the foreign key pointing to the post.
+        aggregate (Aggregate): aggregate expression, e.g. ``Count("id")``.
+        output_field (Field): type of the aggregated value.
+
+    Returns:
+        Coalesce: the aggregated value, or zero when there are no rows.
+    """
+    subquery = (
+        queryset.filter(**{field: OuterRef("pk")})
+        .order_by()
+        .values(field)
+        .annotate(value=aggregate)
+        .values("value")
+    )
+    return Coalesce(
+        Subquery(subquery, output_field=output_field), 0, output_field=output_field
+    )
+
+
+class PostFilterSet(StarredFilterSet):
+    """Post filter set."""
+
+    class Meta:
+        model = Post
+        fields = ("title", "slug", "tags", "is_draft", "min_stars", "max_stars")
 
 
 class PostViewSet(
@@ -20,7 +60,56 @@ class PostViewSet(
     permission_classes = [permissions.DjangoModelPermissions]
     queryset = Post.objects.filter(is_deleted=False)
     serializer_class = PostSerializer
-    filterset_fields = ("title", "slug", "tags", "is_draft")
+    filter_backends = [filters.DjangoFilterBackend, OrderingFilter]
+    filterset_class = PostFilterSet
+    ordering_fields = ("created_at", "stars_average")
+
+    def get_queryset(self):
+        """Annotate listing aggregates and prefetch the nested relations.
+
+        Approved posts which aren't drafts are listed and retrieved publicly,
+        along with the request user's own posts, but only their users change
+        and delete them. Counts are correlated subqueries, so a page of posts
+        costs a constant number of queries regardless of its size.
+        """
+        if self.request.method in permissions.SAFE_METHODS:
+            published = Q(is_draft=False, is_approved=True)
+            if self.request.user.is_authenticated:
+                published |= Q(user=self.request.user)
+            queryset = self.queryset.filter(published)
+        else:
+            queryset = super().get_queryset()
+        if self.kwargs.get("category_pk"):
+            queryset = queryset.filter(category=self.kwargs["category_pk"])
+        if self.kwargs.get("tag_pk"):
+            queryset = queryset.filter(tags=self.kwargs["tag_pk"])
+
+        approved_comments = PostComment.objects.filter(is_approved=True)
+        return (
+            queryset.select_related("user", "category")
+            .annotate(
+                comments_count=_aggregate_subquery(
+                    approved_comments, "post", Count("id"), IntegerField()
+                ),
+            )
+            .prefetch_related(
+                "tags",
+                Prefetch(
+                    "post_comments",
+                    queryset=approved_comments.select_related("user"),
+                    to_attr="approved_comments",
+                ),
+            )
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        """DRF built-in method.
+
+        Count the visit; it's added to "visited" later by `visits.flush_visits`.
+        """
+        response = super().retrieve(request, *args, **kwargs)
+        record_visit(response.data["id"])
+        return response
 
     def perform_create(self, serializer):
         """Override post value."""
@@ -40,10 +129,35 @@ class CommentViewSet(
     queryset = PostComment.objects.filter(is_deleted=False, is_approved=True)
     serializer_class = CommentSerializer
     filterset_fields = ("user", "is_approved", "post")
+    # Threads are built in memory, so they are paged by number.
+    thread_pagination_class = pagination.PageNumberPagination
 
     def get_queryset(self):
-        """Only fetch post-related comments."""
-        return PostComment.objects.filter(post=self.kwargs["post_pk"])
+        """Only fetch post-related comments.
+
+        Only the approved ones are listed and retrieved, as posts render them.
+        """
+        queryset = PostComment.objects.filter(post=self.kwargs["post_pk"])
+        if self.request.method in permissions.SAFE_METHODS:
+            queryset = queryset.filter(is_approved=True)
+        return queryset.select_related("user")
+
+    def list(self, request, *args, **kwargs):
+        """DRF built-in method.
+
+        With "?threaded=true", replies are nested under their parent comments and
+        the root comments are paginated. The whole thread is fetched in one query.
+        """
+        if request.query_params.get("threaded") != "true":
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        tree = build_comment_tree(self.get_serializer(queryset, many=True).data)
+        paginator = self.thread_pagination_class()
+        page = paginator.paginate_queryset(tree, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(page)
+        return Response(tree)
 
     def create(self, request, *args, **kwargs):
         """Attach user ID and post ID into a request."""
@@ -70,85 +184,38 @@ class StarViewSet(
     http_method_names = ["post"]
 
     def create(self, request, *args, **kwargs):
-        """Attach user ID into a request. Also, handle updating a star."""
+        """Attach user ID into a request. Also, handle updating a star.
+
+        The post's star aggregates are updated in the same transaction.
+        """
         request.data["user"] = self.request.user.id
-        current_star = PostStar.objects.filter(
-            user=self.request.user, post=request.data["post"]
-        ).first()
-        if not current_star:
-            return super().create(request, *args, **kwargs)
+        with transaction.atomic():
+            current_star = (
+                PostStar.objects.select_for_update()
+                .filter(user=self.request.user, post=request.data.get("post"))
+                .first()
+            )
+            if not current_star:
+                return super().create(request, *args, **kwargs)
+
+            previous_star = current_star.star
+            serializer = self.get_serializer(instance=current_star, data=request.data)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+            update_star_aggregates(
+                Post, current_star.post_id, 0, current_star.star - previous_star
+            )
+        return Response(serializer.data)
 
-        current_star.star = request.data["star"]
-        current_star.save()
-        return Response(StarSerializer(instance=current_star).data)
+    def perform_create(self, serializer):
+        """Add the new star to the post's star aggregates."""
+        star = serializer.save()
+        update_star_aggregates(Post, star.post_id, 1, star.star)
 
 
-class BookmarkViewSet(BaseViewSet, generics.ListCreateAPIView, generics.DestroyAPIView):
+class BookmarkViewSet(BaseBookmarkViewSet):
     """Bookmark view set."""
 
-    permission_classes = [permissions.IsAuthenticated]
-    queryset = Post.objects.all().only("id", "bookmarks")
     serializer_class = BookmarkSerializer
-
-    def get_queryset(self):
-        """Only fetch bookmark-related posts."""
-        return Post.objects.filter(bookmarks=self.request.user)
-
-    def create(self, request, *args, **kwargs):
-        """Attach user ID into a request."""
-        request.data["user"] = self.request.user.id
-        try:
-            self.get_queryset().get(id=request.data["post"])
-            return Response(
-                data={
-                    "status_code": status.HTTP_400_BAD_REQUEST,
-                    "code": status.HTTP_400_BAD_REQUEST,
-                    "detail": "The post already bookmarked.",
-                },
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        except Post.DoesNotExist:
-            post = Post.objects.get(id=request.data["post"])
-            post.bookmarks.add(self.request.user)
-        return Response(
-            data={
-                "status_code": status.HTTP_201_CREATED,
-                "code": status.HTTP_201_CREATED,
-                "detail": "Bookmark created.",
-            },
-            status=status.HTTP_201_CREATED,
-        )
-
-    def destroy(self, request, *args, **kwargs):
-        """DRF built-in method."""
-        try:
-            post = Post.objects.get(id=kwargs["pk"])
-        except Post.DoesNotExist:
-            return Response(
-                data={
-                    "status_code": status.HTTP_404_NOT_FOUND,
-                    "code": status.HTTP_404_NOT_FOUND,
-                    "detail": "Post not found.",
-                },
-                status=status.HTTP_404_NOT_FOUND,
-            )
-
-        if post.bookmarks.filter(bookmarks__bookmarks=self.request.user).exists():
-            post.bookmarks.remove(self.request.user)
-            return Response(
-                data={
-                    "status_code": status.HTTP_204_NO_CONTENT,
-                    "code": status.HTTP_204_NO_CONTENT,
-                    "detail": "Bookmark removed.",
-                },
-                status=status.HTTP_204_NO_CONTENT,
-            )
-
-        return Response(
-            data={
-                "status_code": status.HTTP_404_NOT_FOUND,
-                "code": status.HTTP_404_NOT_FOUND,
-                "detail": "Bookmark not found.",
-            },
-            status=status.HTTP_404_NOT_FOUND,
-        )
+    bookmarked_model = Post
+    bookmarked_field = "post"
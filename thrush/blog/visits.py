@@ -0,0 +1,139 @@
+"""Post visits counter.
+
+Visits are counted in a Redis hash of the default cache and written to
+`Post.visited` in batches by `flush_visits`, so reading a post never locks its row.
+Each batch has a token saved with its updates, so a batch left over by a crash
+after its commit is never applied twice.
+"""
+import datetime
+import logging
+import secrets
+import threading
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from redis.exceptions import RedisError, WatchError
+
+from base.cache import get_redis_client
+
+from .models import Post, PostVisitFlush
+
+VISITS_KEY = "blog:post_visits"
+FLUSH_LOCK_KEY = "blog:post_visits:lock"
+FLUSH_LOCK_TIMEOUT = 60
+UPDATE_BATCH_SIZE = 1000
+# Applied batch tokens are kept long enough to recognize any leftover batch.
+FLUSH_TOKEN_LIFE_TIME = datetime.timedelta(days=1)
+
+
+def record_visit(post_id: int):
+    """Count a visit of a post.
+
+    Args:
+        post_id (int): visited post ID.
+    """
+    try:
+        get_redis_client().hincrby(cache.make_key(VISITS_KEY), post_id, 1)
+    except RedisError as e:
+        logging.error(str(e))
+
+
+def _release_lock(client, lock_key: str, lock_token: str):
+    """Release the flush lock if it's still held by this flush."""
+    with client.pipeline() as pipeline:
+        try:
+            pipeline.watch(lock_key)
+            if pipeline.get(lock_key) == lock_token.encode():
+                pipeline.multi()
+                pipeline.delete(lock_key)
+                pipeline.execute()
+        except WatchError:
+            # The lock expired and was taken meanwhile.
+            pass
+
+
+def _apply(token: str, post_ids_by_visits: dict) -> bool:
+    """Apply a batch of visits once, recording its token with the updates."""
+    try:
+        with transaction.atomic():
+            PostVisitFlush.objects.create(token=token)
+            for visits, post_ids in post_ids_by_visits.items():
+                for index in range(0, len(post_ids), UPDATE_BATCH_SIZE):
+                    Post.objects.filter(
+                        pk__in=post_ids[index : index + UPDATE_BATCH_SIZE]
+                    ).update(visited=F("visited") + visits)
+            PostVisitFlush.objects.filter(
+                created_at__lt=timezone.now() - FLUSH_TOKEN_LIFE_TIME
+            ).delete()
+    except IntegrityError:
+        # The batch was applied by a flush which couldn't clean it up.
+        return False
+    return True
+
+
+def flush_visits() -> int:
+    """Add the counted visits to `Post.visited`.
+
+    The pending counters are atomically renamed before being applied, so visits
+    recorded meanwhile are kept for the next flush. Posts with the same number of
+    new visits are updated together with a single `F()` update.
+
+    Returns:
+        int: number of updated posts.
+    """
+    client = get_redis_client()
+    lock_key = cache.make_key(FLUSH_LOCK_KEY)
+    lock_token = secrets.token_hex(16)
+    if not client.set(lock_key, lock_token, nx=True, ex=FLUSH_LOCK_TIMEOUT):
+        # Another process is flushing.
+        return 0
+
+    try:
+        visits_key = cache.make_key(VISITS_KEY)
+        flushing_key = f"{visits_key}:flushing"
+        token_key = f"{flushing_key}:token"
+
+        # A leftover of a failed flush is applied before taking new visits.
+        if not client.exists(flushing_key):
+            if not client.exists(visits_key):
+                return 0
+            pipeline = client.pipeline()
+            pipeline.rename(visits_key, flushing_key)
+            pipeline.set(token_key, secrets.token_hex(16))
+            pipeline.execute()
+        client.set(token_key, secrets.token_hex(16), nx=True)
+        token = client.get(token_key).decode()
+
+        post_ids_by_visits = defaultdict(list)
+        for post_id, visits in client.hgetall(flushing_key).items():
+            post_ids_by_visits[int(visits)].append(int(post_id))
+
+        applied = _apply(token, post_ids_by_visits)
+        client.delete(flushing_key, token_key)
+        if not applied:
+            return 0
+        return sum(len(post_ids) for post_ids in post_ids_by_visits.values())
+    finally:
+        _release_lock(client, lock_key, lock_token)
+
+
+def start_flush_timer(interval: int):
+    """Flush visits every `interval` seconds in a daemon thread.
+
+    Args:
+        interval (int): seconds between two flushes.
+    """
+
+    def run():
+        try:
+            flush_visits()
+        except Exception as e:  # pylint: disable=broad-except
+            logging.error(str(e))
+        start_flush_timer(interval)
+
+    timer = threading.Timer(interval, run)
+    timer.daemon = True
+    timer.start()
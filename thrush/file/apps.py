@@ -0,0 +1,9 @@
+"""File apps config."""
+from django.apps import AppConfig
+
+
+class FileConfig(AppConfig):
+    """File app config class."""
+
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "file"
@@ -0,0 +1,142 @@
+"""Media downloads.
+
+Files are served with their ETag, and single "Range" requests are answered
+with partial content, so audio can be streamed and seeked. With
+`MEDIA_ACCEL_REDIRECT_URL`, nginx serves the bytes from its internal location
+of `MEDIA_ROOT` after Django checked the request, see "X-Accel-Redirect".
+Otherwise `FileResponse` streams them, and WSGI servers providing
+`wsgi.file_wrapper`, e.g. gunicorn, send them with `os.sendfile`.
+
+ETags have the format of nginx's, so both ways agree on them.
+"""
+import mimetypes
+import os
+import pathlib
+import re
+from typing import Optional, Tuple
+from urllib.parse import quote, urljoin
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_etags
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class _FileRange:
+    """File-like object reading a range of a file, for `FileResponse`.
+
+    Servers sending the file by its `fileno` start at its current offset, and
+    stop at the "Content-Length" of the range.
+    """
+
+    def __init__(self, file, start: int, length: int):
+        file.seek(start)
+        self.file = file
+        self.name = file.name
+        self.remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        """Read at most size bytes of the range."""
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self) -> int:
+        """Get the file descriptor of the file."""
+        return self.file.fileno()
+
+    def close(self):
+        """Close the file."""
+        self.file.close()
+
+
+def get_etag(node_stat: os.stat_result) -> str:
+    """Get the entity tag of a file, from its modification time and size."""
+    return f'"{int(node_stat.st_mtime):x}-{node_stat.st_size:x}"'
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single bytes range into its start and length.
+
+    Returns:
+        tuple: start and length, or None if the whole file should be served.
+
+    Raises:
+        ValueError: if the range can't be satisfied.
+    """
+    match = RANGE_RE.match(header.replace(" ", ""))
+    if not match or match.groups() == ("", ""):
+        # Other units, multiple ranges and invalid ones are ignored.
+        return None
+    first, last = match.groups()
+    if not first:
+        suffix = int(last)
+        if not suffix or not size:
+            raise ValueError
+        return max(size - suffix, 0), min(suffix, size)
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError
+    return start, end - start + 1
+
+
+def serve(request, path: pathlib.Path) -> HttpResponse:
+    """Serve a media file, or a range of it.
+
+    Args:
+        request (Request): download request.
+        path (pathlib.Path): path of the file.
+
+    Returns:
+        HttpResponse: file response.
+    """
+    node_stat = path.stat()
+    size = node_stat.st_size
+    etag = get_etag(node_stat)
+
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match and {"*", etag} & set(parse_etags(if_none_match)):
+        response = HttpResponseNotModified()
+        response["ETag"] = etag
+        return response
+
+    if settings.MEDIA_ACCEL_REDIRECT_URL:
+        # nginx answers the range and conditional headers itself.
+        response = HttpResponse(
+            content_type=mimetypes.guess_type(path.name)[0]
+            or "application/octet-stream"
+        )
+        response["X-Accel-Redirect"] = urljoin(
+            settings.MEDIA_ACCEL_REDIRECT_URL,
+            quote(path.relative_to(settings.MEDIA_ROOT).as_posix()),
+        )
+        return response
+
+    byte_range = None
+    range_header = request.headers.get("Range")
+    # A range of another version of the file gets the whole file.
+    if range_header and request.headers.get("If-Range", etag) == etag:
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    if byte_range:
+        start, length = byte_range
+        response = FileResponse(_FileRange(open(path, "rb"), start, length), status=206)
+        response["Content-Range"] = f"bytes {start}-{start + length - 1}/{size}"
+        response["Content-Length"] = length
+    else:
+        response = FileResponse(open(path, "rb"))
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(node_stat.st_mtime)
+    response["Accept-Ranges"] = "bytes"
+    return response
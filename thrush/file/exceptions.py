@@ -29,3 +29,43 @@ class InvalidPath(APIException):
     status_code = status.HTTP_400_BAD_REQUEST
     default_detail = "incorrect path."
     default_code = "bad_request"
+
+
+class QuotaExceeded(APIException):
+    """Storage quota exceeded exception."""
+
+    status_code = status.HTTP_507_INSUFFICIENT_STORAGE
+    default_detail = "storage quota exceeded."
+    default_code = "quota_exceeded"
+
+
+class UploadNotFound(APIException):
+    """Chunked upload doesn't exist or expired exception."""
+
+    status_code = status.HTTP_404_NOT_FOUND
+    default_detail = "upload not found."
+    default_code = "not_found"
+
+
+class InvalidChunk(APIException):
+    """Chunk offset or length doesn't match the upload exception."""
+
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = "invalid chunk offset or length."
+    default_code = "bad_request"
+
+
+class IncompleteUpload(APIException):
+    """Chunked upload is missing chunks exception."""
+
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "some chunks of the upload are missing."
+    default_code = "conflict"
+
+
+class ChecksumMismatch(APIException):
+    """Uploaded file doesn't match its checksum exception."""
+
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = "the uploaded file doesn't match its checksum."
+    default_code = "bad_request"
@@ -0,0 +1,324 @@
+"""Media index.
+
+Every node of a user's media directory has a `MediaNode` row, so listing,
+searching and sizing a tree are index lookups instead of walks. `FileAPIView`
+updates the rows of the nodes it uploads, creates, renames, copies, moves or
+deletes. Changes made to the tree by other means are picked up by
+`reconcile`, e.g. with the "reconcile_media_index" command.
+
+The storage used by each user is counted in `MediaUsage` by the same updates,
+so quotas are checked without summing the index nor walking the tree. Writes
+reserve their bytes and files first, with a conditional UPDATE of the counters,
+so concurrent writes can't exceed a quota together. The reservation is settled
+by indexing the written node, or released if the write fails. Pending chunked
+uploads hold theirs until they are finished or removed, see `file.uploads`.
+"""
+import os
+import pathlib
+import stat
+from typing import Dict, Iterable, Iterator, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import CharField, Count, F, Q, Sum, Value
+from django.db.models.functions import Concat, Substr
+
+from .exceptions import QuotaExceeded
+from .models import MediaNode, MediaUsage
+
+
+def get_user_path(user_id: int) -> pathlib.Path:
+    """Get the media directory of a user."""
+    return settings.MEDIA_ROOT / str(user_id)
+
+
+def get_uploads_path() -> pathlib.Path:
+    """Get the directory of the files being uploaded, named "<user ID>-<ID>"."""
+    return settings.MEDIA_ROOT / ".uploads"
+
+
+def relative_path(user_id: int, path: pathlib.Path) -> str:
+    """Get the path of a node relative to its user's media directory."""
+    relative = path.relative_to(get_user_path(user_id)).as_posix()
+    return "" if relative == "." else relative
+
+
+def _subtree(relative: str) -> Q:
+    """Filter a node and the nodes under it."""
+    if not relative:
+        return Q()
+    return Q(path=relative) | Q(path__startswith=f"{relative}/")
+
+
+def _node(user_id: int, relative: str, node_stat: os.stat_result) -> MediaNode:
+    """Make the index entry of a node from its stat."""
+    parent, _, name = relative.rpartition("/")
+    is_dir = stat.S_ISDIR(node_stat.st_mode)
+    return MediaNode(
+        user_id=user_id,
+        path=relative,
+        parent=parent,
+        name=name,
+        extension="" if is_dir else pathlib.PurePath(name).suffix[1:33].lower(),
+        is_dir=is_dir,
+        size=0 if is_dir else node_stat.st_size,
+        mtime_ns=node_stat.st_mtime_ns,
+    )
+
+
+def _scan(user_id: int, directory: pathlib.Path) -> Iterator[MediaNode]:
+    """Make the index entries of the tree under a directory."""
+    stack = [(directory.as_posix(), relative_path(user_id, directory))]
+    while stack:
+        directory_path, directory_relative = stack.pop()
+        with os.scandir(directory_path) as entries:
+            for entry in entries:
+                relative = (
+                    f"{directory_relative}/{entry.name}"
+                    if directory_relative
+                    else entry.name
+                )
+                node = _node(user_id, relative, entry.stat(follow_symlinks=False))
+                if node.is_dir:
+                    stack.append((entry.path, relative))
+                yield node
+
+
+def _usage(user_id: int, relative: str) -> Tuple[int, int]:
+    """Get the size and number of files of the indexed tree of a node."""
+    usage = MediaNode.objects.filter(_subtree(relative), user_id=user_id).aggregate(
+        size=Sum("size"), files=Count("id", filter=Q(is_dir=False))
+    )
+    return usage["size"] or 0, usage["files"]
+
+
+def _nodes_usage(nodes: Iterable[MediaNode]) -> Tuple[int, int]:
+    """Get the size and number of files of index entries."""
+    return (
+        sum(node.size for node in nodes),
+        sum(not node.is_dir for node in nodes),
+    )
+
+
+def _add_usage(user_id: int, size: int, files: int):
+    """Add to the storage used by a user."""
+    if not size and not files:
+        return
+    usage = MediaUsage.objects.filter(user_id=user_id)
+    changes = {"size": F("size") + size, "files": F("files") + files}
+    if not usage.update(**changes):
+        MediaUsage.objects.get_or_create(user_id=user_id)
+        usage.update(**changes)
+
+
+def get_usage(user_id: int) -> MediaUsage:
+    """Get the storage used by a user."""
+    return MediaUsage.objects.filter(user_id=user_id).first() or MediaUsage(
+        user_id=user_id
+    )
+
+
+def _within_quota(size: int, files: int) -> Q:
+    """Filter the usages which can store more bytes and files."""
+    within = Q()
+    if settings.MEDIA_QUOTA_BYTES:
+        within &= Q(size__lte=settings.MEDIA_QUOTA_BYTES - size)
+    if settings.MEDIA_QUOTA_FILES:
+        within &= Q(files__lte=settings.MEDIA_QUOTA_FILES - files)
+    return within
+
+
+def reserve_quota(user_id: int, size: int, files: int) -> Tuple[int, int]:
+    """Reserve storage for bytes and files a user is about to store.
+
+    Args:
+        user_id (int): user ID.
+        size (int): added bytes.
+        files (int): added files.
+
+    Returns:
+        tuple: reserved bytes and files, see `index_path` and `release_quota`.
+
+    Raises:
+        QuotaExceeded: if the storage quota of the user would be exceeded.
+    """
+    usage = MediaUsage.objects.filter(_within_quota(size, files), user_id=user_id)
+    changes = {"size": F("size") + size, "files": F("files") + files}
+    if not usage.update(**changes):
+        # The row may be missing, or created meanwhile by a concurrent request.
+        MediaUsage.objects.get_or_create(user_id=user_id)
+        if not usage.update(**changes):
+            raise QuotaExceeded
+    return size, files
+
+
+def release_quota(user_id: int, size: int, files: int):
+    """Give back reserved storage, e.g. when a write failed."""
+    _add_usage(user_id, -size, -files)
+
+
+def reserve_copy_quota(user_id: int, path: pathlib.Path) -> Tuple[int, int]:
+    """Reserve storage for a copy of a node, sized from the index.
+
+    Raises:
+        QuotaExceeded: if the storage quota of the user would be exceeded.
+    """
+    return reserve_quota(user_id, *_usage(user_id, relative_path(user_id, path)))
+
+
+def recompute_usage(user_id: int) -> MediaUsage:
+    """Recompute the storage used by a user from the index and pending uploads.
+
+    Args:
+        user_id (int): user ID.
+
+    Returns:
+        MediaUsage: storage used by the user.
+    """
+    size, files = _usage(user_id, "")
+    for part in get_uploads_path().glob(f"{user_id}-*"):
+        size += part.stat().st_size
+        files += 1
+    usage, _ = MediaUsage.objects.update_or_create(
+        user_id=user_id, defaults={"size": size, "files": files}
+    )
+    return usage
+
+
+def _refresh_parent(user_id: int, relative: str):
+    """Update the modification time of the parent directory of a node."""
+    parent = relative.rpartition("/")[0]
+    if parent:
+        MediaNode.objects.filter(user_id=user_id, path=parent).update(
+            mtime_ns=(get_user_path(user_id) / parent).stat().st_mtime_ns
+        )
+
+
+def index_path(
+    user_id: int,
+    path: pathlib.Path,
+    batch_size: int = 1000,
+    reserved: Tuple[int, int] = (0, 0),
+):
+    """Index a new node, and its tree for a directory.
+
+    Args:
+        user_id (int): user ID.
+        path (pathlib.Path): path of the node.
+        batch_size (int): nodes inserted per query.
+        reserved (tuple): bytes and files reserved for the node, already counted.
+    """
+    relative = relative_path(user_id, path)
+    nodes = [_node(user_id, relative, path.stat())]
+    if nodes[0].is_dir:
+        nodes += _scan(user_id, path)
+    size, files = _nodes_usage(nodes)
+    with transaction.atomic():
+        removed_size, removed_files = _usage(user_id, relative)
+        MediaNode.objects.filter(_subtree(relative), user_id=user_id).delete()
+        MediaNode.objects.bulk_create(nodes, batch_size=batch_size)
+        _add_usage(
+            user_id,
+            size - removed_size - reserved[0],
+            files - removed_files - reserved[1],
+        )
+        _refresh_parent(user_id, relative)
+
+
+def unindex_path(user_id: int, path: pathlib.Path):
+    """Remove a deleted node, and its tree for a directory, from the index.
+
+    Args:
+        user_id (int): user ID.
+        path (pathlib.Path): path of the node.
+    """
+    relative = relative_path(user_id, path)
+    with transaction.atomic():
+        size, files = _usage(user_id, relative)
+        MediaNode.objects.filter(_subtree(relative), user_id=user_id).delete()
+        _add_usage(user_id, -size, -files)
+        _refresh_parent(user_id, relative)
+
+
+def move_path(user_id: int, source: pathlib.Path, destination: pathlib.Path):
+    """Move the index entries of a renamed or moved node and its tree.
+
+    The entries under a directory are updated in place, their files are neither
+    listed nor stat-ed.
+
+    Args:
+        user_id (int): user ID.
+        source (pathlib.Path): old path of the node.
+        destination (pathlib.Path): new path of the node.
+    """
+    old = relative_path(user_id, source)
+    new = relative_path(user_id, destination)
+    node = _node(user_id, new, destination.stat())
+    with transaction.atomic():
+        stale_size, stale_files = _usage(user_id, new)
+        MediaNode.objects.filter(_subtree(new), user_id=user_id).delete()
+        MediaNode.objects.filter(user_id=user_id, path__startswith=f"{old}/").update(
+            # `Substr` is 1-based, so it keeps the "/" after the old path.
+            path=Concat(
+                Value(new), Substr("path", len(old) + 1), output_field=CharField()
+            ),
+            parent=Concat(
+                Value(new), Substr("parent", len(old) + 1), output_field=CharField()
+            ),
+        )
+        old_nodes = MediaNode.objects.filter(user_id=user_id, path=old)
+        old_size, old_files = _nodes_usage(old_nodes)
+        old_nodes.delete()
+        node.save()
+        # The usage only changes by stale entries or an outdated moved node.
+        size, files = _nodes_usage([node])
+        _add_usage(
+            user_id, size - old_size - stale_size, files - old_files - stale_files
+        )
+        _refresh_parent(user_id, old)
+        _refresh_parent(user_id, new)
+
+
+def reconcile(user_id: int, batch_size: int = 1000) -> Dict[str, int]:
+    """Update the index of a user's media directory from its tree.
+
+    Nodes are compared with their entries by type, size and modification time,
+    only the new, changed and removed ones are written. The storage used by
+    the user is recomputed afterwards.
+
+    Args:
+        user_id (int): user ID.
+        batch_size (int): nodes written per query.
+
+    Returns:
+        dict: numbers of "created", "updated" and "deleted" entries.
+    """
+    indexed = {
+        path: values
+        for path, *values in MediaNode.objects.filter(user_id=user_id)
+        .values_list("path", "id", "is_dir", "size", "mtime_ns")
+        .iterator()
+    }
+    created, updated = [], []
+    user_path = get_user_path(user_id)
+    nodes = _scan(user_id, user_path) if user_path.is_dir() else []
+    for node in nodes:
+        values = indexed.pop(node.path, None)
+        if values is None:
+            created.append(node)
+        elif values[1:] != [node.is_dir, node.size, node.mtime_ns]:
+            node.id = values[0]
+            updated.append(node)
+    deleted = [values[0] for values in indexed.values()]
+
+    with transaction.atomic():
+        MediaNode.objects.bulk_create(created, batch_size=batch_size)
+        MediaNode.objects.bulk_update(
+            updated, ["extension", "is_dir", "size", "mtime_ns"], batch_size=batch_size
+        )
+        for start in range(0, len(deleted), batch_size):
+            MediaNode.objects.filter(
+                id__in=deleted[start : start + batch_size]
+            ).delete()
+        recompute_usage(user_id)
+    return {"created": len(created), "updated": len(updated), "deleted": len(deleted)}
@@ -0,0 +1,12 @@
+"""Remove the files of the expired chunked uploads."""
+from django.core.management.base import BaseCommand
+
+from file.uploads import clean_uploads
+
+
+class Command(BaseCommand):
+
+    help = "Remove the files of the chunked uploads which expired unfinished."
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write(f"Finished, {clean_uploads()} expired uploads removed.")
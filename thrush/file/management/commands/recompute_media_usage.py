@@ -0,0 +1,40 @@
+"""Recompute the storage used by the users from the media index."""
+from django.core.management.base import BaseCommand
+
+from file.index import recompute_usage
+from file.models import MediaNode, MediaUsage
+
+
+class Command(BaseCommand):
+
+    help = (
+        "Recompute the storage usage counters of the users from the media index,"
+        " run 'reconcile_media_index' first if the index itself drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=int,
+            action="append",
+            default=[],
+            help="ID of a user to recompute, all the users by default.",
+        )
+
+    def handle(self, *args, **kwargs):
+        user_ids = set(kwargs["user"])
+        if not user_ids:
+            user_ids.update(MediaUsage.objects.values_list("user_id", flat=True))
+            user_ids.update(
+                MediaNode.objects.order_by()
+                .values_list("user_id", flat=True)
+                .distinct()
+            )
+
+        for user_id in sorted(user_ids):
+            usage = recompute_usage(user_id)
+            self.stdout.write(
+                f"Recomputing user {user_id}..."
+                f" {self.style.SUCCESS(usage.size)} bytes, {usage.files} files."
+            )
+        self.stdout.write(f"Finished, {len(user_ids)} users recomputed.")
@@ -0,0 +1,51 @@
+"""Reconcile the media index with the media directories."""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from file.index import reconcile
+
+
+class Command(BaseCommand):
+
+    help = "Update the media index from the users' media directories."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=int,
+            action="append",
+            default=[],
+            help="ID of a user to reconcile, all the users with a directory by default.",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Nodes written at once."
+        )
+
+    def handle(self, *args, **kwargs):
+        user_ids = kwargs["user"]
+        if not user_ids and settings.MEDIA_ROOT.is_dir():
+            user_ids = [
+                int(path.name)
+                for path in settings.MEDIA_ROOT.iterdir()
+                if path.is_dir() and path.name.isdigit()
+            ]
+        user_ids = (
+            get_user_model()
+            .objects.filter(id__in=user_ids)
+            .values_list("id", flat=True)
+        )
+
+        totals = {"created": 0, "updated": 0, "deleted": 0}
+        for user_id in user_ids:
+            changes = reconcile(user_id, kwargs["batch_size"])
+            for change, count in changes.items():
+                totals[change] += count
+            self.stdout.write(
+                f"Reconciling user {user_id}..."
+                f" {self.style.SUCCESS(sum(changes.values()))} entries changed."
+            )
+        self.stdout.write(
+            "Finished, {created} created, {updated} updated and {deleted} deleted"
+            " entries.".format(**totals)
+        )
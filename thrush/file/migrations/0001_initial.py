@@ -0,0 +1,55 @@
+# Generated by Django 4.0.1 on 2026-10-18 20:28
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('account', '0003_address_keyset_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaNode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=1024)),
+                ('parent', models.CharField(max_length=1024)),
+                ('name', models.CharField(max_length=255)),
+                ('extension', models.CharField(blank=True, max_length=32)),
+                ('is_dir', models.BooleanField(default=False)),
+                ('size', models.BigIntegerField(default=0)),
+                ('mtime_ns', models.BigIntegerField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='media_nodes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['path'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='medianode',
+            index=models.Index(fields=['user', 'path'], name='medianode_subtree_idx', opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='medianode',
+            index=models.Index(fields=['user', 'parent', 'name'], name='medianode_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medianode',
+            index=models.Index(fields=['user', 'parent', 'size', 'id'], name='medianode_size_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medianode',
+            index=models.Index(fields=['user', 'parent', 'mtime_ns', 'id'], name='medianode_mtime_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='medianode',
+            constraint=models.UniqueConstraint(fields=('user', 'path'), name='medianode_user_path_uniq'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.0.1 on 2026-10-18 20:51
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0003_address_keyset_idx'),
+        ('file', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaUsage',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='media_usage', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('size', models.BigIntegerField(default=0)),
+                ('files', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
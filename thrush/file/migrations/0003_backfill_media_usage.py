@@ -0,0 +1,29 @@
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+
+
+def backfill_media_usage(apps, schema_editor):
+    """Count the storage of the users already in the media index."""
+    MediaNode = apps.get_model("file", "MediaNode")
+    MediaUsage = apps.get_model("file", "MediaUsage")
+    usages = (
+        MediaNode.objects.order_by()
+        .values("user_id")
+        .annotate(size=Sum("size"), files=Count("id", filter=Q(is_dir=False)))
+    )
+    for usage in usages.iterator():
+        MediaUsage.objects.update_or_create(
+            user_id=usage["user_id"],
+            defaults={"size": usage["size"] or 0, "files": usage["files"]},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("file", "0002_mediausage"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_media_usage, migrations.RunPython.noop),
+    ]
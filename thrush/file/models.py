@@ -0,0 +1,68 @@
+"""File app models."""
+from django.conf import settings
+from django.db import models
+
+
+class MediaNode(models.Model):
+    """Index entry of a file or directory of a user's media directory.
+
+    See `file.index` for keeping the index in sync with the tree.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="media_nodes"
+    )
+    # Paths are relative to the user's media directory, e.g. "folder/file.txt".
+    path = models.CharField(max_length=1024)
+    parent = models.CharField(max_length=1024)
+    name = models.CharField(max_length=255)
+    extension = models.CharField(max_length=32, blank=True)
+    is_dir = models.BooleanField(default=False)
+    size = models.BigIntegerField(default=0)
+    mtime_ns = models.BigIntegerField()
+
+    class Meta:
+        ordering = ["path"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "path"], name="medianode_user_path_uniq"
+            ),
+        ]
+        indexes = [
+            # Subtree lookups, `path__startswith` on PostgreSQL.
+            models.Index(
+                fields=["user", "path"],
+                name="medianode_subtree_idx",
+                opclasses=["int8_ops", "varchar_pattern_ops"],
+            ),
+            # Directory listings, by name, size or modification time.
+            models.Index(fields=["user", "parent", "name"], name="medianode_name_idx"),
+            models.Index(
+                fields=["user", "parent", "size", "id"], name="medianode_size_idx"
+            ),
+            models.Index(
+                fields=["user", "parent", "mtime_ns", "id"], name="medianode_mtime_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return self.path
+
+
+class MediaUsage(models.Model):
+    """Storage used by a user's media directory.
+
+    The counters are updated with the media index, see `file.index`.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="media_usage",
+    )
+    size = models.BigIntegerField(default=0)
+    files = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.size} bytes, {self.files} files"
@@ -0,0 +1,22 @@
+"""File renderers."""
+import json
+
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+
+class NDJSONRenderer(renderers.BaseRenderer):
+    """Newline delimited JSON renderer, one line per item of a list."""
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """DRF built-in method."""
+        if data is None:
+            return b""
+        items = data if isinstance(data, list) else [data]
+        return "".join(
+            json.dumps(item, cls=encoders.JSONEncoder) + "\n" for item in items
+        ).encode()
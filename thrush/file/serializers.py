@@ -1,6 +1,11 @@
 """File serializers."""
+from django.conf import settings
+from django.core import validators
+from django.core.files import File
 from rest_framework import serializers
 
+from .uploads import MIN_CHUNK_SIZE
+
 # List of valid actions.
 ACTIONS = (
     ("new_folder", "new_folder"),
@@ -69,3 +74,42 @@ class MoveActionSerializer(serializers.Serializer):
 
     source = serializers.CharField(max_length=255)
     destination = serializers.CharField(max_length=1024)
+
+
+class UploadSerializer(serializers.Serializer):
+    """Chunked upload start serializer."""
+
+    path = serializers.CharField(
+        max_length=1024,
+        allow_blank=True,
+        default="",
+        help_text="directory of the file.",
+    )
+    name = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=1)
+    chunk_size = serializers.IntegerField(
+        min_value=MIN_CHUNK_SIZE,
+        max_value=settings.MEDIA_UPLOAD_CHUNK_SIZE,
+        default=settings.MEDIA_UPLOAD_CHUNK_SIZE,
+    )
+
+    def validate_path(self, path):
+        """Validate path, relative to the user's media directory."""
+        if ".." in path or path.startswith("/"):
+            raise serializers.ValidationError("invalid path")
+        return path
+
+    def validate_name(self, name):
+        """Validate name."""
+        if "/" in name or ".." in name:
+            raise serializers.ValidationError("invalid name")
+        validators.FileExtensionValidator(
+            allowed_extensions=settings.MEDIA_ALLOWED_EXTENSIONS
+        )(File(None, name))
+        return name
+
+
+class UploadFinishSerializer(serializers.Serializer):
+    """Chunked upload finish serializer."""
+
+    sha256 = serializers.RegexField(r"^[0-9a-fA-F]{64}$", help_text="hex SHA-256.")
@@ -0,0 +1,21 @@
+"""Media storage URL.
+
+Included under their own prefix, out of the user paths of the file manager.
+"""
+from django.urls import path
+
+from .views import (
+    DownloadAPIView,
+    MediaUsageAPIView,
+    UploadAPIView,
+    UploadChunkAPIView,
+)
+
+urlpatterns = [
+    path("usage/", MediaUsageAPIView.as_view(), name="usage"),
+    path("uploads/", UploadAPIView.as_view(), name="uploads"),
+    path(
+        "uploads/<str:upload_id>/", UploadChunkAPIView.as_view(), name="upload_chunks"
+    ),
+    path("download/<path:path>", DownloadAPIView.as_view(), name="download"),
+]
@@ -1,6 +1,705 @@
-from django.test import TestCase
+"""File tests."""
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from base.tests import BaseAPITestCase
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from account.models import User
+from file.exceptions import QuotaExceeded
+from file.index import (
+    get_uploads_path,
+    reconcile,
+    recompute_usage,
+    release_quota,
+    reserve_quota,
+)
+from file.models import MediaNode, MediaUsage
+from file.uploads import MIN_CHUNK_SIZE
+
+
+class BaseFileTest(BaseAPITestCase):
+    """Base test case with a temporary media directory."""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=pathlib.Path(media_root.name))
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        Group.objects.get_or_create(name=settings.DEFAULT_USER_GROUP)
+        self.user = User.objects.create_user(username="user1", mobile="123")
+        self.client.force_authenticate(self.user)
+        self.directory = settings.MEDIA_ROOT / str(self.user.id) / "folder"
+        self.directory.mkdir(parents=True)
+
+    def _create_files(self, count):
+        for index in range(count):
+            with open(self.directory / f"file{index:06}.txt", "w") as file:
+                file.write("content")
+
+
+@override_settings(MEDIA_LISTING_PAGE_SIZE=10)
+class DirectoryListingTest(BaseFileTest):
+    """Test listing directories."""
+
+    def test_list_pages(self):
+        self._create_files(23)
+        (self.directory / "sub").mkdir()
+
+        names, url = [], reverse("file:node", args=["folder"])
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            names += [node["name"] for node in response.json()["result"]]
+            url = response.json()["next"]
+        self.assertEqual(names, sorted(os.listdir(self.directory)))
+
+        response = self.client.get(
+            reverse("file:node", args=["folder"]) + "?cursor=file000022.txt"
+        )
+        (node,) = response.json()["result"]
+        self.assertEqual(node["type"], "directory")
+        self.assertEqual(node["size"], {"bytes": 0, "readable": ""})
+        self.assertIsNone(response.json()["next"])
+
+    def test_file_info(self):
+        self._create_files(1)
+        response = self.client.get(reverse("file:node", args=["folder/file000000.txt"]))
+        self.assertEqual(
+            response.json()["result"],
+            {
+                "link": f"{self.user.id}/folder/file000000.txt",
+                "url": reverse("storage:download", args=["folder/file000000.txt"]),
+                "name": "file000000.txt",
+                "size": {"bytes": 7, "readable": "7 bytes"},
+                "type": "file",
+            },
+        )
+
+    def test_stream(self):
+        self._create_files(25)
+        response = self.client.get(
+            reverse("file:node", args=["folder"]), HTTP_ACCEPT="application/x-ndjson"
+        )
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        nodes = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).decode().splitlines()
+        ]
+        self.assertEqual(len(nodes), 25)
+        self.assertEqual({node["size"]["bytes"] for node in nodes}, {7})
+
+
+class BaseMediaIndexTest(BaseFileTest):
+    """Base test case of the media index and usage."""
+
+    def setUp(self):
+        super().setUp()
+        reconcile(self.user.id)
+
+    def _action(self, action, params, path=""):
+        url = reverse("file:node", args=[path]) if path else reverse("file:root")
+        response = self.client.post(
+            url, {"action": action, "params": params}, format="json"
+        )
+        self.assertIn(response.status_code, (200, 201))
+
+    def _upload(self, name, path=""):
+        url = reverse("file:node", args=[path]) if path else reverse("file:root")
+        upload = SimpleUploadedFile(name, b"content of " + name.encode())
+        response = self.client.post(url, {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, 201)
+
+    def _indexed_paths(self):
+        return set(
+            MediaNode.objects.filter(user=self.user).values_list("path", flat=True)
+        )
+
+    def _tree_paths(self):
+        user_path = settings.MEDIA_ROOT / str(self.user.id)
+        return {path.relative_to(user_path).as_posix() for path in user_path.rglob("*")}
+
+
+class MediaIndexTest(BaseMediaIndexTest):
+    """Test the media index."""
+
+    def test_actions(self):
+        self._upload("a.png")
+        self._action("new_folder", {"name": "docs"})
+        self._upload("b.png", "docs")
+        self._upload("c.jpg", "docs")
+        self._action("rename", {"old_name": "docs", "new_name": "papers"})
+        self._action("new_folder", {"name": "archive"})
+        self._action("copy", {"source": "papers", "destination": "archive"})
+        self._action("move", {"source": "a.png", "destination": "archive"})
+        self._action("rename", {"old_name": "b.png", "new_name": "d.png"}, "papers")
+        response = self.client.delete(reverse("file:node", args=["papers/c.jpg"]))
+        self.assertEqual(response.status_code, 204)
+
+        self.assertEqual(self._indexed_paths(), self._tree_paths())
+        self.assertEqual(
+            reconcile(self.user.id), {"created": 0, "updated": 0, "deleted": 0}
+        )
+        node = MediaNode.objects.get(user=self.user, path="archive/papers/c.jpg")
+        self.assertEqual(
+            (node.parent, node.name, node.extension, node.is_dir, node.size),
+            ("archive/papers", "c.jpg", "jpg", False, 16),
+        )
+
+        response = self.client.delete(reverse("file:node", args=["archive/papers"]))
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            self._indexed_paths(),
+            {"folder", "archive", "archive/a.png", "papers", "papers/d.png"},
+        )
+
+    def test_search(self):
+        self._action("new_folder", {"name": "docs"})
+        self._upload("photo.png")
+        self._upload("big-photo.png", "docs")
+        self._upload("photo.jpg", "docs")
+
+        response = self.client.get(reverse("file:root"), {"search": "PHOTO"})
+        self.assertEqual(
+            [node["link"] for node in response.json()["results"]],
+            [
+                f"{self.user.id}/docs/big-photo.png",
+                f"{self.user.id}/docs/photo.jpg",
+                f"{self.user.id}/photo.png",
+            ],
+        )
+
+        response = self.client.get(
+            reverse("file:node", args=["docs"]), {"ordering": "-size"}
+        )
+        self.assertEqual(
+            [node["name"] for node in response.json()["results"]],
+            ["big-photo.png", "photo.jpg"],
+        )
+
+        response = self.client.get(
+            reverse("file:root"), {"search": "photo", "extension": "PNG"}
+        )
+        self.assertEqual(len(response.json()["results"]), 2)
+        response = self.client.get(reverse("file:root"), {"type": "directory"})
+        self.assertEqual(
+            [node["name"] for node in response.json()["results"]], ["docs", "folder"]
+        )
+
+    def test_reconcile_command(self):
+        self._create_files(3)
+        call_command("reconcile_media_index", stdout=StringIO())
+        self.assertEqual(self._indexed_paths(), self._tree_paths())
+
+        (self.directory / "file000000.txt").unlink()
+        with open(self.directory / "file000001.txt", "a") as file:
+            file.write(" changed")
+        (self.directory / "sub").mkdir()
+        stdout = StringIO()
+        call_command("reconcile_media_index", user=[self.user.id], stdout=stdout)
+        self.assertEqual(self._indexed_paths(), self._tree_paths())
+        # The folder is updated by the added and deleted nodes.
+        self.assertIn("1 created, 2 updated and 1 deleted", stdout.getvalue())
+        self.assertEqual(MediaNode.objects.get(path="folder/file000001.txt").size, 15)
+
+
+class MediaUsageTest(BaseMediaIndexTest):
+    """Test the storage usage and quota."""
+
+    def _assert_usage(self, size, files):
+        response = self.client.get(reverse("storage:usage"))
+        self.assertEqual(response.json()["size"]["bytes"], size)
+        self.assertEqual(response.json()["files"], files)
+        self.assertEqual(
+            reconcile(self.user.id), {"created": 0, "updated": 0, "deleted": 0}
+        )
+        usage = MediaUsage.objects.get(user=self.user)
+        self.assertEqual((usage.size, usage.files), (size, files))
+
+    def test_usage(self):
+        response = self.client.get(reverse("storage:usage"))
+        self.assertEqual(
+            response.json(),
+            {
+                "size": {"bytes": 0, "readable": "0 bytes"},
+                "files": 0,
+                "quota": {"bytes": settings.MEDIA_QUOTA_BYTES, "files": None},
+            },
+        )
+
+        self._upload("a.png")
+        self._action("new_folder", {"name": "docs"})
+        self._upload("bb.png", "docs")
+        self._assert_usage(33, 2)
+
+        self._action("new_folder", {"name": "archive"})
+        self._action("copy", {"source": "docs", "destination": "archive"})
+        self._action("rename", {"old_name": "docs", "new_name": "papers"})
+        self._action("move", {"source": "a.png", "destination": "papers"})
+        self._assert_usage(50, 3)
+
+        response = self.client.delete(reverse("file:node", args=["archive/docs"]))
+        self.assertEqual(response.status_code, 204)
+        self._assert_usage(33, 2)
+
+    @override_settings(MEDIA_QUOTA_BYTES=40, MEDIA_QUOTA_FILES=2)
+    def test_quota(self):
+        self._upload("a.png")
+        self._action("new_folder", {"name": "docs"})
+        self._upload("b.png", "docs")
+
+        # Quota of bytes.
+        response = self.client.post(
+            reverse("file:root"),
+            {"file": SimpleUploadedFile("c.png", b"c" * 10)},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 507)
+        self.assertFalse((self.directory.parent / "c.png").exists())
+        response = self.client.post(
+            reverse("file:root"),
+            {"action": "copy", "params": {"source": "docs", "destination": "folder"}},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 507)
+        self.assertFalse((self.directory / "docs").exists())
+
+        # Quota of files.
+        with self.settings(MEDIA_QUOTA_BYTES=0):
+            response = self.client.post(
+                reverse("file:root"),
+                {"file": SimpleUploadedFile("c.png", b"c")},
+                format="multipart",
+            )
+            self.assertEqual(response.status_code, 507)
+
+        response = self.client.delete(reverse("file:node", args=["docs/b.png"]))
+        self.assertEqual(response.status_code, 204)
+        self._upload("c.png")
+
+    @override_settings(MEDIA_QUOTA_BYTES=40)
+    def test_reservation(self):
+        reserved = reserve_quota(self.user.id, 30, 1)
+        # Concurrent writes can't take the reserved storage.
+        with self.assertRaises(QuotaExceeded):
+            reserve_quota(self.user.id, 20, 1)
+        response = self.client.post(
+            reverse("file:root"),
+            {"file": SimpleUploadedFile("a.png", b"a" * 20)},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 507)
+
+        release_quota(self.user.id, *reserved)
+        self._upload("a.png")
+        self._assert_usage(16, 1)
+
+        # A failed copy releases its reservation.
+        with patch("shutil.copy", side_effect=OSError), self.assertRaises(
+            OSError
+        ):
+            self.client.post(
+                reverse("file:root"),
+                {
+                    "action": "copy",
+                    "params": {"source": "a.png", "destination": "folder"},
+                },
+                format="json",
+            )
+        self._assert_usage(16, 1)
+
+    def test_reservation_race(self):
+        get_or_create = MediaUsage.objects.get_or_create
+
+        def create_concurrently(**kwargs):
+            MediaUsage.objects.create(**kwargs)
+            return get_or_create(**kwargs)
+
+        # The request losing the race to create the counters still reserves.
+        with patch.object(
+            MediaUsage.objects, "get_or_create", side_effect=create_concurrently
+        ):
+            self.assertEqual(reserve_quota(self.user.id, 10, 1), (10, 1))
+        usage = MediaUsage.objects.get(user=self.user)
+        self.assertEqual((usage.size, usage.files), (10, 1))
+
+    def test_user_paths(self):
+        # Storage routes don't shadow the user's nodes.
+        self._action("new_folder", {"name": "usage"})
+        self._upload("a.png", "usage")
+        response = self.client.get(reverse("file:node", args=["usage"]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [node["name"] for node in response.json()["result"]], ["a.png"]
+        )
+
+    def test_recompute_command(self):
+        self._upload("a.png")
+        MediaUsage.objects.filter(user=self.user).update(size=5, files=7)
+        stdout = StringIO()
+        call_command("recompute_media_usage", stdout=stdout)
+        self.assertIn("Finished, 1 users recomputed.", stdout.getvalue())
+        usage = MediaUsage.objects.get(user=self.user)
+        self.assertEqual((usage.size, usage.files), (16, 1))
+
+
+class ChunkedUploadTest(BaseMediaIndexTest):
+    """Test resumable chunked uploads."""
+
+    # Two chunks and 5 bytes.
+    content = b"0123456789" * (MIN_CHUNK_SIZE // 5) + b"01234"
+
+    def _start(self, **data):
+        response = self.client.post(
+            reverse("storage:uploads"),
+            {
+                "path": "folder",
+                "name": "image.png",
+                "size": len(self.content),
+                "chunk_size": MIN_CHUNK_SIZE,
+                **data,
+            },
+            format="json",
+        )
+        return response
+
+    def _part_path(self, upload_id):
+        return get_uploads_path() / f"{self.user.id}-{upload_id}"
+
+    def _usage(self):
+        usage = MediaUsage.objects.get(user=self.user)
+        return usage.size, usage.files
+
+    def _put(self, upload_id, offset, data, client=None):
+        return (client or self.client).put(
+            reverse("storage:upload_chunks", args=[upload_id]) + f"?offset={offset}",
+            data,
+            content_type="application/octet-stream",
+        )
+
+    def _put_all(self, upload_id):
+        for offset in range(0, len(self.content), MIN_CHUNK_SIZE):
+            self._put(upload_id, offset, self.content[offset:][:MIN_CHUNK_SIZE])
+
+    def _finish(self, upload_id, sha256):
+        return self.client.post(
+            reverse("storage:upload_chunks", args=[upload_id]),
+            {"sha256": sha256},
+            format="json",
+        )
+
+    def test_upload(self):
+        response = self._start()
+        self.assertEqual(response.status_code, 201)
+        upload_id = response.json()["id"]
+        self.assertEqual(response.json()["missing"], [0, 1, 2])
+        self.assertEqual(self._part_path(upload_id).stat().st_size, len(self.content))
+        # The pending upload is counted in the usage.
+        self.assertEqual(self._usage(), (len(self.content), 1))
+        self.assertEqual(recompute_usage(self.user.id).size, len(self.content))
+
+        chunk = MIN_CHUNK_SIZE
+        response = self._put(upload_id, 2 * chunk, self.content[2 * chunk :])
+        self.assertEqual(response.json(), {"received": 1})
+        response = self._put(upload_id, chunk, self.content[chunk : 2 * chunk])
+        self.assertEqual(response.json(), {"received": 2})
+        sha256 = hashlib.sha256(self.content).hexdigest()
+        self.assertEqual(self._finish(upload_id, sha256).status_code, 409)
+
+        # Resuming.
+        response = self.client.get(reverse("storage:upload_chunks", args=[upload_id]))
+        self.assertEqual(response.json()["missing"], [0])
+        self._put(upload_id, 0, self.content[:chunk])
+        self.assertEqual(self._finish(upload_id, "0" * 64).status_code, 400)
+
+        response = self._finish(upload_id, sha256)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["link"], f"{self.user.id}/folder/image.png")
+        self.assertEqual((self.directory / "image.png").read_bytes(), self.content)
+        self.assertFalse(self._part_path(upload_id).exists())
+        self.assertEqual(self._indexed_paths(), self._tree_paths())
+        self.assertEqual(self._usage(), (len(self.content), 1))
+        self.assertEqual(self._finish(upload_id, sha256).status_code, 404)
+
+    def test_invalid(self):
+        self.assertEqual(self._start(name="../image.png").status_code, 400)
+        self.assertEqual(self._start(name="file.exe").status_code, 400)
+        self.assertEqual(self._start(path="missing").status_code, 400)
+        self.assertEqual(self._start(path=str(self.directory)).status_code, 400)
+        self.assertEqual(self._start(chunk_size=MIN_CHUNK_SIZE - 1).status_code, 400)
+        (self.directory / "image.png").touch()
+        self.assertEqual(self._start().status_code, 409)
+        with self.settings(MEDIA_QUOTA_BYTES=len(self.content) * 3 // 2):
+            upload_id = self._start(name="other.png").json()["id"]
+            # The pending upload is reserved against the quota.
+            self.assertEqual(self._start(name="third.png").status_code, 507)
+
+        chunk = MIN_CHUNK_SIZE
+        self.assertEqual(self._put(upload_id, 5, b"0123456789").status_code, 400)
+        self.assertEqual(
+            self._put(upload_id, 2 * chunk, b"0123456789").status_code, 400
+        )
+        self.assertEqual(self._put(upload_id, 3 * chunk, b"01234").status_code, 400)
+        other_client = APIClient()
+        other_client.force_authenticate(
+            User.objects.create_user(username="user2", mobile="456")
+        )
+        response = self._put(upload_id, 0, b"0123456789", other_client)
+        self.assertEqual(response.status_code, 404)
+
+    def test_finish_failures(self):
+        upload_id = self._start().json()["id"]
+        self._put_all(upload_id)
+        sha256 = hashlib.sha256(self.content).hexdigest()
+        link = os.link
+        target = self.directory / "image.png"
+
+        def link_after_other(source, destination):
+            target.write_bytes(b"other")
+            link(source, destination)
+
+        # A node created meanwhile isn't replaced.
+        with patch("os.link", side_effect=link_after_other):
+            self.assertEqual(self._finish(upload_id, sha256).status_code, 409)
+        self.assertEqual(target.read_bytes(), b"other")
+        self.assertFalse(self._part_path(upload_id).exists())
+        self.assertEqual(self._usage(), (0, 0))
+
+        # A failed indexing releases the reservation.
+        target.unlink()
+        upload_id = self._start().json()["id"]
+        self._put_all(upload_id)
+        with patch("file.index.index_path", side_effect=OSError), self.assertRaises(
+            OSError
+        ):
+            self._finish(upload_id, sha256)
+        self.assertEqual(self._usage(), (0, 0))
+
+    def test_abort_and_clean(self):
+        aborted_id = self._start().json()["id"]
+        expired_id = self._start(name="other.png").json()["id"]
+        self.assertEqual(self._usage(), (2 * len(self.content), 2))
+        response = self.client.delete(
+            reverse("storage:upload_chunks", args=[aborted_id])
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            list(get_uploads_path().iterdir()), [self._part_path(expired_id)]
+        )
+        self.assertEqual(self._usage(), (len(self.content), 1))
+
+        stdout = StringIO()
+        with self.settings(MEDIA_UPLOAD_LIFE_TIME=-1):
+            call_command("clean_media_uploads", stdout=stdout)
+        # The upload isn't expired yet.
+        self.assertIn("Finished, 0 expired", stdout.getvalue())
+        cache.delete(f"file:upload:{expired_id}")
+        with self.settings(MEDIA_UPLOAD_LIFE_TIME=-1):
+            call_command("clean_media_uploads", stdout=stdout)
+        self.assertIn("Finished, 1 expired", stdout.getvalue())
+        self.assertEqual(list(get_uploads_path().iterdir()), [])
+        self.assertEqual(self._usage(), (0, 0))
+
+
+@override_settings(MEDIA_ALLOWED_EXTENSIONS=["mp3"], MEDIA_QUOTA_BYTES=0)
+class ChunkedUploadBenchmarkTest(BaseFileTest):
+    """Benchmark uploading a large file in parallel chunks."""
+
+    size = 2 * 1024**3
+    chunk_size = 64 * 1024**2
+    workers = 4
+
+    def test_parallel_upload(self):
+        source = tempfile.NamedTemporaryFile()
+        self.addCleanup(source.close)
+        # A sparse file with some data at its start, its middle and its end.
+        source.truncate(self.size)
+        for offset in (0, self.size // 2 - 3, self.size - 5):
+            os.pwrite(source.fileno(), b"audio", offset)
+        digest = hashlib.sha256()
+        while block := source.read(self.chunk_size):
+            digest.update(block)
+
+        response = self.client.post(
+            reverse("storage:uploads"),
+            {"name": "audio.mp3", "size": self.size, "chunk_size": self.chunk_size},
+            format="json",
+        )
+        url = reverse("storage:upload_chunks", args=[response.json()["id"]])
+
+        def put_chunk(offset):
+            client = APIClient()
+            client.force_authenticate(self.user)
+            response = client.put(
+                f"{url}?offset={offset}",
+                os.pread(source.fileno(), self.chunk_size, offset),
+                content_type="application/octet-stream",
+            )
+            return response.status_code
+
+        started_at = time.perf_counter()
+        with ThreadPoolExecutor(self.workers) as executor:
+            statuses = list(
+                executor.map(put_chunk, range(0, self.size, self.chunk_size))
+            )
+        self.assertEqual(set(statuses), {200})
+        response = self.client.post(url, {"sha256": digest.hexdigest()}, format="json")
+        self.assertEqual(response.status_code, 201)
+        elapsed = time.perf_counter() - started_at
+
+        path = settings.MEDIA_ROOT / str(self.user.id) / "audio.mp3"
+        self.assertEqual(path.stat().st_size, self.size)
+        with open(path, "rb") as file:
+            file.seek(self.size // 2 - 3)
+            self.assertEqual(file.read(5), b"audio")
+        self.assertEqual(MediaUsage.objects.get(user=self.user).size, self.size)
+        # Far below a second per chunk.
+        self.assertLess(elapsed, self.size / self.chunk_size)
+
+
+class DownloadTest(BaseFileTest):
+    """Test downloading files."""
+
+    content = b"0123456789abcdef"
+
+    def setUp(self):
+        super().setUp()
+        with open(self.directory / "chapter 1.mp3", "wb") as file:
+            file.write(self.content)
+        self.url = reverse("storage:download", args=["folder/chapter 1.mp3"])
+
+    def _get(self, **headers):
+        return self.client.get(self.url, HTTP_ACCEPT="audio/*", **headers)
+
+    def _read(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_download(self):
+        response = self._get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._read(response), self.content)
+        self.assertEqual(response["Content-Type"], "audio/mpeg")
+        self.assertEqual(response["Content-Length"], "16")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        etag = response["ETag"]
+
+        response = self._get(HTTP_IF_NONE_MATCH=f'"other", {etag}')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        response = self.client.get(reverse("storage:download", args=["folder"]))
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse("storage:download", args=["folder/missing"]))
+        self.assertEqual(response.status_code, 404)
+        self.client.force_authenticate(None)
+        self.assertEqual(self._get().status_code, 401)
+
+    def test_range(self):
+        for header, content_range, content in (
+            ("bytes=2-5", "bytes 2-5/16", b"2345"),
+            ("bytes=10-", "bytes 10-15/16", b"abcdef"),
+            ("bytes=12-99", "bytes 12-15/16", b"cdef"),
+            ("bytes=-3", "bytes 13-15/16", b"def"),
+            ("bytes=-30", "bytes 0-15/16", self.content),
+        ):
+            response = self._get(HTTP_RANGE=header)
+            self.assertEqual(response.status_code, 206)
+            self.assertEqual(response["Content-Range"], content_range)
+            self.assertEqual(response["Content-Length"], str(len(content)))
+            self.assertEqual(self._read(response), content)
+
+        for header in ("bytes=16-", "bytes=-0"):
+            response = self._get(HTTP_RANGE=header)
+            self.assertEqual(response.status_code, 416)
+            self.assertEqual(response["Content-Range"], "bytes */16")
+
+        # Multiple ranges and ranges of another version get the whole file.
+        response = self._get(HTTP_RANGE="bytes=0-1,4-5")
+        self.assertEqual(self._read(response), self.content)
+        response = self._get(HTTP_RANGE="bytes=0-1", HTTP_IF_RANGE='"other"')
+        self.assertEqual(self._read(response), self.content)
+        etag = response["ETag"]
+        response = self._get(HTTP_RANGE="bytes=0-1", HTTP_IF_RANGE=etag)
+        self.assertEqual(self._read(response), b"01")
+
+    def test_outside_paths(self):
+        outside = tempfile.TemporaryDirectory()
+        self.addCleanup(outside.cleanup)
+        secret = pathlib.Path(outside.name) / "secret.txt"
+        secret.write_bytes(b"secret")
+        (self.directory / "link.txt").symlink_to(secret)
+        (self.directory / "outside").symlink_to(outside.name)
+
+        for path in (
+            secret.as_posix(),
+            "folder/link.txt",
+            "folder/outside/secret.txt",
+        ):
+            response = self.client.get(reverse("storage:download", args=[path]))
+            self.assertEqual(response.status_code, 404)
+            response = self.client.get(reverse("file:node", args=[path]))
+            self.assertEqual(response.status_code, 404)
+        response = self.client.delete(reverse("file:node", args=["folder/outside"]))
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(secret.exists())
+
+    @override_settings(MEDIA_ACCEL_REDIRECT_URL="/media/")
+    def test_accel_redirect(self):
+        response = self._get(HTTP_RANGE="bytes=2-5")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["Content-Type"], "audio/mpeg")
+        self.assertEqual(
+            response["X-Accel-Redirect"],
+            f"/media/{self.user.id}/folder/chapter%201.mp3",
+        )
+
+
+class DirectoryListingBenchmarkTest(BaseFileTest):
+    """Benchmark listing a directory of many files."""
+
+    files = 200000
+
+    def test_listing_throughput(self):
+        self._create_files(self.files)
+
+        # Listing the whole directory with a stat per file.
+        started_at = time.perf_counter()
+        for node in self.directory.iterdir():
+            self.assertFalse(node.is_dir())
+            os.stat(node.as_posix())
+        whole_listing = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        response = self.client.get(reverse("file:node", args=["folder"]))
+        page = time.perf_counter() - started_at
+        self.assertEqual(
+            len(response.json()["result"]), settings.MEDIA_LISTING_PAGE_SIZE
+        )
+        self.assertLess(page, whole_listing)
+
+        response = self.client.get(
+            reverse("file:node", args=["folder"]), HTTP_ACCEPT="application/x-ndjson"
+        )
+        lines = sum(chunk.count(b"\n") for chunk in response.streaming_content)
+        self.assertEqual(lines, self.files)
 
 
 """
@@ -27,4 +726,4 @@ file_create
 DELETE
 ​/file​/{path}
 file_delete
-"""
\ No newline at end of file
+"""
@@ -0,0 +1,289 @@
+"""Resumable chunked uploads.
+
+An upload is started with the target path and size of a file, which is
+allocated at once as a sparse file under `MEDIA_ROOT/.uploads`, and reserved
+against the user's quota until the file is indexed or removed. Its chunks
+are then PUT at their offsets, in any order, in parallel and by any worker:
+each one is streamed from the request into the file with `os.pwrite`, and
+its index is added to a Redis set of the default cache shared by the workers.
+Resuming an interrupted upload only sends its missing chunks.
+
+A complete upload is checked against its SHA-256, then hard linked to the
+target path on the same file system and unlinked, so files being uploaded are
+never listed nor indexed, the bytes are written once, and a node created at the
+target path meanwhile is never replaced. The files of expired uploads are
+removed by `clean_uploads`, e.g. with the "clean_media_uploads" command.
+"""
+import hashlib
+import os
+import pathlib
+import secrets
+import time
+from typing import Dict, Union
+
+from django.conf import settings
+from django.core.cache import cache
+
+from base.cache import get_redis_client
+
+from . import index
+from .exceptions import (
+    ChecksumMismatch,
+    IncompleteUpload,
+    InvalidChunk,
+    InvalidPath,
+    NodeAlreadyExists,
+    UploadNotFound,
+)
+
+UPLOAD_KEY = "file:upload:{}"
+CHUNKS_KEY = "file:upload:chunks:{}"
+# Bytes read from a request or a file at once.
+BLOCK_SIZE = 1024 * 1024
+# Smallest chunk size, bounding the number of chunks tracked per upload.
+MIN_CHUNK_SIZE = 1024 * 1024
+
+
+def _get_part_path(user_id: int, upload_id: str) -> pathlib.Path:
+    """Get the file of an upload, named by its user to release its quota."""
+    return index.get_uploads_path() / f"{user_id}-{upload_id}"
+
+
+def _remove_part(user_id: int, part_path: pathlib.Path):
+    """Remove the file of an upload, and release its reserved quota once."""
+    try:
+        size = part_path.stat().st_size
+        part_path.unlink()
+    except FileNotFoundError:
+        return
+    index.release_quota(user_id, size, 1)
+
+
+def _get_upload(user_id: int, upload_id: str) -> dict:
+    """Get an upload of a user.
+
+    Raises:
+        UploadNotFound: if the upload doesn't exist or belongs to another user.
+    """
+    upload = cache.get(UPLOAD_KEY.format(upload_id))
+    if not upload or upload["user_id"] != user_id:
+        raise UploadNotFound
+    return upload
+
+
+def _represent(upload: dict, received: set) -> Dict[str, Union[str, int, list]]:
+    """Represent an upload with its missing chunks."""
+    chunks = -(-upload["size"] // upload["chunk_size"])
+    return {
+        "id": upload["id"],
+        "path": upload["path"],
+        "size": upload["size"],
+        "chunk_size": upload["chunk_size"],
+        "missing": [chunk for chunk in range(chunks) if chunk not in received],
+    }
+
+
+def start_upload(user_id: int, path: pathlib.Path, size: int, chunk_size: int):
+    """Start a chunked upload.
+
+    Args:
+        user_id (int): user ID.
+        path (pathlib.Path): target path of the file.
+        size (int): size of the file.
+        chunk_size (int): size of the chunks, but the last one.
+
+    Returns:
+        dict: upload representation.
+
+    Raises:
+        QuotaExceeded: if the storage quota of the user would be exceeded.
+    """
+    index.reserve_quota(user_id, size, 1)
+    upload = {
+        "id": secrets.token_hex(16),
+        "user_id": user_id,
+        "path": index.relative_path(user_id, path),
+        "size": size,
+        "chunk_size": chunk_size,
+    }
+    part_path = _get_part_path(user_id, upload["id"])
+    try:
+        index.get_uploads_path().mkdir(exist_ok=True)
+        fd = os.open(part_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    except OSError:
+        index.release_quota(user_id, size, 1)
+        raise
+    try:
+        os.ftruncate(fd, size)
+    except OSError:
+        part_path.unlink()
+        index.release_quota(user_id, size, 1)
+        raise
+    finally:
+        os.close(fd)
+    cache.set(UPLOAD_KEY.format(upload["id"]), upload, settings.MEDIA_UPLOAD_LIFE_TIME)
+    return _represent(upload, set())
+
+
+def get_upload(user_id: int, upload_id: str):
+    """Get an upload of a user with its missing chunks.
+
+    Args:
+        user_id (int): user ID.
+        upload_id (str): upload ID.
+
+    Returns:
+        dict: upload representation.
+
+    Raises:
+        UploadNotFound: if the upload doesn't exist or belongs to another user.
+    """
+    upload = _get_upload(user_id, upload_id)
+    received = get_redis_client().smembers(cache.make_key(CHUNKS_KEY.format(upload_id)))
+    return _represent(upload, {int(chunk) for chunk in received})
+
+
+def write_chunk(user_id: int, upload_id: str, offset: int, length: int, stream):
+    """Write a chunk of an upload at its offset.
+
+    Args:
+        user_id (int): user ID.
+        upload_id (str): upload ID.
+        offset (int): offset of the chunk, a multiple of the chunk size.
+        length (int): length of the chunk, the chunk size but for the last one.
+        stream (file): readable request body.
+
+    Returns:
+        int: number of received chunks.
+
+    Raises:
+        UploadNotFound: if the upload doesn't exist or belongs to another user.
+        InvalidChunk: if the chunk offset or length is incorrect.
+    """
+    upload = _get_upload(user_id, upload_id)
+    chunk_size, size = upload["chunk_size"], upload["size"]
+    if (
+        offset < 0
+        or offset >= size
+        or offset % chunk_size
+        or length != min(chunk_size, size - offset)
+    ):
+        raise InvalidChunk
+
+    fd = os.open(_get_part_path(user_id, upload_id), os.O_WRONLY)
+    try:
+        end = offset + length
+        while offset < end:
+            block = stream.read(min(BLOCK_SIZE, end - offset))
+            if not block:
+                raise InvalidChunk
+            view = memoryview(block)
+            while view:
+                written = os.pwrite(fd, view, offset)
+                offset += written
+                view = view[written:]
+    finally:
+        os.close(fd)
+
+    chunks_key = cache.make_key(CHUNKS_KEY.format(upload_id))
+    pipeline = get_redis_client().pipeline()
+    pipeline.sadd(chunks_key, (end - length) // chunk_size)
+    pipeline.expire(chunks_key, settings.MEDIA_UPLOAD_LIFE_TIME)
+    pipeline.scard(chunks_key)
+    received = pipeline.execute()[-1]
+    cache.touch(UPLOAD_KEY.format(upload_id), settings.MEDIA_UPLOAD_LIFE_TIME)
+    return received
+
+
+def _hash(path: pathlib.Path) -> str:
+    """Get the SHA-256 of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while block := file.read(BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def finish_upload(user_id: int, upload_id: str, sha256: str) -> pathlib.Path:
+    """Check a complete upload and move it to its target path.
+
+    Args:
+        user_id (int): user ID.
+        upload_id (str): upload ID.
+        sha256 (str): hex SHA-256 of the file.
+
+    Returns:
+        pathlib.Path: path of the uploaded file.
+
+    Raises:
+        UploadNotFound: if the upload doesn't exist or belongs to another user.
+        IncompleteUpload: if some chunks weren't received.
+        ChecksumMismatch: if the file doesn't match the checksum.
+        NodeAlreadyExists: if the target path was taken meanwhile.
+        InvalidPath: if the target directory was removed meanwhile.
+    """
+    upload = _get_upload(user_id, upload_id)
+    if get_upload(user_id, upload_id)["missing"]:
+        raise IncompleteUpload
+    part_path = _get_part_path(user_id, upload_id)
+    if _hash(part_path) != sha256.lower():
+        raise ChecksumMismatch
+
+    path = index.get_user_path(user_id) / upload["path"]
+    if path.exists():
+        raise NodeAlreadyExists
+    if not path.parent.is_dir():
+        raise InvalidPath
+    # Only the request deleting the upload finishes it.
+    if not cache.delete(UPLOAD_KEY.format(upload_id)):
+        raise UploadNotFound
+    cache.delete(CHUNKS_KEY.format(upload_id))
+    # Unlike a rename, a link doesn't replace a node created meanwhile.
+    try:
+        os.link(part_path, path)
+    except FileExistsError:
+        _remove_part(user_id, part_path)
+        raise NodeAlreadyExists
+    except OSError:
+        _remove_part(user_id, part_path)
+        raise
+    part_path.unlink()
+    try:
+        index.index_path(user_id, path, reserved=(upload["size"], 1))
+    except Exception:
+        index.release_quota(user_id, upload["size"], 1)
+        raise
+    return path
+
+
+def abort_upload(user_id: int, upload_id: str):
+    """Cancel an upload and remove its file.
+
+    Raises:
+        UploadNotFound: if the upload doesn't exist or belongs to another user.
+    """
+    _get_upload(user_id, upload_id)
+    if cache.delete(UPLOAD_KEY.format(upload_id)):
+        cache.delete(CHUNKS_KEY.format(upload_id))
+        _remove_part(user_id, _get_part_path(user_id, upload_id))
+
+
+def clean_uploads() -> int:
+    """Remove the files of the expired uploads, and release their quota.
+
+    Returns:
+        int: number of removed files.
+    """
+    if not index.get_uploads_path().is_dir():
+        return 0
+    expired_at = time.time() - settings.MEDIA_UPLOAD_LIFE_TIME
+    removed = 0
+    with os.scandir(index.get_uploads_path()) as entries:
+        for entry in entries:
+            user_id, _, upload_id = entry.name.partition("-")
+            if entry.stat().st_mtime < expired_at and not cache.has_key(
+                UPLOAD_KEY.format(upload_id)
+            ):
+                _remove_part(int(user_id), pathlib.Path(entry.path))
+                removed += 1
+    return removed
@@ -4,6 +4,6 @@ from django.urls import path
 from .views import FileAPIView
 
 urlpatterns = [
-    path("<path:path>", FileAPIView.as_view()),
-    path("", FileAPIView.as_view()),
+    path("<path:path>", FileAPIView.as_view(), name="node"),
+    path("", FileAPIView.as_view(), name="root"),
 ]
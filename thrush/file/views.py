@@ -1,38 +1,62 @@
 """File views."""
+import heapq
+import json
 import logging
 import os
 import pathlib
 import shutil
-from urllib.parse import urljoin
-from typing import List, Dict, Union, Optional
+import stat
+from operator import attrgetter
+from typing import Dict, Optional, Union
 
 from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.urls import reverse
 from drf_yasg.utils import swagger_auto_schema
 from humanfriendly import format_size
 from rest_framework import status, permissions
 from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 
-from .exceptions import NodeAlreadyExists, NodeNotFound, InvalidPath
+from base.pagination import KeysetPagination
+
+from . import downloads, index, uploads
+from .exceptions import InvalidChunk, NodeAlreadyExists, NodeNotFound, InvalidPath
 from .forms import UploadForm
+from .models import MediaNode
+from .renderers import NDJSONRenderer
 from .serializers import (
     FileActionSerializer,
     NewFolderActionSerializer,
     RenameActionSerializer,
     CopyActionSerializer,
     MoveActionSerializer,
+    UploadFinishSerializer,
+    UploadSerializer,
 )
 
 
-def fix_path(node_path: str, full_path: bool = False) -> str:
+def fix_path(node_path: str) -> str:
     """Remove based path from a user media path."""
     media_root = settings.MEDIA_ROOT.as_posix()
     # +1 is for removing the first slash.
-    node_path = node_path[node_path.find(media_root) + len(media_root) + 1:]
-    if full_path:
-        return urljoin(settings.MEDIA_URL, node_path)
-    return node_path
+    return node_path[node_path.find(media_root) + len(media_root) + 1:]
+
+
+def node_url(link: str, is_dir: bool) -> str:
+    """Get the URL of a node from its link, see `fix_path`.
+
+    Files are downloaded from the authenticated download view, since the media
+    directory isn't served publicly, and directories from the file manager.
+    """
+    # Remove the user directory.
+    path = link.partition("/")[2]
+    if not path:
+        return reverse("file:root")
+    return reverse("file:node" if is_dir else "storage:download", args=[path])
 
 
 def setup_path(fn):
@@ -46,11 +70,13 @@ def setup_path(fn):
     def wrap(self, request, path: str = ""):
         if ".." in path:
             raise NotFound
-        real_path = settings.MEDIA_ROOT / str(request.user.id)
-        if not real_path.exists():
-            real_path.mkdir()
-        if path:
-            real_path /= path
+        user_path = index.get_user_path(request.user.id)
+        if not user_path.exists():
+            user_path.mkdir()
+        real_path = user_path / path
+        # Absolute paths and symbolic links could lead out of the user directory.
+        if not real_path.resolve().is_relative_to(user_path.resolve()):
+            raise NotFound
         return fn(self, request, real_path)
 
     return wrap
@@ -157,54 +183,139 @@ def validate_input(fn):
 
 
 class FileAPIView(APIView):
-    """File API view."""
+    """File API view.
+
+    Directories are listed from `os.scandir`, whose entries cache their type
+    and stat, by pages of `MEDIA_LISTING_PAGE_SIZE` nodes ordered by name. A
+    "?cursor=" is the name of the last node of the previous page. Requests
+    accepting "application/x-ndjson" get the whole directory streamed instead,
+    one node per line in directory order.
+
+    Directories are searched with "?search=" in the names of their tree, and
+    filtered by "?type=" and "?extension=" or ordered by "?ordering=" name,
+    size or modified, from the media index, see `file.index`.
+    """
 
     permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
+    # Number of NDJSON lines written at once.
+    stream_chunk_size = 1000
+    index_query_params = ("search", "type", "extension", "ordering")
+    index_orderings = {"name": "name", "size": "size", "modified": "mtime_ns"}
 
     @staticmethod
-    def _represent_node_info(path: pathlib.Path):
-        if path.is_dir():
-            return {
-                "link": fix_path(path.as_posix()),
-                "url": fix_path(path.as_posix(), True),
-                "name": path.name,
-                "size": {
-                    "bytes": 0,
-                    "readable": "",
-                },
-                "type": "directory",
-            }
-        size = os.stat(path.as_posix()).st_size
+    def _represent(
+        node_path: str, name: str, is_dir: bool, size: int
+    ) -> Dict[str, Union[str, int, dict]]:
+        """Represent a file or a directory."""
         return {
-            "link": fix_path(path.as_posix()),
-            "url": fix_path(path.as_posix(), True),
-            "name": path.name,
+            "link": fix_path(node_path),
+            "url": node_url(fix_path(node_path), is_dir),
+            "name": name,
             "size": {
-                "bytes": size,
-                "readable": format_size(size, binary=True),
+                "bytes": 0 if is_dir else size,
+                "readable": "" if is_dir else format_size(size, binary=True),
             },
-            "type": "file",
+            "type": "directory" if is_dir else "file",
         }
 
-    def _get_node_info(
-        self, path: pathlib.Path
-    ) -> Union[Dict[str, Union[str, int]], List[Dict[str, Union[str, int]]]]:
-        """Return node info which can be list of files and directories or a specific file info.
-
-        Args:
-            path (pathlib.Path): file or directory path.
+    @classmethod
+    def _represent_node_info(cls, path: pathlib.Path):
+        """Represent a node from a single stat."""
+        node_stat = path.stat()
+        return cls._represent(
+            path.as_posix(),
+            path.name,
+            stat.S_ISDIR(node_stat.st_mode),
+            node_stat.st_size,
+        )
+
+    def _represent_entry(self, entry: os.DirEntry):
+        """Represent a node of a directory listing from its cached stat."""
+        is_dir = entry.is_dir()
+        return self._represent(
+            entry.path, entry.name, is_dir, 0 if is_dir else entry.stat().st_size
+        )
+
+    def _list_directory(self, request, path: pathlib.Path) -> Response:
+        """List a page of the nodes of a directory after the cursor name."""
+        cursor = request.query_params.get("cursor", "")
+        page_size = settings.MEDIA_LISTING_PAGE_SIZE
+        with os.scandir(path) as entries:
+            # Only the entries of the page are kept, and stat-ed afterwards.
+            page = heapq.nsmallest(
+                page_size + 1,
+                (entry for entry in entries if entry.name > cursor),
+                key=attrgetter("name"),
+            )
 
-        Returns:
-            Union[Dict[str, Union[str, int]], List[Dict[str, Union[str, int]]]]: list of files and directories
-                with details or a file info.
+        next_url = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            next_url = replace_query_param(
+                request.build_absolute_uri(), "cursor", page[-1].name
+            )
+        return Response(
+            {
+                "result": [self._represent_entry(entry) for entry in page],
+                "next": next_url,
+            }
+        )
+
+    def _stream_directory(self, path: pathlib.Path) -> StreamingHttpResponse:
+        """Stream all the nodes of a directory as NDJSON."""
+
+        def lines():
+            chunk = []
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    chunk.append(json.dumps(self._represent_entry(entry)) + "\n")
+                    if len(chunk) == self.stream_chunk_size:
+                        yield "".join(chunk)
+                        chunk = []
+            yield "".join(chunk)
+
+        return StreamingHttpResponse(lines(), content_type=NDJSONRenderer.media_type)
+
+    def _search_index(self, request, path: pathlib.Path) -> Response:
+        """List or search the nodes of a directory from the media index.
+
+        A search matches names containing the text, which no B-tree index can
+        serve: it scans the index entries of the user under the directory,
+        found by the subtree index. It's fine for a user's tree, but not for
+        searches across users.
         """
-        if path.is_file():
-            return self._represent_node_info(path)
-
-        tree = []
-        for node in path.iterdir():
-            tree.append(self._represent_node_info(node))
-        return tree
+        directory = index.relative_path(request.user.id, path)
+        nodes = MediaNode.objects.filter(user=request.user)
+        search = request.query_params.get("search")
+        if search:
+            if directory:
+                nodes = nodes.filter(path__startswith=f"{directory}/")
+            nodes = nodes.filter(name__icontains=search)
+        else:
+            nodes = nodes.filter(parent=directory)
+        if request.query_params.get("type") in ("file", "directory"):
+            nodes = nodes.filter(is_dir=request.query_params["type"] == "directory")
+        if request.query_params.get("extension"):
+            nodes = nodes.filter(extension=request.query_params["extension"].lower())
+        ordering = request.query_params.get("ordering", "name")
+        field = self.index_orderings.get(ordering.lstrip("-"), "name")
+        nodes = nodes.order_by(f"{'-' if ordering.startswith('-') else ''}{field}")
+
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(nodes, request, self)
+        user_path = index.get_user_path(request.user.id)
+        return paginator.get_paginated_response(
+            [
+                self._represent(
+                    (user_path / node.path).as_posix(),
+                    node.name,
+                    node.is_dir,
+                    node.size,
+                )
+                for node in page
+            ]
+        )
 
     @swagger_auto_schema(request_body=FileActionSerializer)
     @setup_path
@@ -221,15 +332,20 @@ class FileAPIView(APIView):
         # Upload.
         if form:
             file_path = path / form.files["file"].name
+            reserved = index.reserve_quota(
+                request.user.id, form.files["file"].size, 1
+            )
             try:
                 with open(file_path.as_posix(), "wb+") as file:
                     for chunk in form.files["file"].chunks():
                         file.write(chunk)
+                index.index_path(request.user.id, file_path, reserved=reserved)
                 return Response(
                     data=self._represent_node_info(file_path),
                     status=status.HTTP_201_CREATED,
                 )
             except IOError as e:
+                index.release_quota(request.user.id, *reserved)
                 logging.error(str(e))
                 return Response(
                     data={
@@ -245,6 +361,7 @@ class FileAPIView(APIView):
         if serializer.data["action"] == "new_folder":
             new_path = path / serializer.data["params"]["name"]
             new_path.mkdir()
+            index.index_path(request.user.id, new_path)
             return Response(
                 data=self._represent_node_info(new_path), status=status.HTTP_201_CREATED
             )
@@ -254,6 +371,7 @@ class FileAPIView(APIView):
             old_path = path / serializer.data["params"]["old_name"]
             new_path = path / serializer.data["params"]["new_name"]
             old_path.rename(new_path)
+            index.move_path(request.user.id, old_path, new_path)
             return Response(
                 data=self._represent_node_info(new_path), status=status.HTTP_200_OK
             )
@@ -262,12 +380,20 @@ class FileAPIView(APIView):
         if serializer.data["action"] == "copy":
             source = path / serializer.data["params"]["source"]
             destination = (
-                path / serializer.data["params"]["destination"] / serializer.data["params"]["source"]
+                path
+                / serializer.data["params"]["destination"]
+                / serializer.data["params"]["source"]
             )
-            if source.is_file():
-                shutil.copy(source, destination)
-            else:
-                shutil.copytree(source, destination)
+            reserved = index.reserve_copy_quota(request.user.id, source)
+            try:
+                if source.is_file():
+                    shutil.copy(source, destination)
+                else:
+                    shutil.copytree(source, destination)
+            except OSError:
+                index.release_quota(request.user.id, *reserved)
+                raise
+            index.index_path(request.user.id, destination, reserved=reserved)
             return Response(
                 data=self._represent_node_info(destination), status=status.HTTP_200_OK
             )
@@ -281,6 +407,7 @@ class FileAPIView(APIView):
                 / serializer.data["params"]["source"]
             )
             shutil.move(source, destination)
+            index.move_path(request.user.id, source, destination)
             return Response(
                 data=self._represent_node_info(destination), status=status.HTTP_200_OK
             )
@@ -297,10 +424,126 @@ class FileAPIView(APIView):
             shutil.rmtree(path)
         else:
             path.unlink()
+        index.unindex_path(request.user.id, path)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @setup_path
     @validate_path
     def get(self, request, path: pathlib.Path):
-        """Retrieve list of all files and directories in the path or a file info."""
-        return Response({"result": self._get_node_info(path)})
+        """Retrieve a page of the files and directories in the path or a file info."""
+        if path.is_file():
+            return Response({"result": self._represent_node_info(path)})
+        if self.index_query_params & request.query_params.keys():
+            return self._search_index(request, path)
+        if isinstance(request.accepted_renderer, NDJSONRenderer):
+            return self._stream_directory(path)
+        return self._list_directory(request, path)
+
+
+class MediaUsageAPIView(APIView):
+    """Storage usage of the user's media directory, from its counters."""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        """Retrieve the used storage and the quota."""
+        usage = index.get_usage(request.user.id)
+        return Response(
+            {
+                "size": {
+                    "bytes": usage.size,
+                    "readable": format_size(usage.size, binary=True),
+                },
+                "files": usage.files,
+                "quota": {
+                    "bytes": settings.MEDIA_QUOTA_BYTES or None,
+                    "files": settings.MEDIA_QUOTA_FILES or None,
+                },
+            }
+        )
+
+
+class UploadAPIView(APIView):
+    """Start a resumable chunked upload, see `file.uploads`."""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_auto_schema(request_body=UploadSerializer)
+    def post(self, request):
+        """Start an upload, then PUT its chunks and POST its checksum."""
+        serializer = UploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user_path = index.get_user_path(request.user.id)
+        user_path.mkdir(exist_ok=True)
+        path = user_path / serializer.data["path"] / serializer.data["name"]
+        if not path.parent.is_dir():
+            raise InvalidPath
+        if path.exists():
+            raise NodeAlreadyExists
+        return Response(
+            data=uploads.start_upload(
+                request.user.id,
+                path,
+                serializer.data["size"],
+                serializer.data["chunk_size"],
+            ),
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class UploadChunkAPIView(APIView):
+    """Chunks of a resumable upload, see `file.uploads`."""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, upload_id: str):
+        """Retrieve an upload with its missing chunks, to resume it."""
+        return Response(uploads.get_upload(request.user.id, upload_id))
+
+    def put(self, request, upload_id: str):
+        """Write the chunk in the body at "?offset=", in any order."""
+        try:
+            offset = int(request.query_params["offset"])
+            length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except (KeyError, ValueError) as e:
+            raise InvalidChunk from e
+        received = uploads.write_chunk(
+            request.user.id, upload_id, offset, length, request.stream
+        )
+        return Response({"received": received})
+
+    @swagger_auto_schema(request_body=UploadFinishSerializer)
+    def post(self, request, upload_id: str):
+        """Finish a complete upload, checked against its SHA-256."""
+        serializer = UploadFinishSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        path = uploads.finish_upload(
+            request.user.id, upload_id, serializer.data["sha256"]
+        )
+        return Response(
+            data=FileAPIView._represent_node_info(path),
+            status=status.HTTP_201_CREATED,
+        )
+
+    def delete(self, request, upload_id: str):
+        """Cancel an upload."""
+        uploads.abort_upload(request.user.id, upload_id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class DownloadAPIView(APIView):
+    """Download a file of the user, see `file.downloads`."""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def perform_content_negotiation(self, request, force=False):
+        """Serve files whatever media types are accepted."""
+        return super().perform_content_negotiation(request, force=True)
+
+    @setup_path
+    @validate_path
+    def get(self, request, path: pathlib.Path):
+        """Download a file, or the "Range" of it."""
+        if not path.is_file():
+            raise InvalidPath
+        return downloads.serve(request, path)
@@ -21,7 +21,7 @@ class GroupMenu(Base):
     parent = models.ForeignKey("self", null=True, blank=True, on_delete=models.SET_NULL)
     order = models.PositiveIntegerField(default=1)
 
-    class Meta:
+    class Meta(Base.Meta):
         ordering = ["order"]
 
     def __str__(self):
@@ -48,7 +48,7 @@ class Menu(Base):
     link = models.CharField(max_length=1024)
     order = models.PositiveIntegerField(default=1)
 
-    class Meta:
+    class Meta(Base.Meta):
         ordering = ["order"]
 
     def __str__(self):
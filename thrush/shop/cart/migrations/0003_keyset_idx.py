@@ -0,0 +1,21 @@
+# Generated by Django 4.0.1 on 2026-10-18 21:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='cart',
+            options={'ordering': ['created_at']},
+        ),
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(fields=['created_at', 'id'], name='cart_keyset_idx'),
+        ),
+    ]
@@ -25,7 +25,7 @@ class Cart(Base):
     # final_price = models.PositiveIntegerField()
     # invoice_number = models.PositiveIntegerField(null=True)
 
-    class Meta:
+    class Meta(Base.Meta):
         unique_together = (("user", "product"),)
 
     def __str__(self):
@@ -1,9 +1,9 @@
 """Cart serializers."""
 from rest_framework import serializers
-from rest_polymorphic.serializers import PolymorphicSerializer
 from .models import Cart
-from shop.product.models import Product, AudioBook, PaperBook
-from shop.product.serializers import ProductSerializer, PaperBookSerializer, AudioBookSerializer
+from shop.price import engine
+from shop.product.models import Product
+from shop.product.serializers import ProductPolymorphicSerializer
 
 
 class ProductGeneralInfoSerializer(serializers.ModelSerializer):
@@ -103,19 +103,6 @@ class ProductGeneralInfoSerializer(serializers.ModelSerializer):
 #     #     return obj.bookmarks.count()
 
 
-# class CartPolymorphicSerializer(PolymorphicSerializer):
-class ProductPolymorphicSerializer(PolymorphicSerializer):
-    model_serializer_mapping = {
-        # Project: ProjectSerializer,
-        # ArtProject: ArtProjectSerializer,
-        # ResearchProject: ResearchProjectSerializer
-        Product: ProductSerializer,
-        PaperBook: PaperBookSerializer,
-        AudioBook: AudioBookSerializer,
-        # Cart: CartSerializer
-    }
-
-
 class CartSerializer(serializers.ModelSerializer):
     """Cart serializer."""
 
@@ -126,6 +113,8 @@ class CartSerializer(serializers.ModelSerializer):
     # products = ProductPolymorphicSerializer(many=True, read_only=True, source="cart:cart-detail")
     # products = ProductPolymorphicSerializer(many=True, read_only=True, source="cart_product")
     products = ProductPolymorphicSerializer(many=True, read_only=True)
+    unit_price = serializers.SerializerMethodField()
+    total_price = serializers.SerializerMethodField()
 
     class Meta:
         model = Cart
@@ -138,6 +127,8 @@ class CartSerializer(serializers.ModelSerializer):
             # "content",
             "quantity",
             "products",
+            "unit_price",
+            "total_price",
             # "price",
             # "final_price",
             # "invoice_number",
@@ -145,6 +136,20 @@ class CartSerializer(serializers.ModelSerializer):
         # read_only_fields = ("invoice_number",)
         ref_name = "cart"
 
+    def _get_line(self, obj):
+        """Get the priced line of a cart, priced by the view if it's listed."""
+        lines = self.context.setdefault("lines", {})
+        if obj.id not in lines:
+            lines[obj.id] = engine.price_lines([(obj.product, obj.quantity)])[0][0]
+        return lines[obj.id]
+
+    def get_unit_price(self, obj):
+        """Get cart product's unit price."""
+        return self._get_line(obj).unit_price
+
+    def get_total_price(self, obj):
+        """Get cart line's total price."""
+        return self._get_line(obj).total_price
 
     # def get_total_price(self, obj):
     #     """Get post's star average."""
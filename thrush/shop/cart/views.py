@@ -1,11 +1,12 @@
 """Cart views."""
-import account.models
 from .serializers import CartSerializer
 from .models import Cart
 # from shop.product.models import Product
 # from shop.cart.serializers import CartPolymorphicSerializer
 from base.views import BaseViewSet
 from rest_framework import permissions, generics
+from rest_framework.response import Response
+from shop.price import engine
 
 
 class UserCartViewSet(
@@ -45,7 +46,7 @@ class UserCartViewSet(
         """Combine the above two parts"""
         user = self.request.user.id
 
-        if account.models.User.is_superuser:
+        if self.request.user.is_superuser:
             user_id = self.kwargs['user_pk']
             return Cart.objects.filter(user=user_id)
         else:
@@ -76,10 +77,28 @@ class CartViewSet(
         """
         user = self.request.user
 
-        if account.models.User.is_superuser:
-            return Cart.objects.all()
+        if self.request.user.is_superuser:
+            return Cart.objects.all().select_related("product")
         else:
-            return Cart.objects.filter(user=user)
+            return Cart.objects.filter(user=user).select_related("product")
+
+    def list(self, request, *args, **kwargs):
+        """DRF built-in method.
+
+        The listed lines are priced together.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        carts = list(queryset) if page is None else page
+
+        lines, _ = engine.price_lines((cart.product, cart.quantity) for cart in carts)
+        context = self.get_serializer_context()
+        context["lines"] = {cart.id: line for cart, line in zip(carts, lines)}
+        serializer = self.get_serializer(carts, many=True, context=context)
+
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
 
     # def put(self, request, *args, **kwargs):
     # def perform_update(self, serializer):
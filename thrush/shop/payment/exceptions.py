@@ -0,0 +1,35 @@
+"""Payment exceptions."""
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class OutOfStock(APIException):
+    """Not enough inventory for an ordered product exception."""
+
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "some products in the cart are out of stock."
+    default_code = "conflict"
+
+
+class DeliveryAddressNotFound(APIException):
+    """User doesn't have any delivery address exception."""
+
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = "a delivery address is required to check out."
+    default_code = "bad_request"
+
+
+class ReservationReleased(APIException):
+    """Payment's reserved inventory was given back exception."""
+
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "the payment was canceled or expired."
+    default_code = "conflict"
+
+
+class PaymentAlreadyPaid(APIException):
+    """Paid payment can't change its status exception."""
+
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "the payment was already paid."
+    default_code = "conflict"
@@ -0,0 +1,120 @@
+"""Inventory reservation.
+
+Checking out reserves the ordered quantities by taking them out of
+`Product.inventory` while the payment is pending. Paying confirms the
+reservation, while failing, canceling or not paying within
+`SHOP_RESERVATION_TIMEOUT` seconds of the checkout gives the quantities back.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Q, Sum, When
+from django.utils import timezone
+
+from shop.product.models import Product
+
+from .exceptions import OutOfStock
+from .models import CANCEL, EXPIRED, FAIL, PENDING, Order, Payment
+
+RELEASE_STATUSES = (FAIL, CANCEL, EXPIRED)
+
+
+def _lock_products(product_ids):
+    """Lock the products' rows in a fixed order, so checkouts can't deadlock."""
+    list(
+        Product.objects.non_polymorphic()
+        .select_for_update()
+        .filter(pk__in=product_ids)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+
+
+def reserve(quantities: dict):
+    """Take ordered quantities out of the products' inventory.
+
+    It has to be called in a transaction. After locking the rows, a single
+    conditional UPDATE only decrements products having enough inventory, so the
+    number of updated rows tells whether every product could be reserved.
+
+    Args:
+        quantities (dict): ordered quantity by product ID.
+
+    Raises:
+        OutOfStock: if a product doesn't have enough inventory.
+    """
+    _lock_products(quantities)
+    in_stock = Q()
+    new_inventory = []
+    for product_id, quantity in quantities.items():
+        in_stock |= Q(pk=product_id, inventory__gte=quantity)
+        new_inventory.append(When(pk=product_id, then=F("inventory") - quantity))
+    updated = (
+        Product.objects.non_polymorphic()
+        .filter(in_stock)
+        .update(inventory=Case(*new_inventory, output_field=PositiveIntegerField()))
+    )
+    if updated != len(quantities):
+        raise OutOfStock
+
+
+def _restock(payment_id: int):
+    """Give the quantities ordered by a payment back to the inventory."""
+    quantities = dict(
+        Order.objects.filter(invoice_number=payment_id)
+        .values("product_id")
+        .annotate(quantity=Sum("quantity"))
+        .values_list("product_id", "quantity")
+    )
+    if not quantities:
+        return
+
+    _lock_products(quantities)
+    Product.objects.non_polymorphic().filter(pk__in=quantities).update(
+        inventory=Case(
+            *(
+                When(pk=product_id, then=F("inventory") + quantity)
+                for product_id, quantity in quantities.items()
+            ),
+            output_field=PositiveIntegerField(),
+        )
+    )
+
+
+def settle(payment_id: int, status: str) -> bool:
+    """Confirm or release a pending payment's reservation.
+
+    The payment leaves the pending status with a conditional UPDATE, so a
+    reservation can only be settled once, whoever settles it first.
+
+    Args:
+        payment_id (int): pending payment ID.
+        status (str): new payment status, the reserved quantities are given back
+            if it's one of `RELEASE_STATUSES`.
+
+    Returns:
+        bool: whether the payment was pending.
+    """
+    with transaction.atomic():
+        if not Payment.objects.filter(pk=payment_id, status=PENDING).update(
+            status=status, modified_at=timezone.now()
+        ):
+            return False
+        if status in RELEASE_STATUSES:
+            _restock(payment_id)
+    return True
+
+
+def release_expired() -> int:
+    """Release reservations which weren't paid in time.
+
+    Returns:
+        int: number of released reservations.
+    """
+    payment_ids = Payment.objects.filter(
+        status=PENDING,
+        created_at__lt=timezone.now()
+        - timedelta(seconds=settings.SHOP_RESERVATION_TIMEOUT),
+    ).values_list("id", flat=True)
+    return sum(settle(payment_id, EXPIRED) for payment_id in list(payment_ids))
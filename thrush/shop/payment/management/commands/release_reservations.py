@@ -0,0 +1,32 @@
+"""Release expired inventory reservations."""
+import time
+
+from django.core.management.base import BaseCommand
+
+from shop.payment.inventory import release_expired
+
+
+class Command(BaseCommand):
+
+    help = "Give back the inventory reserved by payments which weren't paid in time."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep releasing every INTERVAL seconds instead of releasing once.",
+        )
+
+    def _release(self):
+        self.stdout.write(
+            "Releasing expired reservations... "
+            f"{self.style.SUCCESS(release_expired())} payments expired."
+        )
+
+    def handle(self, *args, **kwargs):
+        self._release()
+        while kwargs["interval"]:
+            time.sleep(kwargs["interval"])
+            self._release()
+        self.stdout.write("Finished")
@@ -0,0 +1,56 @@
+# Generated by Django 4.0.1 on 2026-10-18 21:14
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('account', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Payment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('payment_type', models.CharField(max_length=30)),
+                ('status', models.CharField(max_length=15, null=True)),
+                ('bank_response', models.JSONField(null=True)),
+                ('total_payment', models.PositiveIntegerField()),
+                ('bank_id', models.PositiveIntegerField(null=True)),
+                ('batch_number', models.CharField(max_length=45, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='payment_user_product', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('quantity', models.PositiveIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)])),
+                ('total_price', models.PositiveIntegerField()),
+                ('invoice_number', models.PositiveIntegerField(null=True)),
+                ('delivery_address', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='order_delivery_address', to='account.address')),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'abstract': False,
+            },
+        ),
+    ]
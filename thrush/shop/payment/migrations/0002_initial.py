@@ -0,0 +1,29 @@
+# Generated by Django 4.0.1 on 2026-10-18 21:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('payment', '0001_initial'),
+        ('product', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='order_product', to='product.product'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='order_user', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.0.1 on 2026-10-18 21:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='status',
+            field=models.CharField(choices=[('pending', 'pending'), ('success', 'success'), ('fail', 'fail'), ('cancel', 'cancel'), ('expired', 'expired')], max_length=15, null=True),
+        ),
+    ]
@@ -7,6 +7,15 @@ from base.models import Base
 from account.models import Address
 from shop.product.models import Product
 
+PENDING = "pending"
+SUCCESS = "success"
+FAIL = "fail"
+CANCEL = "cancel"
+EXPIRED = "expired"
+STATUS_CHOICES = tuple(
+    (status, status) for status in (PENDING, SUCCESS, FAIL, CANCEL, EXPIRED)
+)
+
 
 class Order(Base):
     """Order model."""
@@ -36,7 +45,7 @@ class Payment(Base):
     # order = models.On(Order, related_name="order_payment", on_delete=models.DO_NOTHING)
     payment_type = models.CharField(max_length=30)
     # content = models.TextField()
-    status = models.CharField(max_length=15, null=True) #, choices=(("success", "success"), ("fail", "fail"), ("cancel", "cancel")))
+    status = models.CharField(max_length=15, null=True, choices=STATUS_CHOICES)
     bank_response = models.JSONField(null=True)
     total_payment = models.PositiveIntegerField()
     bank_id = models.PositiveIntegerField(null=True)
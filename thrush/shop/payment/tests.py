@@ -0,0 +1,330 @@
+"""Payment tests."""
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest.mock import patch
+
+from base.tests import BaseAPITestCase
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.db import DatabaseError, connection, connections
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient, APITransactionTestCase
+
+from account.models import Address, User
+from base.models import Category
+from shop.cart.models import Cart
+from shop.product.models import Product
+
+from . import inventory
+from .models import CANCEL, EXPIRED, FAIL, PENDING, SUCCESS, Order, Payment
+from .serializers import PaymentSerializer
+
+
+def create_customer(username):
+    """Create a user who can check out."""
+    user = User.objects.create_user(
+        username=username, mobile=username, is_active=True, is_superuser=True
+    )
+    Address.objects.create(
+        user=user,
+        country="country",
+        city="city",
+        state="state",
+        post_code="1234",
+        address="address",
+        house_number="1",
+        floor="1",
+        unit="1",
+    )
+    return user
+
+
+def create_product(seller, product_code, inventory):
+    """Create a product to check out."""
+    return Product.objects.create(
+        name=product_code,
+        description="description",
+        seller=seller,
+        category=Category.objects.get_or_create(name="cat1")[0],
+        product_code=product_code,
+        image="https://localhost/image.png",
+        inventory=inventory,
+        buy_price=50,
+        sel_price=100,
+        start=None,
+        extra={},
+    )
+
+
+class CheckoutTest(BaseAPITestCase):
+    """Test checking out a cart."""
+
+    def setUp(self):
+        Group.objects.get_or_create(name=settings.DEFAULT_USER_GROUP)
+        self.user = create_customer("user1")
+        self.category = Category.objects.create(name="cat1")
+        self.client.force_authenticate(self.user)
+
+    def _fill_cart(self, count, inventory=10, quantity=2):
+        products = Product.objects.bulk_create(
+            [
+                Product(
+                    name=f"product {index}",
+                    description="description",
+                    seller=self.user,
+                    category=self.category,
+                    product_code=f"{count}-{index}",
+                    image="https://localhost/image.png",
+                    inventory=inventory,
+                    buy_price=50,
+                    sel_price=100,
+                    discount=10 if index % 2 else 0,
+                    start=None,
+                    extra={},
+                )
+                for index in range(count)
+            ]
+        )
+        products = Product.objects.filter(product_code__startswith=f"{count}-")
+        Cart.objects.bulk_create(
+            [
+                Cart(user=self.user, product=product, quantity=quantity)
+                for product in products
+            ]
+        )
+        return products
+
+    def _checkout(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                reverse("payment:payment-list"),
+                {"payment_type": "online", "bank_id": 1},
+                format="json",
+            )
+        # Backends such as SQLite split big bulk inserts in several batches.
+        queries = [
+            query
+            for query in context.captured_queries
+            if not query["sql"].startswith(f'INSERT INTO "{Order._meta.db_table}"')
+        ]
+        return response, len(queries)
+
+    def test_checkout(self):
+        products = self._fill_cart(2)
+        response, _ = self._checkout()
+
+        self.assertEqual(response.status_code, 200)
+        payment = Payment.objects.get()
+        self.assertDictEqual(
+            response.json(),
+            {"invoice_number": payment.id, "total_payment": 2 * 100 + 2 * 90},
+        )
+        self.assertEqual(
+            sorted(Order.objects.values_list("total_price", flat=True)), [180, 200]
+        )
+        self.assertEqual(
+            list(products.order_by().values_list("inventory", flat=True).distinct()),
+            [8],
+        )
+        self.assertFalse(Cart.objects.exists())
+
+    def test_checkout_out_of_stock(self):
+        products = self._fill_cart(3, inventory=1, quantity=1)
+        products.filter(product_code="3-2").update(inventory=0)
+        response, _ = self._checkout()
+
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Payment.objects.exists())
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Cart.objects.count(), 3)
+        self.assertEqual(
+            list(products.order_by("id").values_list("inventory", flat=True)),
+            [1, 1, 0],
+        )
+
+    def test_checkout_is_flat(self):
+        self._fill_cart(1)
+        response, small_cart_queries = self._checkout()
+        self.assertEqual(response.status_code, 200)
+
+        self._fill_cart(200)
+        response, large_cart_queries = self._checkout()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Order.objects.count(), 201)
+
+        self.assertEqual(small_cart_queries, large_cart_queries)
+
+
+class ReservationTest(BaseAPITestCase):
+    """Test reserving the inventory of pending payments."""
+
+    def setUp(self):
+        Group.objects.get_or_create(name=settings.DEFAULT_USER_GROUP)
+        self.user = create_customer("user1")
+        self.product = create_product(self.user, "product1", inventory=10)
+        self.client.force_authenticate(self.user)
+
+    def _checkout(self, quantity):
+        Cart.objects.create(user=self.user, product=self.product, quantity=quantity)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("payment:payment-list"), {"payment_type": "online"}
+            )
+        self.assertEqual(response.status_code, 200)
+        return Payment.objects.get(id=response.json()["invoice_number"])
+
+    def _set_status(self, payment, status):
+        return self.client.patch(
+            reverse("payment:payment-detail", kwargs={"pk": payment.id}),
+            {"status": status},
+        )
+
+    def _assert_inventory(self, inventory):
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.inventory, inventory)
+
+    def _expire(self, payment):
+        Payment.objects.filter(id=payment.id).update(
+            created_at=timezone.now()
+            - timedelta(seconds=settings.SHOP_RESERVATION_TIMEOUT + 1)
+        )
+
+    def test_settle_reservation(self):
+        payment = self._checkout(3)
+        self.assertEqual(payment.status, PENDING)
+        self._assert_inventory(7)
+
+        self.assertEqual(self._set_status(payment, SUCCESS).status_code, 200)
+        self._assert_inventory(7)
+        # A paid payment isn't canceled, its inventory was sold.
+        for status in inventory.RELEASE_STATUSES:
+            self.assertEqual(self._set_status(payment, status).status_code, 409)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, SUCCESS)
+        self._assert_inventory(7)
+
+        payment = self._checkout(4)
+        self._assert_inventory(3)
+        self.assertEqual(self._set_status(payment, CANCEL).status_code, 200)
+        self._assert_inventory(7)
+
+        # A settled reservation isn't given back twice.
+        self.assertEqual(self._set_status(payment, FAIL).status_code, 200)
+        self.assertEqual(self._set_status(payment, SUCCESS).status_code, 409)
+        self.assertEqual(self._set_status(payment, "pending").status_code, 400)
+        self._assert_inventory(7)
+
+    def test_unknown_status(self):
+        payment = self._checkout(3)
+        self.assertEqual(self._set_status(payment, "foo").status_code, 400)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, PENDING)
+        self._assert_inventory(7)
+
+    def test_failed_update_keeps_reservation(self):
+        payment = self._checkout(3)
+        with patch.object(PaymentSerializer, "save", side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self._set_status(payment, CANCEL)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, PENDING)
+        self._assert_inventory(7)
+
+    def test_reservation_race(self):
+        Cart.objects.create(user=self.user, product=self.product, quantity=6)
+        lock_products = inventory._lock_products
+
+        def lock_after_concurrent_checkout(product_ids):
+            # Another checkout took items after this one read its cart.
+            Product.objects.non_polymorphic().filter(pk=self.product.pk).update(
+                inventory=F("inventory") - 5
+            )
+            lock_products(product_ids)
+
+        with patch.object(
+            inventory, "_lock_products", side_effect=lock_after_concurrent_checkout
+        ):
+            response = self.client.post(
+                reverse("payment:payment-list"), {"payment_type": "online"}
+            )
+        # The locked inventory was checked, not the one read before.
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Payment.objects.exists())
+        # The simulated checkout ran in the same transaction, rolled back too.
+        self._assert_inventory(10)
+
+    def test_release_expired_reservations(self):
+        held_payment = self._checkout(2)
+        expired_payment = self._checkout(3)
+        self._assert_inventory(5)
+        self._expire(expired_payment)
+
+        self.assertEqual(inventory.release_expired(), 1)
+        self.assertEqual(inventory.release_expired(), 0)
+        self._assert_inventory(8)
+
+        expired_payment.refresh_from_db()
+        self.assertEqual(expired_payment.status, EXPIRED)
+        response = self._set_status(expired_payment, SUCCESS)
+        self.assertEqual(response.status_code, 409)
+
+        # The reservation expired before its payment is confirmed.
+        self._expire(held_payment)
+        inventory.release_expired()
+        response = self._set_status(held_payment, SUCCESS)
+        self.assertEqual(response.status_code, 409)
+        self._assert_inventory(10)
+
+
+@unittest.skipUnless(
+    connection.vendor == "postgresql", "needs a database with row-level locks"
+)
+class ConcurrentCheckoutTest(APITransactionTestCase):
+    """Test checking out the same products concurrently."""
+
+    customers = 30
+    stock = 10
+
+    def setUp(self):
+        Group.objects.get_or_create(name=settings.DEFAULT_USER_GROUP)
+        self.users = [
+            create_customer(f"user{index}") for index in range(self.customers)
+        ]
+        self.products = [
+            create_product(self.users[0], f"product{index}", inventory=self.stock)
+            for index in range(2)
+        ]
+        for index, user in enumerate(self.users):
+            # Half of the carts are created in the opposite order.
+            for product in self.products[:: 1 if index % 2 else -1]:
+                Cart.objects.create(user=user, product=product, quantity=1)
+
+    def _checkout(self, user):
+        try:
+            client = APIClient()
+            client.force_authenticate(user)
+            return client.post(
+                reverse("payment:payment-list"), {"payment_type": "online"}
+            ).status_code
+        finally:
+            connections.close_all()
+
+    def test_no_oversell(self):
+        with ThreadPoolExecutor(max_workers=self.customers) as executor:
+            status_codes = list(executor.map(self._checkout, self.users))
+
+        self.assertEqual(status_codes.count(200), self.stock)
+        self.assertEqual(status_codes.count(409), self.customers - self.stock)
+        self.assertEqual(
+            list(
+                Product.objects.filter(
+                    id__in=[product.id for product in self.products]
+                ).values_list("inventory", flat=True)
+            ),
+            [0, 0],
+        )
+        self.assertEqual(Order.objects.count(), 2 * self.stock)
@@ -1,16 +1,26 @@
 """Payment views."""
-from datetime import datetime
+from collections import defaultdict
+
+from django.db import transaction
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from .serializers import PaymentSerializer, OrderSerializer
-from .models import Payment, Order
+from .models import PENDING, SUCCESS, Order, Payment
 from base.views import BaseViewSet
 from rest_framework import permissions, generics
 
 from account.models import Address
-from shop.product.models import Product
 from shop.cart.models import Cart
 from shop.payment.models import Payment
+from shop.price import engine
+
+from . import inventory
+from .exceptions import (
+    DeliveryAddressNotFound,
+    PaymentAlreadyPaid,
+    ReservationReleased,
+)
 
 
 class OrderViewSet(
@@ -40,66 +50,90 @@ class PaymentViewSet(
     serializer_class = PaymentSerializer
     # alternative_lookup_field = "invoice_number"
 
-    def fill_payment(self, request, *args):
-        # user = self.request.user
-        # carts = Cart.objects.filter(is_deleted=False, user=user)
-        total_price = 0
-        discount = 0
-        for item in args[1]:
-            product = Product.objects.get(id=item.product_id)
-            if product.discount:
-                if not product.end or datetime.utcnow <= product.end:
-                    if not product.start or datetime.utcnow >= product.start:
-                        discount = product.discount
-
-            total_price += (item.quantity * (product.sel_price - discount))
-
-        payment = Payment.objects.create(
-            user=args[0],
-            total_payment=total_price,
-            payment_type=request.data["payment_type"] if request.data["payment_type"] else '',
-            status=request.data["status"] if request.data["status"] else '',
-            # bank_response =
-            bank_id=request.data["bank_id"] if request.data["bank_id"] else '',
-            # batch_number =
-        )
-        # carts.delete()
-        return Response({
-            "invoice_number": payment.id,
-            "total_payment": total_price
-        })
-
     def fill_order(self, request):
+        """Check out the user's cart.
+
+        The cart and its products are read in one query, priced in one pass and
+        turned into orders with one bulk insert. The ordered quantities are
+        reserved until the payment is settled. The whole checkout is atomic.
+        """
         user = self.request.user
-        carts = Cart.objects.filter(is_deleted=False, user=user)
-        total_price = 0
-        discount = 0
-        if carts:
-            payment = self.fill_payment(request, user, carts)
-            for item in carts:
-                product = Product.objects.get(id=item.product_id)
-                if product.discount:
-                    if not product.end or datetime.utcnow <= product.end:
-                        if not product.start or datetime.utcnow >= product.start:
-                            discount = product.discount
-
-                total_price = (item.quantity * (product.sel_price - discount))
-                Order.objects.create(
-                    user=item.user,
-                    delivery_address=Address.objects.filter(is_deleted=False, user=user).first(),
-                    product=item.product,
-                    quantity=item.quantity,
-                    total_price=total_price,
-                    invoice_number=payment.data['invoice_number'],
+        with transaction.atomic():
+            carts = list(
+                Cart.objects.filter(is_deleted=False, user=user).select_related(
+                    "product"
+                )
+            )
+            if not carts:
+                return Response(
+                    {"Failed": True, "Message": "Cart had not any products."},
+                    status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            # Add any more information to payment.data here
-            # payment.data.append(.....)
+            delivery_address = Address.objects.filter(
+                is_deleted=False, user=user
+            ).first()
+            if not delivery_address:
+                raise DeliveryAddressNotFound
 
-            carts.delete()
-            return Response(payment.data, status=status.HTTP_200_OK)
-        return Response({"Failed": True, "Message": "Cart had not any products."}, status=status.HTTP_400_BAD_REQUEST)
+            lines, total_payment = engine.price_lines(
+                (item.product, item.quantity) for item in carts
+            )
+            quantities = defaultdict(int)
+            for item in carts:
+                quantities[item.product_id] += item.quantity
+            inventory.reserve(quantities)
+
+            payment = Payment.objects.create(
+                user=user,
+                total_payment=total_payment,
+                payment_type=request.data.get("payment_type") or "",
+                status=PENDING,
+                bank_id=request.data.get("bank_id") or None,
+            )
+            Order.objects.bulk_create(
+                [
+                    Order(
+                        user=user,
+                        delivery_address=delivery_address,
+                        product_id=item.product_id,
+                        quantity=item.quantity,
+                        total_price=line.total_price,
+                        invoice_number=payment.id,
+                    )
+                    for item, line in zip(carts, lines)
+                ]
+            )
+            Cart.objects.filter(id__in=[item.id for item in carts]).delete()
+
+        return Response(
+            {"invoice_number": payment.id, "total_payment": payment.total_payment},
+            status=status.HTTP_200_OK,
+        )
 
     def create(self, request, *args, **kwargs):
         return self.fill_order(request)
         # return super().create()
+
+    def perform_update(self, serializer):
+        """DRF built-in method.
+
+        Settle the reservation when a pending payment gets its status, in the
+        same transaction as the payment's other changes. A paid payment keeps
+        its status, its inventory was sold.
+        """
+        new_status = serializer.validated_data.get("status")
+        with transaction.atomic():
+            if not new_status or new_status == serializer.instance.status:
+                pass
+            elif new_status == PENDING:
+                raise ValidationError({"status": ["A payment can't be pending again."]})
+            elif serializer.instance.status == SUCCESS:
+                raise PaymentAlreadyPaid
+            elif serializer.instance.status in inventory.RELEASE_STATUSES:
+                if new_status not in inventory.RELEASE_STATUSES:
+                    raise ReservationReleased
+            elif serializer.instance.status == PENDING:
+                if not inventory.settle(serializer.instance.id, new_status):
+                    raise ReservationReleased
+            serializer.save()
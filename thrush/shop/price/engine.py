@@ -0,0 +1,206 @@
+"""Pricing engine.
+
+A product is sold at its active price: the latest non-deleted `Price` row whose
+start/end window covers now. Products without an active price are sold at their
+selling price, minus their discount during its start/end window.
+
+Prices are resolved for a whole cart with one query and computed in one pass.
+Listings use the active prices cached by `current_prices` instead.
+"""
+from collections import defaultdict
+from typing import Iterable, NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from base.cache import get_versioned_keys
+from shop.product.models import Product
+
+from .models import CURRENT_PRICE_KEY, Price
+
+
+class PricedLine(NamedTuple):
+    """Priced line of a cart."""
+
+    product_id: int
+    quantity: int
+    unit_price: int
+    total_price: int
+
+
+def active_prices(product_ids: Iterable[int], now=None) -> dict:
+    """Get the active prices of products.
+
+    Args:
+        product_ids (Iterable[int]): product IDs.
+        now (datetime, optional): pricing time, defaults to now.
+
+    Returns:
+        dict: active `Price` by product ID, products without one are missing.
+    """
+    now = now or timezone.now()
+    prices = {}
+    for price in (
+        Price.objects.active_at(now)
+        .filter(product_id__in=product_ids)
+        .order_by("product_id", "-id")
+        .only("product_id", "price", "discount")
+    ):
+        prices.setdefault(price.product_id, price)
+    return prices
+
+
+def unit_price(product: Product, price: Price = None, now=None) -> int:
+    """Get the unit price of a product.
+
+    Args:
+        product (Product): priced product.
+        price (Price, optional): product's active price.
+        now (datetime, optional): pricing time, defaults to now.
+
+    Returns:
+        int: discounted unit price.
+    """
+    if price is not None:
+        return max(price.price - price.discount, 0)
+
+    now = now or timezone.now()
+    if (
+        product.discount
+        and (not product.start or product.start <= now)
+        and (not product.end or now <= product.end)
+    ):
+        return max(product.sel_price - product.discount, 0)
+    return product.sel_price
+
+
+def _cache_timeout(rows, now) -> int:
+    """Get how long the active price of a product can be cached.
+
+    Args:
+        rows (list): product's prices which aren't over yet, latest first.
+        now (datetime): caching time.
+
+    Returns:
+        int: seconds until the active price ends or another price starts.
+    """
+    changes = [
+        change
+        for row in rows
+        for change in (row.start, row.end)
+        if change is not None and change > now
+    ]
+    if not changes:
+        return settings.SHOP_PRICE_CACHE_TIMEOUT
+    seconds = int((min(changes) - now).total_seconds())
+    return max(min(seconds, settings.SHOP_PRICE_CACHE_TIMEOUT), 1)
+
+
+def current_prices(products: Iterable[Product]) -> dict:
+    """Get the current unit prices of products, for listings.
+
+    The active price of each product is cached under a versioned key until a
+    price of the product is saved or deleted, or the price window changes.
+    Cache misses are resolved with one query.
+
+    Args:
+        products (Iterable[Product]): listed products.
+
+    Returns:
+        dict: unit price by product ID.
+    """
+    now = timezone.now()
+    products = list(products)
+    keys = {product.id: CURRENT_PRICE_KEY.format(product.id) for product in products}
+    versioned_keys = get_versioned_keys(
+        keys.values(), settings.SHOP_PRICE_CACHE_TIMEOUT
+    )
+    keys = {product_id: versioned_keys[key] for product_id, key in keys.items()}
+    cached = cache.get_many(keys.values())
+    missing_ids = [product_id for product_id, key in keys.items() if key not in cached]
+
+    if missing_ids:
+        rows = defaultdict(list)
+        for price in (
+            Price.objects.filter(Q(end__isnull=True) | Q(end__gte=now))
+            .filter(product_id__in=missing_ids)
+            .order_by("product_id", "-id")
+            .only("product_id", "price", "discount", "start", "end")
+        ):
+            rows[price.product_id].append(price)
+
+        values_by_timeout = defaultdict(dict)
+        for product_id in missing_ids:
+            active = next(
+                (
+                    price
+                    for price in rows[product_id]
+                    if not price.start or price.start <= now
+                ),
+                None,
+            )
+            # An empty tuple tells there's no active price.
+            value = (active.price, active.discount) if active else ()
+            cached[keys[product_id]] = value
+            timeout = _cache_timeout(rows[product_id], now)
+            values_by_timeout[timeout][keys[product_id]] = value
+        for timeout, values in values_by_timeout.items():
+            cache.set_many(values, timeout)
+
+    prices = {}
+    for product in products:
+        value = cached[keys[product.id]]
+        price = Price(price=value[0], discount=value[1]) if value else None
+        prices[product.id] = unit_price(product, price, now)
+    return prices
+
+
+def price_lines(items: Iterable, now=None) -> tuple:
+    """Price the lines of a cart.
+
+    Args:
+        items (Iterable): (product, quantity) pairs.
+        now (datetime, optional): pricing time, defaults to now.
+
+    Returns:
+        tuple: list of `PricedLine` and the total price.
+    """
+    now = now or timezone.now()
+    items = list(items)
+    prices = active_prices({product.id for product, _ in items}, now)
+
+    lines = []
+    for product, quantity in items:
+        price = unit_price(product, prices.get(product.id), now)
+        lines.append(PricedLine(product.id, quantity, price, price * quantity))
+    return lines, sum(line.total_price for line in lines)
+
+
+def quote(quantities: dict, now=None) -> tuple:
+    """Price products by their IDs.
+
+    Args:
+        quantities (dict): quantity by product ID.
+        now (datetime, optional): pricing time, defaults to now.
+
+    Returns:
+        tuple: list of `PricedLine`, the total price and the set of unknown
+            product IDs.
+    """
+    products = (
+        Product.objects.non_polymorphic()
+        .filter(pk__in=quantities, is_deleted=False)
+        .only("id", "sel_price", "discount", "start", "end")
+        .in_bulk()
+    )
+    lines, total_price = price_lines(
+        (
+            (products[product_id], quantity)
+            for product_id, quantity in quantities.items()
+            if product_id in products
+        ),
+        now,
+    )
+    return lines, total_price, set(quantities) - set(products)
@@ -0,0 +1,33 @@
+# Generated by Django 4.0.1 on 2026-10-18 21:14
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Price',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('inventory', models.IntegerField()),
+                ('price', models.PositiveIntegerField()),
+                ('discount', models.PositiveSmallIntegerField(default=0)),
+                ('start', models.DateTimeField(blank=True, default=datetime.datetime.utcnow, null=True)),
+                ('end', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'abstract': False,
+            },
+        ),
+    ]
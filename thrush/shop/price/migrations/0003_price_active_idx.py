@@ -0,0 +1,17 @@
+# Generated by Django 4.0.1 on 2026-10-18 21:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('price', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='price',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['product', 'start', 'end'], name='price_active_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.1 on 2026-10-18 21:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('price', '0003_price_active_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='price',
+            index=models.Index(fields=['created_at', 'id'], name='price_keyset_idx'),
+        ),
+    ]
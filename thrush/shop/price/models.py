@@ -2,9 +2,30 @@
 from datetime import datetime
 
 from django.db import models
-from base.models import Base
+from django.db.models import Q, signals
+from django.dispatch import receiver
+from base.cache import forget_versions
+from base.models import Base, BaseManager
 from shop.product.models import Product
 
+# Cached active price of a product, see `shop.price.engine.current_prices`.
+CURRENT_PRICE_KEY = "shop:price:{}"
+
+
+class PriceQuerySet(models.QuerySet):
+    """Price query set."""
+
+    def active_at(self, timestamp):
+        """Filter prices whose start/end window covers a time.
+
+        Args:
+            timestamp (datetime): time of the prices.
+        """
+        return self.filter(
+            Q(start__isnull=True) | Q(start__lte=timestamp),
+            Q(end__isnull=True) | Q(end__gte=timestamp),
+        )
+
 
 class Price(Base):
     """Price model."""
@@ -16,8 +37,31 @@ class Price(Base):
     start = models.DateTimeField(default=datetime.utcnow, blank=True, null=True)
     end = models.DateTimeField(blank=True, null=True)
 
+    objects = BaseManager.from_queryset(PriceQuerySet)()
+
+    class Meta(Base.Meta):
+        indexes = [
+            *Base.Meta.indexes,
+            # Looking up the active prices of products.
+            models.Index(
+                fields=["product", "start", "end"],
+                name="price_active_idx",
+                condition=Q(is_deleted=False),
+            ),
+        ]
+
     def __str__(self):
         if self.is_deleted:
             return f"{self.product.name} ({self.inventory}:{self.price}/{self.discount}) [deleted]"
         return f"{self.product.name} ({self.inventory}:{self.price}/{self.discount})"
 
+
+@receiver(signals.post_save, sender=Price)
+@receiver(signals.post_delete, sender=Price)
+def price_invalidate_current_price(instance, **_):
+    """Forget the cached active price of the product, once committed.
+
+    Its version is forgotten, so a price cached from the old rows meanwhile
+    isn't read either.
+    """
+    forget_versions([CURRENT_PRICE_KEY.format(instance.product_id)])
@@ -1,6 +1,7 @@
 """Price serializers."""
 from rest_framework import serializers
 
+from . import engine
 from .models import Price
 
 
@@ -20,3 +21,30 @@ class PriceSerializer(serializers.ModelSerializer):
             "end",
         )
 
+
+class QuoteItemSerializer(serializers.Serializer):
+    """Quoted cart line serializer."""
+
+    product = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+class QuoteSerializer(serializers.Serializer):
+    """Quote request serializer."""
+
+    items = QuoteItemSerializer(many=True, allow_empty=False)
+
+
+class CurrentPriceField(serializers.ReadOnlyField):
+    """Product's current unit price, priced by the listing view if it's listed."""
+
+    def __init__(self, **kwargs):
+        kwargs["source"] = "*"
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        """DRF built-in method."""
+        prices = self.context.get("prices") or {}
+        if value.id not in prices:
+            prices = engine.current_prices([value])
+        return prices[value.id]
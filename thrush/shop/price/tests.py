@@ -1,3 +1,345 @@
-from django.test import TestCase
+"""Price tests."""
+import time
+from datetime import timedelta
+from unittest.mock import Mock, patch
 
-# Create your tests here.
+from base.tests import BaseAPITestCase
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from account.models import User
+from base.cache import forget_versions
+from base.models import Category
+from shop.cart.models import Cart
+from shop.payment.tests import create_customer, create_product
+from shop.product.models import Product
+
+from . import engine
+from .models import CURRENT_PRICE_KEY, Price
+
+
+class PricingEngineTest(BaseAPITestCase):
+    """Test resolving and computing prices."""
+
+    def setUp(self):
+        Group.objects.get_or_create(name=settings.DEFAULT_USER_GROUP)
+        self.user = create_customer("user1")
+        self.products = [
+            create_product(self.user, f"product{index}", inventory=10)
+            for index in range(3)
+        ]
+        self.now = timezone.now()
+
+    def _price(self, product, price, discount=0, start=None, end=None, **kwargs):
+        return Price.objects.create(
+            product=product,
+            inventory=10,
+            price=price,
+            discount=discount,
+            start=start,
+            end=end,
+            **kwargs,
+        )
+
+    def test_active_prices(self):
+        day = timedelta(days=1)
+        self._price(self.products[0], 200)
+        self._price(self.products[0], 300, discount=20, start=self.now - day)
+        self._price(self.products[0], 400, start=self.now + day)
+        self._price(self.products[0], 500, end=self.now - day)
+        self._price(self.products[0], 600, is_deleted=True)
+        self._price(self.products[1], 700, end=self.now + day)
+
+        with self.assertNumQueries(1):
+            prices = engine.active_prices(
+                [product.id for product in self.products], self.now
+            )
+        self.assertEqual(prices[self.products[0].id].price, 300)
+        self.assertEqual(prices[self.products[1].id].price, 700)
+        self.assertNotIn(self.products[2].id, prices)
+
+        Product.objects.filter(id=self.products[2].id).update(
+            discount=30, start=self.now - day, end=self.now + day
+        )
+        self.products[2].refresh_from_db()
+        with self.assertNumQueries(1):
+            lines, total_price = engine.price_lines(
+                ((product, 2) for product in self.products), self.now
+            )
+        self.assertEqual(
+            [(line.unit_price, line.total_price) for line in lines],
+            [(280, 560), (700, 1400), (70, 140)],
+        )
+        self.assertEqual(total_price, 2100)
+
+        # The product's discount window is over.
+        lines, _ = engine.price_lines([(self.products[2], 1)], self.now + 2 * day)
+        self.assertEqual(lines[0].unit_price, 100)
+
+    def test_quote(self):
+        self._price(self.products[0], 200, discount=50)
+        response = self.client.post(
+            reverse("price:quote"),
+            {
+                "items": [
+                    {"product": self.products[0].id, "quantity": 2},
+                    {"product": self.products[1].id, "quantity": 1},
+                    {"product": self.products[0].id, "quantity": 1},
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertDictEqual(
+            response.json(),
+            {
+                "items": [
+                    {
+                        "product": self.products[0].id,
+                        "quantity": 3,
+                        "unit_price": 150,
+                        "total_price": 450,
+                    },
+                    {
+                        "product": self.products[1].id,
+                        "quantity": 1,
+                        "unit_price": 100,
+                        "total_price": 100,
+                    },
+                ],
+                "total_price": 550,
+            },
+        )
+
+        response = self.client.post(
+            reverse("price:quote"),
+            {"items": [{"product": 0}, {"product": 999999}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_cart_listing(self):
+        self._price(self.products[0], 200, discount=50)
+        for product in self.products:
+            Cart.objects.create(user=self.user, product=product, quantity=2)
+        self.client.force_authenticate(self.user)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("cart:cart-list"))
+        self.assertEqual(
+            [
+                (cart["unit_price"], cart["total_price"])
+                for cart in response.json()["results"]
+            ],
+            [(150, 300), (100, 200), (100, 200)],
+        )
+
+    def test_cart_listing_of_other_users(self):
+        user = User.objects.create_user(
+            username="user2", mobile="user2", is_active=True
+        )
+        cart = Cart.objects.create(user=user, product=self.products[0], quantity=1)
+        Cart.objects.create(user=self.user, product=self.products[0], quantity=2)
+        self.client.force_authenticate(user)
+
+        response = self.client.get(reverse("cart:cart-list"))
+        self.assertEqual([cart["id"] for cart in response.json()["results"]], [cart.id])
+
+    def test_checkout_uses_active_price(self):
+        self._price(self.products[0], 200, discount=50)
+        Cart.objects.create(user=self.user, product=self.products[0], quantity=2)
+        self.client.force_authenticate(self.user)
+
+        response = self.client.post(
+            reverse("payment:payment-list"), {"payment_type": "online"}
+        )
+        self.assertEqual(response.json()["total_payment"], 300)
+
+
+class CurrentPriceTest(BaseAPITestCase):
+    """Test caching the current prices of products."""
+
+    def setUp(self):
+        Group.objects.get_or_create(name=settings.DEFAULT_USER_GROUP)
+        self.user = create_customer("user1")
+        self.products = [
+            create_product(self.user, f"product{index}", inventory=10)
+            for index in range(3)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            forget_versions(
+                CURRENT_PRICE_KEY.format(product.id) for product in self.products
+            )
+
+    def test_active_at(self):
+        now = timezone.now()
+        price = Price.objects.create(
+            product=self.products[0],
+            inventory=10,
+            price=200,
+            start=now,
+            end=now + timedelta(hours=1),
+        )
+        self.assertEqual(list(Price.objects.active_at(now)), [price])
+        self.assertFalse(Price.objects.active_at(now - timedelta(seconds=1)))
+        self.assertFalse(Price.objects.active_at(now + timedelta(hours=2)))
+
+    def test_current_prices_are_cached(self):
+        price = Price.objects.create(
+            product=self.products[0], inventory=10, price=200, start=None
+        )
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                engine.current_prices(self.products),
+                {
+                    self.products[0].id: 200,
+                    self.products[1].id: 100,
+                    self.products[2].id: 100,
+                },
+            )
+        with self.assertNumQueries(0):
+            engine.current_prices(self.products)
+
+        # Saving or deleting a price forgets the cached one once committed.
+        with self.captureOnCommitCallbacks() as callbacks:
+            price.discount = 20
+            price.save()
+        with self.assertNumQueries(0):
+            engine.current_prices(self.products[:1])
+        for callback in callbacks:
+            callback()
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                engine.current_prices(self.products[:1]), {self.products[0].id: 180}
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            price.delete()
+        self.assertEqual(
+            engine.current_prices(self.products[:1]), {self.products[0].id: 100}
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            new_price = Price.objects.create(
+                product=self.products[0], inventory=10, price=300, start=None
+            )
+        self.assertEqual(
+            engine.current_prices(self.products[:1]), {self.products[0].id: 300}
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            Price.objects.filter(id=new_price.id).delete()
+        self.assertEqual(
+            engine.current_prices(self.products[:1]), {self.products[0].id: 100}
+        )
+
+    def test_price_read_before_commit_isnt_cached(self):
+        price = Price.objects.create(
+            product=self.products[0], inventory=10, price=200, start=None
+        )
+
+        def change_price(values, timeout):
+            # The price changes after a listing read it, before it's cached.
+            with self.captureOnCommitCallbacks(execute=True):
+                price.discount = 20
+                price.save()
+            cache.set_many(values, timeout)
+
+        with patch.object(engine, "cache", Mock(wraps=cache)) as mocked_cache:
+            mocked_cache.set_many.side_effect = change_price
+            engine.current_prices(self.products[:1])
+        self.assertEqual(
+            engine.current_prices(self.products[:1]), {self.products[0].id: 180}
+        )
+
+    def test_cache_timeout(self):
+        now = timezone.now()
+        rows = [
+            Price(start=now - timedelta(days=1), end=now + timedelta(minutes=5)),
+            Price(start=now + timedelta(minutes=2), end=None),
+        ]
+        self.assertEqual(engine._cache_timeout(rows, now), 120)
+        self.assertEqual(
+            engine._cache_timeout(rows[:1], now + timedelta(minutes=10)),
+            settings.SHOP_PRICE_CACHE_TIMEOUT,
+        )
+
+    def test_product_listing(self):
+        for product in self.products:
+            Price.objects.create(product=product, inventory=10, price=200, start=None)
+        engine.current_prices(self.products)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse("product:products-list"))
+        self.assertEqual(
+            [product["current_price"] for product in response.json()["results"]],
+            [200, 200, 200],
+        )
+        self.assertFalse(
+            [
+                query
+                for query in context.captured_queries
+                if Price._meta.db_table in query["sql"]
+            ]
+        )
+
+
+class PricingBenchmarkTest(BaseAPITestCase):
+    """Benchmark pricing big carts."""
+
+    lines = 10000
+
+    def setUp(self):
+        Group.objects.get_or_create(name=settings.DEFAULT_USER_GROUP)
+        user = create_customer("user1")
+        category = Category.objects.create(name="cat1")
+        Product.objects.bulk_create(
+            [
+                Product(
+                    name=f"product {index}",
+                    description="description",
+                    seller=user,
+                    category=category,
+                    product_code=str(index),
+                    image="https://localhost/image.png",
+                    inventory=10,
+                    buy_price=50,
+                    sel_price=100,
+                    discount=10,
+                    start=None,
+                    extra={},
+                )
+                for index in range(self.lines)
+            ]
+        )
+        self.products = list(Product.objects.non_polymorphic())
+        Price.objects.bulk_create(
+            [
+                Price(product=product, inventory=10, price=200, start=None)
+                for product in self.products[::2]
+            ]
+        )
+
+    def test_price_big_cart(self):
+        with self.assertNumQueries(1):
+            started_at = time.perf_counter()
+            lines, total_price = engine.price_lines(
+                (product, 3) for product in self.products
+            )
+            elapsed = time.perf_counter() - started_at
+
+        self.assertEqual(len(lines), self.lines)
+        self.assertEqual(total_price, self.lines // 2 * 3 * (200 + 90))
+        # Generous bound, it takes a few tens of milliseconds.
+        self.assertLess(elapsed, 2)
+
+    def test_quote_big_cart(self):
+        quantities = {product.id: 1 for product in self.products}
+        with self.assertNumQueries(2):
+            lines, total_price, unknown_products = engine.quote(quantities)
+
+        self.assertEqual(len(lines), self.lines)
+        self.assertEqual(total_price, self.lines // 2 * (200 + 90))
+        self.assertFalse(unknown_products)
@@ -2,11 +2,13 @@
 from django.urls import include, path
 from rest_framework import routers
 
-from .views import PriceViewSet
+from .views import PriceViewSet, QuoteView
 
 router = routers.DefaultRouter()
 router.register("", PriceViewSet, basename="price")
 
 urlpatterns = [
+    # Before the router, so "quote" isn't taken for a price ID.
+    path("quote/", QuoteView.as_view(), name="quote"),
     path("", include(router.urls)),
 ]
@@ -1,10 +1,15 @@
 """Price views."""
+from collections import defaultdict
+
 from base.views import BaseViewSet
 from django_filters import rest_framework as filters
-from rest_framework import generics, permissions
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import generics, permissions, status, views
+from rest_framework.response import Response
 
+from . import engine
 from .models import Price
-from .serializers import PriceSerializer
+from .serializers import PriceSerializer, QuoteSerializer
 
 
 class PriceFilterSet(filters.FilterSet):
@@ -20,6 +25,22 @@ class PriceFilterSet(filters.FilterSet):
         fields = ("min_price", "max_price", "min_discount", "max_discount", "inventory")
 
 
+class CurrentPriceMixin:
+    """Price the listed products together, for `CurrentPriceField`."""
+
+    def paginate_queryset(self, queryset):
+        """DRF built-in method."""
+        page = super().paginate_queryset(queryset)
+        self.prices = engine.current_prices(queryset if page is None else page)
+        return page
+
+    def get_serializer_context(self):
+        """DRF built-in method."""
+        context = super().get_serializer_context()
+        context["prices"] = getattr(self, "prices", None)
+        return context
+
+
 class PriceViewSet(
     BaseViewSet,
     generics.ListCreateAPIView,
@@ -32,3 +53,41 @@ class PriceViewSet(
     queryset = Price.objects.all()
     serializer_class = PriceSerializer
     filterset_class = PriceFilterSet
+
+
+class QuoteView(views.APIView):
+    """Quote view."""
+
+    permission_classes = [permissions.AllowAny]
+
+    @swagger_auto_schema(request_body=QuoteSerializer)
+    def post(self, request):
+        """Handle POST method to price a cart without checking it out."""
+        serializer = QuoteSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        quantities = defaultdict(int)
+        for item in serializer.validated_data["items"]:
+            quantities[item["product"]] += item["quantity"]
+        lines, total_price, unknown_products = engine.quote(quantities)
+        if unknown_products:
+            return Response(
+                {"items": [f"unknown products: {sorted(unknown_products)}"]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response(
+            {
+                "items": [
+                    {
+                        "product": line.product_id,
+                        "quantity": line.quantity,
+                        "unit_price": line.unit_price,
+                        "total_price": line.total_price,
+                    }
+                    for line in lines
+                ],
+                "total_price": total_price,
+            }
+        )
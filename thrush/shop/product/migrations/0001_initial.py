@@ -0,0 +1,224 @@
+# Generated by Django 4.0.1 on 2026-10-18 21:14
+
+import datetime
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import shop.product.models.product
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('base', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AudioIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('title', models.CharField(max_length=1024)),
+                ('file', models.URLField()),
+                ('duration', models.PositiveIntegerField()),
+                ('is_downloadable', models.BooleanField(default=False)),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='AudioType',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=3, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Author',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CompatibleDevice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=3, unique=True)),
+                ('version', models.CharField(max_length=20)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Product',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('name', models.CharField(max_length=120)),
+                ('description', models.TextField(max_length=255)),
+                ('product_code', models.CharField(max_length=255, unique=True)),
+                ('image', models.URLField()),
+                ('inventory', models.PositiveIntegerField()),
+                ('buy_price', models.PositiveIntegerField()),
+                ('sel_price', models.PositiveIntegerField()),
+                ('discount', models.PositiveSmallIntegerField(default=0)),
+                ('start', models.DateTimeField(blank=True, default=datetime.datetime.utcnow, null=True)),
+                ('end', models.DateTimeField(blank=True, null=True)),
+                ('extra', models.JSONField()),
+                ('is_approved', models.BooleanField(default=False)),
+                ('bookmarks', models.ManyToManyField(null=True, related_name='product_bookmarks', to=settings.AUTH_USER_MODEL)),
+                ('category', models.ForeignKey(on_delete=models.SET(shop.product.models.product.get_deleted_category), to='base.category')),
+                ('polymorphic_ctype', models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='polymorphic_%(app_label)s.%(class)s_set+', to='contenttypes.contenttype')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+                'base_manager_name': 'objects',
+            },
+        ),
+        migrations.CreateModel(
+            name='Publisher',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('name', models.CharField(max_length=120, unique=True)),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Speaker',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Translator',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AudioBook',
+            fields=[
+                ('product_ptr', models.OneToOneField(auto_created=True, on_delete=django.db.models.deletion.CASCADE, parent_link=True, primary_key=True, serialize=False, to='product.product')),
+                ('intro', models.URLField()),
+                ('published_year', models.PositiveSmallIntegerField()),
+                ('is_downloadable', models.BooleanField(default=False)),
+                ('audio_publisher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audio_publisher', to='product.publisher')),
+                ('audio_type', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, to='product.audiotype')),
+                ('authors', models.ManyToManyField(to='product.Author')),
+                ('book_publisher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audio_book_publisher', to='product.publisher')),
+                ('compatible_devices', models.ManyToManyField(to='product.CompatibleDevice')),
+                ('indices', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, to='product.audioindex')),
+                ('speakers', models.ManyToManyField(to='product.Speaker')),
+                ('tags', models.ManyToManyField(to='base.Tag')),
+                ('translators', models.ManyToManyField(to='product.Translator')),
+            ],
+            options={
+                'abstract': False,
+                'base_manager_name': 'objects',
+            },
+            bases=('product.product',),
+        ),
+        migrations.CreateModel(
+            name='PaperBook',
+            fields=[
+                ('product_ptr', models.OneToOneField(auto_created=True, on_delete=django.db.models.deletion.CASCADE, parent_link=True, primary_key=True, serialize=False, to='product.product')),
+                ('intro', models.URLField()),
+                ('published_year', models.PositiveSmallIntegerField()),
+                ('authors', models.ManyToManyField(to='product.Author')),
+                ('book_publisher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='paper_book_publisher', to='product.publisher')),
+                ('tags', models.ManyToManyField(to='base.Tag')),
+                ('translators', models.ManyToManyField(to='product.Translator')),
+            ],
+            options={
+                'abstract': False,
+                'base_manager_name': 'objects',
+            },
+            bases=('product.product',),
+        ),
+        migrations.CreateModel(
+            name='PaperBookComment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('message', models.CharField(max_length=500)),
+                ('is_approved', models.BooleanField(default=False)),
+                ('reply_to', models.ForeignKey(default='', null=True, on_delete=django.db.models.deletion.CASCADE, to='product.paperbookcomment')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='paper_book_comment_user', to=settings.AUTH_USER_MODEL)),
+                ('Product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='paper_book_comments', to='product.paperbook')),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='AudioBookComment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('message', models.CharField(max_length=500)),
+                ('is_approved', models.BooleanField(default=False)),
+                ('reply_to', models.ForeignKey(default='', null=True, on_delete=django.db.models.deletion.CASCADE, to='product.audiobookcomment')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audio_book_comment_user', to=settings.AUTH_USER_MODEL)),
+                ('Product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audio_book_comments', to='product.audiobook')),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='PaperBookStar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('star', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(10)])),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='paper_book_star_user', to=settings.AUTH_USER_MODEL)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='paper_book_stars', to='product.paperbook')),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'unique_together': {('user', 'product')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AudioBookStar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('star', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(10)])),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audio_book_star_user', to=settings.AUTH_USER_MODEL)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audio_book_stars', to='product.audiobook')),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'unique_together': {('user', 'product')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.0.1 on 2026-10-18 21:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0002_product_stars'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='bookmarks_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.0.1 on 2026-10-18 21:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0003_product_bookmarks_count'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='product',
+            options={'base_manager_name': 'objects', 'ordering': ['created_at']},
+        ),
+        migrations.AddIndex(
+            model_name='audiobookcomment',
+            index=models.Index(fields=['created_at', 'id'], name='audiobookcomment_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='audiobookstar',
+            index=models.Index(fields=['created_at', 'id'], name='audiobookstar_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='audioindex',
+            index=models.Index(fields=['created_at', 'id'], name='audioindex_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paperbookcomment',
+            index=models.Index(fields=['created_at', 'id'], name='paperbookcomment_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paperbookstar',
+            index=models.Index(fields=['created_at', 'id'], name='paperbookstar_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['created_at', 'id'], name='product_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publisher',
+            index=models.Index(fields=['created_at', 'id'], name='publisher_keyset_idx'),
+        ),
+    ]
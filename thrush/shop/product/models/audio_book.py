@@ -148,8 +148,7 @@ class AudioBookStar(BaseStar):
     user = models.ForeignKey(User, related_name="audio_book_star_user", on_delete=models.CASCADE)
     product = models.ForeignKey(AudioBook, related_name="audio_book_stars", on_delete=models.CASCADE)
 
-    class Meta:
-        ordering = ["created_at"]
+    class Meta(BaseStar.Meta):
         unique_together = [("user", "product")]
 
     def __str__(self):
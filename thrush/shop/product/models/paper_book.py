@@ -93,8 +93,7 @@ class PaperBookStar(BaseStar):
     user = models.ForeignKey(User, related_name="paper_book_star_user", on_delete=models.CASCADE)
     product = models.ForeignKey(PaperBook, related_name="paper_book_stars", on_delete=models.CASCADE)
 
-    class Meta:
-        ordering = ["created_at"]
+    class Meta(BaseStar.Meta):
         unique_together = [("user", "product")]
 
     def __str__(self):
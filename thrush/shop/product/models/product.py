@@ -1,12 +1,15 @@
 """Product models."""
 from datetime import datetime
 from django.db import models
+from django.db.models import signals
+from django.dispatch import receiver
 # from account.models import User
 from base.models import Base
 # from polymorphic.models import PolymorphicModel
 from django.conf import settings
 # from base.models import BaseComment, BaseStar, Category
-from base.models import Category
+from base.bookmarks import bookmarks_changed
+from base.models import BaseBookmarked, BaseStarred, Category
 from polymorphic.models import PolymorphicModel
 
 
@@ -82,7 +85,7 @@ class Speaker(models.Model):
         return self.name
 
 
-class Product(PolymorphicModel, Base):
+class Product(PolymorphicModel, Base, BaseStarred, BaseBookmarked):
     """Product model."""
 
     name = models.CharField(max_length=120)
@@ -109,10 +112,17 @@ class Product(PolymorphicModel, Base):
     extra = models.JSONField()
     is_approved = models.BooleanField(default=False)
 
-    # class Meta:
-    #     abstract = True
+    class Meta(Base.Meta):
+        # Related products are fetched with the polymorphic manager.
+        base_manager_name = "objects"
 
     def __str__(self):
         if self.is_deleted:
             return f"{self.name} [deleted]"
         return self.name
+
+
+@receiver(signals.m2m_changed, sender=Product.bookmarks.through)
+def product_bookmarks_count(instance, action, reverse, pk_set, **_):
+    """Maintain the bookmarks count of products."""
+    bookmarks_changed(Product, instance, action, reverse, pk_set)
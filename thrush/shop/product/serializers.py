@@ -1,5 +1,6 @@
 """Product serializers."""
 from rest_framework import serializers
+from rest_polymorphic.serializers import PolymorphicSerializer
 # from base.models import Tag, Category
 from shop.product.models import (
     AudioType,
@@ -16,6 +17,7 @@ from shop.product.models import (
     AudioBook,
     PaperBook,
 )
+from shop.price.serializers import CurrentPriceField
 
 
 class PublisherSerializer(serializers.ModelSerializer):
@@ -127,35 +129,31 @@ class ProductSerializer(serializers.ModelSerializer):
 
     # url = serializers.HyperlinkedIdentityField(view_name="product:paper_book-detail")
     # bookmarks_count = serializers.SerializerMethodField()
+    current_price = CurrentPriceField()
 
     class Meta:
         model = Product
         # exclude = ["bookmarks"]
         fields = "__all__"
+        read_only_fields = (
+            "stars_count",
+            "stars_sum",
+            "stars_average",
+            "bookmarks_count",
+        )
 
     # def get_bookmarks_count(self, obj):
     #     """Get product's bookmarks count."""
     #     return obj.bookmarks.count()
 
 
-class AudioBookBookmarkSerializer(serializers.ModelSerializer):
-    """Bookmark serializer."""
-
-    product = serializers.PrimaryKeyRelatedField(source="id", read_only=True)
-
-    class Meta:
-        model = AudioBook
-        fields = ("product",)
-        ref_name = "product"
-
-
-class PaperBookBookmarkSerializer(serializers.ModelSerializer):
+class ProductBookmarkSerializer(serializers.ModelSerializer):
     """Bookmark serializer."""
 
-    product = serializers.PrimaryKeyRelatedField(source="id", read_only=True)
+    product = serializers.IntegerField(source="product_id", read_only=True)
 
     class Meta:
-        model = PaperBook
+        model = Product.bookmarks.through
         fields = ("product",)
         ref_name = "product"
 
@@ -164,28 +162,42 @@ class AudioBookSerializer(serializers.ModelSerializer):
     """Audio book serializer."""
 
     url = serializers.HyperlinkedIdentityField(view_name="product:audio_book-detail")
-    bookmarks_count = serializers.SerializerMethodField()
+    current_price = CurrentPriceField()
 
     class Meta:
         model = AudioBook
-        fields = "__all__"
-
-    def get_bookmarks_count(self, obj):
-        """Get product's bookmarks count."""
-        return obj.bookmarks.count()
+        exclude = ["bookmarks"]
+        read_only_fields = (
+            "stars_count",
+            "stars_sum",
+            "stars_average",
+            "bookmarks_count",
+        )
 
 
 class PaperBookSerializer(serializers.ModelSerializer):
     """Paper book serializer."""
 
     url = serializers.HyperlinkedIdentityField(view_name="product:paper_book-detail")
-    bookmarks_count = serializers.SerializerMethodField()
+    current_price = CurrentPriceField()
 
     class Meta:
         model = PaperBook
         exclude = ["bookmarks"]
         # fields = "__all__"
+        read_only_fields = (
+            "stars_count",
+            "stars_sum",
+            "stars_average",
+            "bookmarks_count",
+        )
+
+
+class ProductPolymorphicSerializer(PolymorphicSerializer):
+    """Product serializer, serializing each product with its type's serializer."""
 
-    def get_bookmarks_count(self, obj):
-        """Get product's bookmarks count."""
-        return obj.bookmarks.count()
+    model_serializer_mapping = {
+        Product: ProductSerializer,
+        PaperBook: PaperBookSerializer,
+        AudioBook: AudioBookSerializer,
+    }
@@ -1,3 +1,159 @@
-from django.test import TestCase
+"""Product tests."""
+from base.tests import BaseAPITestCase
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-# Create your tests here.
+from account.models import User
+from base.cache import forget_versions
+from base.models import Category, Tag
+from shop.price.models import CURRENT_PRICE_KEY
+
+from .models import (
+    AudioBook,
+    AudioIndex,
+    AudioType,
+    Author,
+    CompatibleDevice,
+    PaperBook,
+    Product,
+    Publisher,
+    Speaker,
+    Translator,
+)
+
+
+class BaseProductTest(BaseAPITestCase):
+    """Base test case creating products of every type."""
+
+    def setUp(self):
+        Group.objects.get_or_create(name=settings.DEFAULT_USER_GROUP)
+        self.user = User.objects.create_user(username="user1", mobile="123")
+        self.category = Category.objects.create(name="cat1")
+        self.publisher = Publisher.objects.create(name="publisher1")
+        self.audio_index = AudioIndex.objects.create(
+            title="index", file="https://localhost/index.mp3", duration=60
+        )
+        self.audio_type = AudioType.objects.create(name="mp3")
+        self.relations = {
+            "authors": Author.objects.create(name="author1"),
+            "translators": Translator.objects.create(name="translator1"),
+            "speakers": Speaker.objects.create(name="speaker1"),
+            "compatible_devices": CompatibleDevice.objects.create(
+                name="ios", version="15"
+            ),
+            "tags": Tag.objects.create(name="tag1"),
+            "bookmarks": self.user,
+        }
+
+    def _create_products(self, count):
+        for index in range(count):
+            code = f"{AudioBook.objects.count() + PaperBook.objects.count()}"
+            fields = {
+                "name": f"book {code}",
+                "description": "description",
+                "seller": self.user,
+                "category": self.category,
+                "product_code": code,
+                "image": "https://localhost/image.png",
+                "inventory": 10,
+                "buy_price": 50,
+                "sel_price": 100,
+                "extra": {},
+                "intro": "https://localhost/intro.mp3",
+                "book_publisher": self.publisher,
+                "published_year": 2022,
+            }
+            if index % 2:
+                book = PaperBook.objects.create(**fields)
+                relations = ("authors", "translators", "tags", "bookmarks")
+            else:
+                book = AudioBook.objects.create(
+                    audio_publisher=self.publisher,
+                    indices=self.audio_index,
+                    audio_type=self.audio_type,
+                    **fields,
+                )
+                relations = self.relations
+            for relation in relations:
+                getattr(book, relation).add(self.relations[relation])
+
+
+class ProductListingTest(BaseProductTest):
+    """Test the number of queries of the polymorphic product listing."""
+
+    def _list_products(self):
+        # Current prices aren't cached yet.
+        with self.captureOnCommitCallbacks(execute=True):
+            forget_versions(
+                CURRENT_PRICE_KEY.format(product_id)
+                for product_id in Product.objects.values_list("id", flat=True)
+            )
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse("product:products-list"))
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(context.captured_queries)
+
+    def test_product_listing(self):
+        self._create_products(2)
+        data, _ = self._list_products()
+
+        audio_book, paper_book = data["results"]
+        self.assertEqual(audio_book["resourcetype"], "AudioBook")
+        self.assertEqual(audio_book["speakers"], [self.relations["speakers"].id])
+        self.assertEqual(audio_book["bookmarks_count"], 1)
+        self.assertEqual(paper_book["resourcetype"], "PaperBook")
+        self.assertEqual(paper_book["authors"], [self.relations["authors"].id])
+        self.assertEqual(paper_book["bookmarks_count"], 1)
+        self.assertEqual(paper_book["current_price"], 100)
+
+    def test_product_listing_query_budget(self):
+        self._create_products(2)
+        _, mixed_page_queries = self._list_products()
+
+        self._create_products(settings.REST_FRAMEWORK["PAGE_SIZE"])
+        data, full_page_queries = self._list_products()
+        self.assertEqual(len(data["results"]), settings.REST_FRAMEWORK["PAGE_SIZE"])
+
+        # Page and prices, then one query per product type and relation.
+        self.assertEqual(mixed_page_queries, full_page_queries)
+        self.assertLessEqual(full_page_queries, 1 + 6 + 4 + 1)
+
+
+class ProductBookmarkTest(BaseProductTest):
+    """Test the product bookmark endpoints."""
+
+    def test_bookmark_by_product_type(self):
+        self._create_products(2)
+        audio_book, paper_book = AudioBook.objects.get(), PaperBook.objects.get()
+        user = User.objects.create_user(username="user2", mobile="456")
+        self.client.force_authenticate(user)
+
+        url = reverse("product:audio_book_bookmark-list")
+        response = self.client.post(url, {"product": paper_book.id})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.post(url, {"product": audio_book.id})
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post(
+            reverse("product:paper_book_bookmark-batch"),
+            {"add": [audio_book.id, paper_book.id]},
+            format="json",
+        )
+        self.assertEqual(response.json()["not_found"], [audio_book.id])
+
+        response = self.client.get(url)
+        self.assertEqual(response.json()["results"], [{"product": audio_book.id}])
+        response = self.client.delete(
+            reverse("product:audio_book_bookmark-detail", args=[paper_book.id])
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            list(
+                Product.objects.non_polymorphic()
+                .order_by("id")
+                .values_list("bookmarks_count", flat=True)
+            ),
+            [2, 2],
+        )
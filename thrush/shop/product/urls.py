@@ -21,7 +21,6 @@ from .views import (
 )
 
 router = routers.DefaultRouter()
-router.register("", ProductViewSet, basename="products")
 router.register("tags", TagViewSet, basename="tag")
 router.register("categories", CategoryViewSet, basename="category")
 router.register("audio_book_bookmarks", AudioBookBookmarkViewSet, basename="audio_book_bookmark")
@@ -37,6 +36,8 @@ router.register("book_translators", TranslatorViewSet, basename="book_translator
 router.register(
     "compatible_devices", CompatibleDeviceViewSet, basename="compatible_device"
 )
+# Last, so the other prefixes aren't taken for a product ID.
+router.register("", ProductViewSet, basename="products")
 
 # Nested router.
 # category_router = nested_routers.NestedDefaultRouter(
@@ -80,6 +81,16 @@ audio_speaker_router = nested_routers.NestedDefaultRouter(
 audio_speaker_router.register("audio_books", AudioBookViewSet, basename="audio_books")
 
 urlpatterns = [
+    path(
+        "audio_book_bookmarks/batch/",
+        AudioBookBookmarkViewSet.as_view({"post": "batch"}),
+        name="audio_book_bookmark-batch",
+    ),
+    path(
+        "paper_book_bookmarks/batch/",
+        PaperBookBookmarkViewSet.as_view({"post": "batch"}),
+        name="paper_book_bookmark-batch",
+    ),
     path("", include(router.urls)),
     # path("", include(category_router.urls)),
     path("", include(tag_router.urls)),
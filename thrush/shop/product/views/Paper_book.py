@@ -1,5 +1,6 @@
 """Audio book views."""
-from base.views import BaseViewSet
+from base.views import BaseViewSet, StarredFilterSet
+from django_filters import rest_framework as filters
 # from base.models import Product
 from shop.product.models import (
     # AudioBook,
@@ -22,9 +23,20 @@ from shop.product.serializers import (
     PaperBookSerializer
 )
 from rest_framework import generics, permissions
+from rest_framework.filters import OrderingFilter
+from shop.price.views import CurrentPriceMixin
+
+
+class PaperBookFilterSet(StarredFilterSet):
+    """Paper book filter set."""
+
+    class Meta:
+        model = PaperBook
+        fields = ("name", "min_stars", "max_stars")
 
 
 class PaperBookViewSet(
+    CurrentPriceMixin,
     BaseViewSet,
     generics.ListCreateAPIView,
     generics.RetrieveAPIView,
@@ -36,5 +48,11 @@ class PaperBookViewSet(
     queryset = PaperBook.objects.all()
     serializer_class = PaperBookSerializer
     alternative_lookup_field = "name"
-    filterset_fields = ("name",)
+    filter_backends = [filters.DjangoFilterBackend, OrderingFilter]
+    filterset_class = PaperBookFilterSet
+    ordering_fields = ("created_at", "stars_average")
+
+    def get_queryset(self):
+        """Products are listed for everyone, not only for their sellers."""
+        return self.queryset.all()
 
@@ -1,5 +1,6 @@
 """Audio book views."""
-from base.views import BaseViewSet
+from base.views import BaseViewSet, StarredFilterSet
+from django_filters import rest_framework as filters
 from shop.product.models import (
     AudioBook,
     AudioIndex,
@@ -19,6 +20,8 @@ from shop.product.serializers import (
     # PublisherSerializer,
 )
 from rest_framework import generics, permissions
+from rest_framework.filters import OrderingFilter
+from shop.price.views import CurrentPriceMixin
 
 
 class AudioTypeViewSet(
@@ -80,7 +83,16 @@ class AudioIndexViewSet(
     filterset_fields = ("is_downloadable",)
 
 
+class AudioBookFilterSet(StarredFilterSet):
+    """Audio book filter set."""
+
+    class Meta:
+        model = AudioBook
+        fields = ("name", "min_stars", "max_stars")
+
+
 class AudioBookViewSet(
+    CurrentPriceMixin,
     BaseViewSet,
     generics.ListCreateAPIView,
     generics.RetrieveAPIView,
@@ -92,4 +104,10 @@ class AudioBookViewSet(
     queryset = AudioBook.objects.all()
     serializer_class = AudioBookSerializer
     alternative_lookup_field = "name"
-    filterset_fields = ("name",)
+    filter_backends = [filters.DjangoFilterBackend, OrderingFilter]
+    filterset_class = AudioBookFilterSet
+    ordering_fields = ("created_at", "stars_average")
+
+    def get_queryset(self):
+        """Products are listed for everyone, not only for their sellers."""
+        return self.queryset.all()
@@ -1,14 +1,15 @@
 """Product views."""
-from shop.product.serializers import AudioBookBookmarkSerializer, PaperBookBookmarkSerializer
+from collections import defaultdict
+from shop.product.serializers import ProductBookmarkSerializer
 from base.models import Tag, Category
 from base.serializers import CategorySerializer, TagSerializer
 from shop.product.models import PaperBook, AudioBook
-from base.views import BaseViewSet
-from rest_framework import permissions, generics, status
+from base.views import BaseBookmarkViewSet, BaseViewSet
+from shop.price.views import CurrentPriceMixin
+from rest_framework import permissions, generics
 from rest_framework.response import Response
 
 from shop.product.models import (
-    AudioBook,
     Author,
     Translator,
     Publisher,
@@ -19,10 +20,55 @@ from shop.product.serializers import (
     TranslatorSerializer,
     PublisherSerializer,
     ProductSerializer,
+    ProductPolymorphicSerializer,
 )
 
+# Relations rendered by each product type's serializer, they are prefetched for
+# a whole page of the product listing.
+PRODUCT_RELATIONS = {
+    AudioBook: (
+        "authors",
+        "speakers",
+        "translators",
+        "compatible_devices",
+        "tags",
+    ),
+    PaperBook: ("authors", "translators", "tags"),
+}
+
+
+def downcast_products(products):
+    """Get the concrete products of non-polymorphic products.
+
+    The products of each type are fetched with one query, plus one query per
+    relation of the type.
+
+    Args:
+        products (list): non-polymorphic products.
+
+    Returns:
+        list: concrete products, in the same order.
+    """
+    ids_by_model = defaultdict(list)
+    for product in products:
+        model = product.get_real_instance_class() or Product
+        ids_by_model[model].append(product.id)
+
+    concrete_products = {}
+    for model, ids in ids_by_model.items():
+        if model is Product:
+            continue
+        queryset = (
+            model.objects.non_polymorphic()
+            .filter(pk__in=ids)
+            .prefetch_related(*PRODUCT_RELATIONS.get(model, ()))
+        )
+        concrete_products.update((product.id, product) for product in queryset)
+    return [concrete_products.get(product.id, product) for product in products]
+
 
 class ProductViewSet(
+    CurrentPriceMixin,
     BaseViewSet,
     generics.ListCreateAPIView,
     generics.RetrieveAPIView,
@@ -36,6 +82,27 @@ class ProductViewSet(
     alternative_lookup_field = "name"
 #     filterset_fields = ("name",)
 
+    def get_queryset(self):
+        """Products are listed for everyone, not only for their sellers."""
+        return self.queryset.all()
+
+    def list(self, request, *args, **kwargs):
+        """DRF built-in method.
+
+        The page is read without downcasting the products, then the products of
+        each type are fetched together with their relations.
+        """
+        queryset = self.filter_queryset(self.get_queryset()).non_polymorphic()
+        page = self.paginate_queryset(queryset)
+        products = downcast_products(list(queryset) if page is None else page)
+        serializer = ProductPolymorphicSerializer(
+            products, many=True, context=self.get_serializer_context()
+        )
+
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
 
 class TagViewSet(
     BaseViewSet,
@@ -107,143 +174,17 @@ class TranslatorViewSet(
     filterset_fields = ("name",)
 
 
-class AudioBookBookmarkViewSet(BaseViewSet, generics.ListCreateAPIView, generics.DestroyAPIView):
+class AudioBookBookmarkViewSet(BaseBookmarkViewSet):
     """Audio Book Bookmark view set."""
 
-    permission_classes = [permissions.IsAuthenticated]
-    queryset = AudioBook.objects.all().only("id", "bookmarks")
-    serializer_class = AudioBookBookmarkSerializer
-
-    def get_queryset(self):
-        """Only fetch bookmark-related posts."""
-        return AudioBook.objects.filter(bookmarks=self.request.user)
-
-    def create(self, request, *args, **kwargs):
-        """Attach user ID into a request."""
-        request.data["user"] = self.request.user.id
-        try:
-            self.get_queryset().get(id=request.data["post"])
-            return Response(
-                data={
-                    "status_code": status.HTTP_400_BAD_REQUEST,
-                    "code": status.HTTP_400_BAD_REQUEST,
-                    "detail": "The post already bookmarked.",
-                },
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        except AudioBook.DoesNotExist:
-            post = AudioBook.objects.get(id=request.data["post"])
-            post.bookmarks.add(self.request.user)
-        return Response(
-            data={
-                "status_code": status.HTTP_201_CREATED,
-                "code": status.HTTP_201_CREATED,
-                "detail": "Bookmark created.",
-            },
-            status=status.HTTP_201_CREATED,
-        )
-
-    def destroy(self, request, *args, **kwargs):
-        """DRF built-in method."""
-        try:
-            post = AudioBook.objects.get(id=kwargs["pk"])
-        except AudioBook.DoesNotExist:
-            return Response(
-                data={
-                    "status_code": status.HTTP_404_NOT_FOUND,
-                    "code": status.HTTP_404_NOT_FOUND,
-                    "detail": "Post not found.",
-                },
-                status=status.HTTP_404_NOT_FOUND,
-            )
-
-        if post.bookmarks.filter(bookmarks__bookmarks=self.request.user).exists():
-            post.bookmarks.remove(self.request.user)
-            return Response(
-                data={
-                    "status_code": status.HTTP_204_NO_CONTENT,
-                    "code": status.HTTP_204_NO_CONTENT,
-                    "detail": "Bookmark removed.",
-                },
-                status=status.HTTP_204_NO_CONTENT,
-            )
-
-        return Response(
-            data={
-                "status_code": status.HTTP_404_NOT_FOUND,
-                "code": status.HTTP_404_NOT_FOUND,
-                "detail": "Bookmark not found.",
-            },
-            status=status.HTTP_404_NOT_FOUND,
-        )
+    serializer_class = ProductBookmarkSerializer
+    bookmarked_model = AudioBook
+    bookmarked_field = "product"
 
 
-class PaperBookBookmarkViewSet(BaseViewSet, generics.ListCreateAPIView, generics.DestroyAPIView):
+class PaperBookBookmarkViewSet(BaseBookmarkViewSet):
     """Paper Book Bookmark view set."""
 
-    permission_classes = [permissions.IsAuthenticated]
-    queryset = PaperBook.objects.all().only("id", "bookmarks")
-    serializer_class = PaperBookBookmarkSerializer
-
-    def get_queryset(self):
-        """Only fetch bookmark-related posts."""
-        return PaperBook.objects.filter(bookmarks=self.request.user)
-
-    def create(self, request, *args, **kwargs):
-        """Attach user ID into a request."""
-        request.data["user"] = self.request.user.id
-        try:
-            self.get_queryset().get(id=request.data["post"])
-            return Response(
-                data={
-                    "status_code": status.HTTP_400_BAD_REQUEST,
-                    "code": status.HTTP_400_BAD_REQUEST,
-                    "detail": "The post already bookmarked.",
-                },
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        except PaperBook.DoesNotExist:
-            post = PaperBook.objects.get(id=request.data["post"])
-            post.bookmarks.add(self.request.user)
-        return Response(
-            data={
-                "status_code": status.HTTP_201_CREATED,
-                "code": status.HTTP_201_CREATED,
-                "detail": "Bookmark created.",
-            },
-            status=status.HTTP_201_CREATED,
-        )
-
-    def destroy(self, request, *args, **kwargs):
-        """DRF built-in method."""
-        try:
-            post = PaperBook.objects.get(id=kwargs["pk"])
-        except PaperBook.DoesNotExist:
-            return Response(
-                data={
-                    "status_code": status.HTTP_404_NOT_FOUND,
-                    "code": status.HTTP_404_NOT_FOUND,
-                    "detail": "Post not found.",
-                },
-                status=status.HTTP_404_NOT_FOUND,
-            )
-
-        if post.bookmarks.filter(bookmarks__bookmarks=self.request.user).exists():
-            post.bookmarks.remove(self.request.user)
-            return Response(
-                data={
-                    "status_code": status.HTTP_204_NO_CONTENT,
-                    "code": status.HTTP_204_NO_CONTENT,
-                    "detail": "Bookmark removed.",
-                },
-                status=status.HTTP_204_NO_CONTENT,
-            )
-
-        return Response(
-            data={
-                "status_code": status.HTTP_404_NOT_FOUND,
-                "code": status.HTTP_404_NOT_FOUND,
-                "detail": "Bookmark not found.",
-            },
-            status=status.HTTP_404_NOT_FOUND,
-        )
+    serializer_class = ProductBookmarkSerializer
+    bookmarked_model = PaperBook
+    bookmarked_field = "product"
@@ -11,7 +11,7 @@ class GroupSlideShow(Base):
 
     name = models.CharField(max_length=50)
 
-    class Meta:
+    class Meta(Base.Meta):
         unique_together = [("is_deleted", "name")]
 
     def __str__(self):
@@ -38,7 +38,7 @@ class SlideShow(Base):
     link = models.CharField(max_length=1024)
     order = models.PositiveSmallIntegerField(default=1)
 
-    class Meta:
+    class Meta(Base.Meta):
         ordering = ["order"]
         unique_together = [("is_deleted", "title")]
 
@@ -64,13 +64,14 @@ INSTALLED_APPS = [
     "drf_yasg",
     "account",
     "base",
-    # "blog",
+    "blog",
     # "page",
-    # "file",
+    "file",
     # "slideshow",
-    # "shop.cart",
-    # "shop.product",
-    # "shop.payment",
+    "shop.cart",
+    "shop.product",
+    "shop.price",
+    "shop.payment",
 ]
 
 # Note: it will be overridden by 'page' app.
@@ -150,7 +151,7 @@ AUTH_PASSWORD_VALIDATORS = [
 
 AUTHENTICATION_BACKENDS = [
     "account.backends.AccountBackend",
-    "django.contrib.auth.backends.ModelBackend",
+    "account.backends.PermissionBackend",
 ]
 
 # Internationalization
@@ -177,6 +178,20 @@ MEDIA_ALLOWED_EXTENSIONS = ast.literal_eval(
         "THRUSH_MEDIA_ALLOWED_EXTENSIONS", str(get_available_image_extensions())
     )
 )
+# Directories are listed by pages of MEDIA_LISTING_PAGE_SIZE nodes.
+MEDIA_LISTING_PAGE_SIZE = int(os.environ.get("THRUSH_MEDIA_LISTING_PAGE_SIZE", "100"))
+# Storage quota of each user's media directory, 0 is unlimited.
+MEDIA_QUOTA_BYTES = int(os.environ.get("THRUSH_MEDIA_QUOTA_BYTES", str(1024**3)))
+MEDIA_QUOTA_FILES = int(os.environ.get("THRUSH_MEDIA_QUOTA_FILES", "0"))
+# Chunked uploads are written by chunks of at most MEDIA_UPLOAD_CHUNK_SIZE bytes,
+# and expire after MEDIA_UPLOAD_LIFE_TIME seconds without a chunk.
+MEDIA_UPLOAD_CHUNK_SIZE = int(
+    os.environ.get("THRUSH_MEDIA_UPLOAD_CHUNK_SIZE", str(64 * 1024 * 1024))
+)
+MEDIA_UPLOAD_LIFE_TIME = int(os.environ.get("THRUSH_MEDIA_UPLOAD_LIFE_TIME", "86400"))
+# Downloads are handed to nginx with "X-Accel-Redirect" to this internal location
+# of MEDIA_ROOT, e.g. "/media/", or served by Django if it's empty.
+MEDIA_ACCEL_REDIRECT_URL = os.environ.get("THRUSH_MEDIA_ACCEL_REDIRECT_URL", "")
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
@@ -186,10 +201,10 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # DRF settings.
 
 REST_FRAMEWORK = {
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    "DEFAULT_PAGINATION_CLASS": "base.pagination.KeysetPagination",
     "PAGE_SIZE": int(os.environ.get("THRUSH_PAGE_SIZE", 10)),
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "account.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
@@ -226,6 +241,41 @@ VERIFICATION_CODE_LENGTH_RANGE = (
 VERIFICATION_CODE_LIFE_TIME = int(
     os.environ.get("THRUSH_VERIFY_CODE_LIFE_TIME", 60 * 3)
 )
+# A client can check VERIFICATION_CHECK_LIMIT verification codes of a user at
+# most per VERIFICATION_CODE_LIFE_TIME, more are refused with a 429. Past
+# VERIFICATION_USER_CHECK_LIMIT checks from all clients, the codes of the user
+# are dropped too.
+VERIFICATION_CHECK_LIMIT = int(os.environ.get("THRUSH_VERIFICATION_CHECK_LIMIT", "5"))
+VERIFICATION_USER_CHECK_LIMIT = int(
+    os.environ.get("THRUSH_VERIFICATION_USER_CHECK_LIMIT", "10")
+)
+# Users of tokens and their permissions are cached for at most
+# AUTH_CACHE_TIMEOUT seconds.
+AUTH_CACHE_TIMEOUT = int(os.environ.get("THRUSH_AUTH_CACHE_TIMEOUT", "300"))
+# Passwords are hashed in a pool of AUTH_HASHING_WORKERS processes (0 hashes
+# them in the request thread), at most AUTH_HASHING_CONCURRENCY at once, more
+# are refused with a 429. Each server worker process has its own pool and
+# limit, so size AUTH_HASHING_WORKERS for the cores divided by the server
+# workers. The pool only helps servers running several requests per process:
+# serve "thrush.asgi" and log in with "account/login/async/", or run threaded
+# gunicorn workers. Set it to 0 for gunicorn sync workers, which wait for their
+# hashing anyway.
+AUTH_HASHING_WORKERS = int(os.environ.get("THRUSH_AUTH_HASHING_WORKERS", "1"))
+AUTH_HASHING_CONCURRENCY = int(os.environ.get("THRUSH_AUTH_HASHING_CONCURRENCY", "16"))
+# Verification codes are queued in the cache and sent in batches of
+# VERIFICATION_BATCH_SIZE by "manage.py deliver_verification_codes". Failed
+# deliveries are retried VERIFICATION_MAX_ATTEMPTS times at most, after
+# VERIFICATION_RETRY_DELAY seconds doubled on each attempt. VERIFICATION_PROVIDER
+# is the import path of a subclass of "account.verification.BaseProvider". In
+# debug codes are only kept in memory by default, otherwise they stay queued
+# until it's set.
+VERIFICATION_PROVIDER = os.environ.get(
+    "THRUSH_VERIFICATION_PROVIDER",
+    "account.verification.LocalProvider" if DEBUG else "",
+)
+VERIFICATION_BATCH_SIZE = int(os.environ.get("THRUSH_VERIFICATION_BATCH_SIZE", "100"))
+VERIFICATION_MAX_ATTEMPTS = int(os.environ.get("THRUSH_VERIFICATION_MAX_ATTEMPTS", "5"))
+VERIFICATION_RETRY_DELAY = int(os.environ.get("THRUSH_VERIFICATION_RETRY_DELAY", "10"))
 LOGIN_URL = "/account/login"
 LOGOUT_URL = "/account/logout"
 
@@ -234,6 +284,11 @@ LOGOUT_URL = "/account/logout"
 STAR_MIN_VALUE = int(os.environ.get("THRUSH_STAR_MIN_VALUE", "1"))
 STAR_MAX_VALUE = int(os.environ.get("THRUSH_STAR_MAX_VALUE", "10"))
 
+# Post visits are counted in the cache and flushed into the database every
+# BLOG_VISIT_FLUSH_INTERVAL seconds by each worker process (0 disables it, then
+# run "manage.py flush_post_visits" periodically instead).
+BLOG_VISIT_FLUSH_INTERVAL = int(os.environ.get("THRUSH_BLOG_VISIT_FLUSH_INTERVAL", "0"))
+
 # Set Default value for "category" field in "post" table when
 # category record deleted in "category" table.
 DELETED_POST_CATEGORY_NAME = "__deleted_category"
@@ -249,3 +304,18 @@ DELETED_SLIDE_GROUP_NAME = "__deleted_group_menu"
 # Product component.
 
 DELETED_PRODUCT_CATEGORY_NAME = "__deleted_product"
+
+# Payment component.
+
+# Ordered quantities are reserved while the payment is pending, for at most
+# SHOP_RESERVATION_TIMEOUT seconds (run "manage.py release_reservations"
+# periodically to give back the expired ones).
+SHOP_RESERVATION_TIMEOUT = int(os.environ.get("THRUSH_SHOP_RESERVATION_TIMEOUT", "900"))
+
+# Price component.
+
+# Active prices of products are cached for listings, for at most
+# SHOP_PRICE_CACHE_TIMEOUT seconds.
+SHOP_PRICE_CACHE_TIMEOUT = int(
+    os.environ.get("THRUSH_SHOP_PRICE_CACHE_TIMEOUT", "3600")
+)
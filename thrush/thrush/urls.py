@@ -31,19 +31,22 @@ urlpatterns = [
     path("account/", include(("account.urls", "account"))),
 
     # Base.
-    # path("base/", include(("base.urls", "base"))),
+    path("base/", include(("base.urls", "base"))),
 
     # Blog.
-    # path("blog/", include(("blog.urls", "blog"))),
+    path("blog/", include(("blog.urls", "blog"))),
 
     # Cart.
-    # path("shop/", include(("shop.cart.urls", "cart"))),
+    path("shop/", include(("shop.cart.urls", "cart"))),
 
     # Payment.
-    # path("shop/", include(("shop.payment.urls", "payment"))),
+    path("shop/", include(("shop.payment.urls", "payment"))),
 
     # Media (file/directory) manager.
-    # path("file/", include(("file.urls", "file"))),
+    path("file/", include(("file.urls", "file"))),
+
+    # Media storage (usage, chunked uploads and downloads).
+    path("storage/", include(("file.storage_urls", "storage"))),
 
     # Page.
     # path("page/", include(("page.urls", "page"))),
@@ -52,10 +55,10 @@ urlpatterns = [
     # path("slideshow/", include(("slideshow.urls", "slideshow"))),
 
     # Products.
-    # path("shop/products/", include(("shop.product.urls", "products"))),
+    path("shop/products/", include(("shop.product.urls", "product"))),
 
-    # # Price.
-    # path("shop/price/", include(("shop.price.urls", "price"))),
+    # Price.
+    path("shop/price/", include(("shop.price.urls", "price"))),
 
     # Health check.
     path("health-check/", health_check),